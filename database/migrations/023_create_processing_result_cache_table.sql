@@ -0,0 +1,12 @@
+CREATE TABLE processing_result_cache (
+    id UUID PRIMARY KEY,
+    content_hash VARCHAR(64) NOT NULL,
+    pipeline_version TEXT NOT NULL,
+    source_processing_version_id UUID NOT NULL REFERENCES processing_versions(id) ON DELETE CASCADE,
+    hit_count INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    last_hit_at TIMESTAMPTZ,
+    UNIQUE(content_hash, pipeline_version)
+);
+
+CREATE INDEX idx_processing_result_cache_pipeline_version ON processing_result_cache(pipeline_version);
@@ -0,0 +1,20 @@
+CREATE TABLE analytics_watermarks (
+    job_name VARCHAR(100) PRIMARY KEY,
+    last_created_at TIMESTAMPTZ NOT NULL,
+    last_id UUID NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE topic_interval_stats (
+    topic_text TEXT PRIMARY KEY,
+    occurrences BIGINT NOT NULL,
+    last_seen_at TIMESTAMPTZ NOT NULL,
+    interval_count BIGINT NOT NULL,
+    interval_mean DOUBLE PRECISION NOT NULL,
+    interval_m2 DOUBLE PRECISION NOT NULL,
+    recent_intervals DOUBLE PRECISION[] NOT NULL DEFAULT '{}',
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX idx_topics_created_at_id ON topics(created_at, id);
+CREATE INDEX idx_processing_versions_created_at_id ON processing_versions(created_at, id);
@@ -0,0 +1,3 @@
+-- Keep raw file content out-of-line but uncompressed, so substring() reads of large blobs only fetch
+-- the requested slice instead of decompressing the whole value. Applies to newly written rows.
+ALTER TABLE raw_files ALTER COLUMN content SET STORAGE EXTERNAL;
@@ -0,0 +1,18 @@
+ALTER TABLE tabular_data ADD COLUMN summary_stats JSONB;
+ALTER TABLE tabular_data ADD COLUMN anomalies JSONB;
+ALTER TABLE tabular_data ADD COLUMN page_count INTEGER NOT NULL DEFAULT 0;
+
+-- Row data of large tables in bounded pages; tabular_data.data_json keeps the first page as a preview.
+-- The FK is deferred so pages can be written while the file streams, before the parent row exists.
+CREATE TABLE tabular_data_pages (
+    id UUID PRIMARY KEY,
+    tabular_data_id UUID NOT NULL REFERENCES tabular_data(id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+    processing_version_id UUID NOT NULL REFERENCES processing_versions(id) ON DELETE CASCADE,
+    page_number INTEGER NOT NULL,
+    row_offset BIGINT NOT NULL,
+    row_count INTEGER NOT NULL,
+    rows JSONB NOT NULL,
+    UNIQUE(tabular_data_id, page_number)
+);
+
+CREATE INDEX idx_tabular_data_pages_version_id ON tabular_data_pages(processing_version_id);
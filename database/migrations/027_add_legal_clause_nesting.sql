@@ -0,0 +1,8 @@
+-- Clause numbering from the line-by-line segmenter: sub-clauses ("4.2", "4.§1") point at their
+-- parent's number, and position keeps the order of the clauses within the document.
+ALTER TABLE legal_clauses ADD COLUMN clause_number TEXT;
+ALTER TABLE legal_clauses ADD COLUMN parent_number TEXT;
+ALTER TABLE legal_clauses ADD COLUMN depth INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE legal_clauses ADD COLUMN position INTEGER;
+
+CREATE INDEX idx_legal_clauses_version_position ON legal_clauses(processing_version_id, position);
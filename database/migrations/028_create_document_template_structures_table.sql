@@ -0,0 +1,9 @@
+-- Every exact structure hash grouped into a template by near-duplicate clustering. Hashes listed
+-- here are not clustered again, so a cluster yields one template rather than one per member hash.
+CREATE TABLE document_template_structures (
+    structure_hash TEXT PRIMARY KEY,
+    template_id UUID NOT NULL REFERENCES document_templates(id) ON DELETE CASCADE,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX idx_document_template_structures_template_id ON document_template_structures(template_id);
@@ -0,0 +1,5 @@
+-- Rows written before 025 still hold compressed content, and substring() on a compressed value
+-- decompresses it from the start, so spooling them slice by slice is quadratic. Rewriting the
+-- value stores it again under the EXTERNAL storage of 025. Only compressed rows match, so
+-- re-running this is a no-op.
+UPDATE raw_files SET content = content || ''::bytea WHERE pg_column_compression(content) IS NOT NULL;
@@ -0,0 +1,4 @@
+-- identified_clauses stays a JSON array of clause texts. The NLI result of each scored clause is
+-- kept next to it as an array of {clause, keywords, categories, offset, scores, risk_level, risk_score}.
+-- Documents without candidate clauses are stored with risk_level 'não avaliado' and confidence 0.
+ALTER TABLE financial_risk_analysis ADD COLUMN clause_scores JSONB;
@@ -0,0 +1,115 @@
+"""
+Throughput benchmark for finance KPI extraction on large synthetic filings.
+
+Builds a filing from every rule of the KPI registry (pt-BR and English sentences, all value kinds,
+periods, filler paragraphs) and times FinanceKPIExtractorPipeline.extract_kpis, which scans the
+text once for all KPI names. For comparison it times the same rule set applied the previous way,
+one finditer pass per rule, and the original three-pattern extractor.
+
+    python benchmarks/bench_finance_kpi.py --megabytes 20 --repeat 3
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from pipelines.finance_kpi_extractor import FinanceKPIExtractorPipeline, load_rules
+
+FILLER = (
+    "A companhia manteve disciplina na alocação de capital e seguiu avançando em sua agenda de eficiência "
+    "operacional. The board reviewed the strategic plan and approved the budget for the next fiscal cycle. "
+)
+PERIODS = ("no 3T24", "in Q2 2024", "no primeiro semestre de 2023", "in FY2023", "em dezembro de 2024", "no 9M24")
+
+def value_text(kind: str, rng: random.Random, language: str) -> str:
+    integer, decimals = rng.randint(1, 999), rng.randint(0, 9)
+    number = f"{integer},{decimals}" if language == "pt" else f"{integer}.{decimals}"
+    if kind == "currency":
+        return f"R$ {number} milhões" if language == "pt" else f"US$ {number} million"
+    if kind == "percent":
+        return f"{number}%"
+    if kind == "ratio":
+        return f"{number}x"
+    return f"{rng.randint(1, 999)}.{rng.randint(100, 999)}" if language == "pt" else f"{rng.randint(1, 999)},{rng.randint(100, 999)}"
+
+def generate_filing(rules: list, megabytes: float, seed: int = 42) -> str:
+    rng = random.Random(seed)
+    parts, size = [], 0
+    while size < megabytes * 1024 * 1024:
+        rule = rng.choice(rules)
+        language = rng.choice(list(rule["aliases"]))
+        alias = rng.choice(rule["aliases"][language])
+        connector = " de " if language == "pt" else " of "
+        sentence = f"{alias.capitalize()}{connector}{value_text(rule['kind'], rng, language)} {rng.choice(PERIODS)}. {FILLER}\n"
+        parts.append(sentence)
+        size += len(sentence)
+    return "".join(parts)
+
+def per_rule_patterns(extractor: FinanceKPIExtractorPipeline) -> list:
+    # One regex per rule (its aliases, a short gap and a value), applied in separate passes
+    value = extractor.value_pattern.pattern
+    patterns = []
+    for rule in extractor.rules:
+        aliases = "|".join(re.escape(alias) for language in rule["aliases"].values() for alias in language)
+        patterns.append(re.compile(rf"(?<!\w)(?:{aliases})(?!\w)[^\d\n.;]{{0,60}}?{value}", re.IGNORECASE))
+    return patterns
+
+def legacy_extract(text: str, patterns: list) -> int:
+    return sum(1 for pattern in patterns for _ in pattern.finditer(text))
+
+LEGACY_PATTERNS = [
+    re.compile(r'(Receita\s*Líquida|Net\s*Revenue)\s*de\s*(R\$|\$|USD)\s*([\d.,]+)\s*(milhões|milhão|mil|bi|bilhões|billion|million)?', re.IGNORECASE),
+    re.compile(r'(Lucro\s*Bruto|Gross\s*Profit)\s*de\s*(R\$|\$|USD)\s*([\d.,]+)\s*(milhões|milhão|mil|bi|bilhões|billion|million)?', re.IGNORECASE),
+    re.compile(r'(EBITDA)\s*de\s*(R\$|\$|USD)\s*([\d.,]+)\s*(milhões|milhão|mil|bi|bilhões|billion|million)?', re.IGNORECASE),
+]
+
+def best_of(repeat: int, fn) -> tuple:
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def run(megabytes: float, repeat: int, rules_path: str = None) -> dict:
+    extractor = FinanceKPIExtractorPipeline(load_rules(rules_path) if rules_path else None)
+    text = generate_filing(extractor.rules, megabytes)
+    size_mb = len(text.encode('utf-8')) / (1024 * 1024)
+    result = {"rules": len(extractor.rules), "aliases": len(extractor.aliases), "filing_mb": size_mb}
+
+    seconds, kpis = best_of(repeat, lambda: extractor.extract_kpis(text))
+    result["scanner_seconds"] = seconds
+    result["scanner_mb_per_second"] = size_mb / seconds
+    result["scanner_kpis"] = len(kpis)
+    result["scanner_kpis_with_period"] = sum(1 for kpi in kpis if kpi["period"])
+
+    patterns = per_rule_patterns(extractor)
+    seconds, matches = best_of(repeat, lambda: legacy_extract(text, patterns))
+    result["per_rule_seconds"] = seconds
+    result["per_rule_mb_per_second"] = size_mb / seconds
+    result["per_rule_matches"] = matches
+
+    seconds, matches = best_of(repeat, lambda: legacy_extract(text, LEGACY_PATTERNS))
+    result["legacy_3_rules_seconds"] = seconds
+    result["legacy_3_rules_mb_per_second"] = size_mb / seconds
+    result["legacy_3_rules_matches"] = matches
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megabytes", type=float, default=20.0, help="Size of the generated filing")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per variant; the fastest is reported")
+    parser.add_argument("--rules", default=None, help="Rule file to benchmark instead of the bundled one")
+    args = parser.parse_args()
+
+    result = run(args.megabytes, args.repeat, args.rules)
+    for key, value in result.items():
+        print(f"{key}: {value:.4f}" if isinstance(value, float) else f"{key}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark for knowledge-graph assembly on synthetic entity-dense text.
+
+Feeds generated NER results straight into KnowledgeGraphPipeline.build_graph_components and
+assemble_relationships (no model is loaded), and compares the relationship resolution against the
+previous per-relationship linear scan over the entity map.
+
+    python benchmarks/bench_knowledge_graph.py --sentences 2000 --entities-per-sentence 8 --vocabulary 5000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from pipelines.knowledge_graph_extraction import KnowledgeGraphPipeline
+
+def generate_corpus(sentences: int, entities_per_sentence: int, vocabulary: int, seed: int = 42) -> tuple:
+    rng = random.Random(seed)
+    names = [f"Entity{i}" for i in range(vocabulary)]
+    groups = ["PER", "ORG", "LOC"]
+    sentences_with_ids, ner_results = [], []
+    for i in range(sentences):
+        picked = rng.sample(names, entities_per_sentence)
+        sentences_with_ids.append((f"chunk-{i // 20}", " works with ".join(picked) + "."))
+        ner_results.append([{"word": name, "entity_group": groups[int(name[len("Entity"):]) % len(groups)], "score": 0.99} for name in picked])
+    return sentences_with_ids, ner_results
+
+def legacy_resolve(relationships: list, entity_id_map: dict) -> list:
+    rows = []
+    for rel in relationships:
+        source_key = next((key for key in entity_id_map if key[0] == rel['source']), None)
+        target_key = next((key for key in entity_id_map if key[0] == rel['target']), None)
+        if source_key and target_key:
+            rows.append((entity_id_map[source_key], entity_id_map[target_key], rel['type'], rel['context']))
+    return rows
+
+def run(sentences: int, entities_per_sentence: int, vocabulary: int, compare_legacy: bool = True) -> dict:
+    pipeline = KnowledgeGraphPipeline()
+    sentences_with_ids, ner_results = generate_corpus(sentences, entities_per_sentence, vocabulary)
+
+    start = time.perf_counter()
+    entities, mentions, relationships = pipeline.build_graph_components(sentences_with_ids, ner_results)
+    build_seconds = time.perf_counter() - start
+
+    entity_id_map = {(entity['name'], entity['type']): f"id-{i}" for i, entity in enumerate(entities)}
+    start = time.perf_counter()
+    rows = pipeline.assemble_relationships(relationships, entity_id_map)
+    assemble_seconds = time.perf_counter() - start
+
+    result = {
+        "sentences": sentences,
+        "entities": len(entities),
+        "mentions": len(mentions),
+        "relationships": len(rows),
+        "relationship_occurrences": sum(rel['count'] for rel in relationships),
+        "build_seconds": build_seconds,
+        "assemble_seconds": assemble_seconds,
+    }
+    if compare_legacy:
+        legacy_relationships = [
+            {'source': rel['source'], 'target': rel['target'], 'type': rel['type'], 'context': context}
+            for rel in relationships for context in rel['contexts'][:1] for _ in range(rel['count'])
+        ]
+        start = time.perf_counter()
+        legacy_resolve(legacy_relationships, entity_id_map)
+        result["legacy_resolve_seconds"] = time.perf_counter() - start
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sentences", type=int, default=2000)
+    parser.add_argument("--entities-per-sentence", type=int, default=8)
+    parser.add_argument("--vocabulary", type=int, default=5000)
+    parser.add_argument("--skip-legacy", action="store_true", help="Do not time the previous linear-scan resolution")
+    args = parser.parse_args()
+
+    result = run(args.sentences, args.entities_per_sentence, args.vocabulary, compare_legacy=not args.skip_legacy)
+    for key, value in result.items():
+        print(f"{key}: {value:.4f}" if isinstance(value, float) else f"{key}: {value}")
+
+if __name__ == "__main__":
+    main()
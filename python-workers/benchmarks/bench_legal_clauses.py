@@ -0,0 +1,132 @@
+"""
+Scaling benchmark for legal clause segmentation on adversarial contracts.
+
+Generates contracts at doubling sizes and times LegalClauseExtractorPipeline.extract_clauses,
+the line-by-line segmenter, against the original multiline regex. Inputs:
+
+  caps      a contract scanned entirely in capitals, with page numbers followed by blank space
+  blank     a page number followed by a long run of blank lines, the worst case for the
+            original regex (its `\\s` quantifiers span lines and restart at every line)
+  regular   a mixed-case contract with numbered clauses, sub-clauses and paragraphs
+
+For each input the growth factor between consecutive sizes is reported; linear time shows as ~2.
+The original regex is only run up to --legacy-max-kb, since it is quadratic on some inputs.
+
+    python benchmarks/bench_legal_clauses.py --kilobytes 64 --steps 5
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from pipelines.legal_clause_extractor import LegalClauseExtractorPipeline
+
+LEGACY_PATTERN = re.compile(r'^(CLÁUSULA\s+[A-Zªº]+|[\d\.]+\s*[-–—.]?\s*DO\s+[A-Z\s]+|([A-Z\s]{5,}))', re.IGNORECASE | re.MULTILINE)
+
+BODY = (
+    "O presente contrato tem por objeto a prestação de serviços de consultoria pela CONTRATADA, "
+    "nas condições e prazos estabelecidos neste instrumento e em seus anexos.",
+    "A CONTRATANTE pagará à CONTRATADA o valor mensal ajustado, reajustado anualmente pelo IPCA.",
+    "O descumprimento de qualquer obrigação sujeitará a parte infratora à multa de 10% do valor do contrato.",
+)
+ORDINALS = ("PRIMEIRA", "SEGUNDA", "TERCEIRA", "QUARTA", "QUINTA", "SEXTA", "SÉTIMA", "OITAVA", "NONA", "DÉCIMA")
+
+def legacy_extract(text: str) -> list:
+    # The original extract_clauses
+    matches = list(LEGACY_PATTERN.finditer(text))
+    return [
+        {"clause_type": match.group(0).strip(), "clause_text": text[match.end():matches[i + 1].start() if i + 1 < len(matches) else len(text)].strip()}
+        for i, match in enumerate(matches)
+    ]
+
+def wrap(sentence: str, width: int = 70) -> list:
+    lines, line = [], ""
+    for word in sentence.split():
+        if line and len(line) + len(word) > width:
+            lines.append(line)
+            line = ""
+        line = f"{line} {word}".strip()
+    return lines + [line]
+
+def regular_contract(size: int, rng: random.Random) -> str:
+    parts, length, clause = [], 0, 0
+    while length < size:
+        clause += 1
+        lines = [f"CLÁUSULA {ORDINALS[(clause - 1) % len(ORDINALS)]} – DO OBJETO {clause}", rng.choice(BODY)]
+        for sub in range(1, rng.randint(2, 4)):
+            lines.append(f"{clause}.{sub}. {rng.choice(BODY)}")
+        lines.append(f"Parágrafo único. {rng.choice(BODY)}")
+        block = "\n".join(lines) + "\n\n"
+        parts.append(block)
+        length += len(block)
+    return "".join(parts)[:size]
+
+def caps_contract(size: int, rng: random.Random) -> str:
+    parts, length, page = [], 0, 0
+    while length < size:
+        page += 1
+        lines = []
+        for clause in range(3):
+            lines.append(f"CLÁUSULA {ORDINALS[clause]}")
+            lines.append("DAS OBRIGAÇÕES DAS PARTES")
+            for sentence in rng.sample(BODY, 2):
+                lines.extend(wrap(sentence.upper()))
+        block = "\n".join(lines) + f"\n{page}\n" + "\n" * 40
+        parts.append(block)
+        length += len(block)
+    return "".join(parts)[:size]
+
+def blank_contract(size: int, rng: random.Random) -> str:
+    return "1\n" + "\n" * (size - 2)
+
+INPUTS = {"caps": caps_contract, "blank": blank_contract, "regular": regular_contract}
+
+def timed(fn, text: str) -> tuple:
+    start = time.perf_counter()
+    clauses = fn(text)
+    return time.perf_counter() - start, len(clauses)
+
+def run(kilobytes: float, steps: int, legacy_max_kb: float, inputs: list, seed: int = 42) -> dict:
+    pipeline = LegalClauseExtractorPipeline()
+    result = {}
+    for name in inputs:
+        previous = {}
+        for step in range(steps):
+            size = int(kilobytes * 1024 * 2 ** step)
+            text = INPUTS[name](size, random.Random(seed))
+            variants = [("segmenter", pipeline.extract_clauses)]
+            if size <= legacy_max_kb * 1024:
+                variants.append(("legacy", legacy_extract))
+            for variant, fn in variants:
+                seconds, clauses = timed(fn, text)
+                key = f"{name}.{size // 1024}kb.{variant}"
+                result[f"{key}_seconds"] = seconds
+                result[f"{key}_clauses"] = clauses
+                if variant in previous:
+                    result[f"{key}_growth"] = seconds / max(previous[variant], 1e-9)
+                previous[variant] = seconds
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kilobytes", type=float, default=16.0, help="Size of the smallest contract")
+    parser.add_argument("--steps", type=int, default=5, help="Number of sizes, each double the previous")
+    parser.add_argument("--legacy-max-kb", type=float, default=64.0, help="Largest contract given to the original regex")
+    parser.add_argument("--inputs", default=",".join(INPUTS), help="Comma-separated inputs to run")
+    args = parser.parse_args()
+
+    inputs = [name.strip() for name in args.inputs.split(",") if name.strip()]
+    unknown = [name for name in inputs if name not in INPUTS]
+    if unknown:
+        parser.error(f"unknown inputs: {', '.join(unknown)} (available: {', '.join(INPUTS)})")
+
+    result = run(args.kilobytes, args.steps, args.legacy_max_kb, inputs)
+    for key, value in result.items():
+        print(f"{key}: {value:.4f}" if isinstance(value, float) else f"{key}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Offline benchmark suite for the Python pipelines.
+
+Runs each pipeline module (chunking, template detection, KPI and clause extraction, tabular
+processing, topic extraction, and the NER / zero-shot pipelines with small stand-in models) on a
+generated corpus and reports throughput, p50/p99 latency and peak memory per case. Results are
+compared against the JSON baseline of this machine, and --save-baseline records a new one.
+A regression beyond --tolerance makes the script exit with status 1.
+
+    python benchmarks/bench_pipelines.py --documents 60 --words 1500
+    python benchmarks/bench_pipelines.py --cases chunking,finance_kpi_extractor --save-baseline
+    python benchmarks/bench_pipelines.py --skip-models --tolerance 0.1
+"""
+import argparse
+import os
+import platform
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, "..", "src"))
+
+from pipeline_suite.cases import CASES, MODEL_CASES
+from pipeline_suite.corpus import generate_documents
+from pipeline_suite.harness import compare, load_baseline, machine_info, run_case, save_baseline
+
+def run(options: dict, cases: list, isolate: bool = True) -> dict:
+    options = dict(options, documents=generate_documents(options["documents"], options["words"], options["seed"]))
+    results = {}
+    for name in cases:
+        start = time.perf_counter()
+        results[name] = run_case(CASES[name], options, isolate=isolate)
+        results[name]["wall_seconds"] = time.perf_counter() - start
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", default=",".join(CASES), help="Comma-separated cases to run")
+    parser.add_argument("--skip-models", action="store_true", help="Leave out the model-backed cases")
+    parser.add_argument("--documents", type=int, default=30)
+    parser.add_argument("--words", type=int, default=1500, help="Average words per document")
+    parser.add_argument("--tables", type=int, default=5)
+    parser.add_argument("--table-rows", type=int, default=50000)
+    parser.add_argument("--table-columns", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--warmup", type=int, default=1, help="Items run once before timing")
+    parser.add_argument("--memory-items", type=int, default=5, help="Items re-run under tracemalloc for peak memory; 0 = all")
+    parser.add_argument("--ner-model", default="hf-internal-testing/tiny-random-bert", help="Stand-in for the NER models")
+    parser.add_argument("--zero-shot-model", default="hf-internal-testing/tiny-random-bert", help="Stand-in for bart-large-mnli")
+    parser.add_argument("--no-isolate", action="store_true", help="Run cases in this process instead of a forked child each")
+    parser.add_argument("--baseline", default=os.path.join(BENCHMARKS_DIR, "baselines", f"{platform.node() or 'local'}.json"))
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown before a metric counts as a regression")
+    args = parser.parse_args()
+
+    cases = [name.strip() for name in args.cases.split(",") if name.strip()]
+    unknown = [name for name in cases if name not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)} (available: {', '.join(CASES)})")
+    if args.skip_models:
+        cases = [name for name in cases if name not in MODEL_CASES]
+
+    options = {
+        "documents": args.documents, "words": args.words, "seed": args.seed,
+        "tables": args.tables, "table_rows": args.table_rows, "table_columns": args.table_columns,
+        "warmup": args.warmup, "memory_items": args.memory_items or None,
+        "ner_model": args.ner_model, "zero_shot_model": args.zero_shot_model,
+    }
+    report = {"machine": machine_info(), "options": options, "results": run(options, cases, isolate=not args.no_isolate)}
+
+    for name, result in report["results"].items():
+        for key, value in result.items():
+            print(f"{name}.{key}: {value:.4f}" if isinstance(value, float) else f"{name}.{key}: {value}")
+
+    status = 0
+    baseline = load_baseline(args.baseline)
+    if baseline is not None:
+        if baseline.get("options") != options:
+            print(f"baseline: options differ from {args.baseline}; comparison is only indicative")
+        if baseline.get("machine") != report["machine"]:
+            print(f"baseline: recorded on a different machine ({baseline.get('machine', {}).get('node')})")
+        regressions = compare(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"regression: {regression}")
+        print(f"baseline: {len(regressions)} regressions beyond {args.tolerance:.0%} against {args.baseline}")
+        status = 1 if regressions else 0
+    if args.save_baseline:
+        save_baseline(args.baseline, report)
+        print(f"baseline: saved to {args.baseline}")
+    sys.exit(status)
+
+if __name__ == "__main__":
+    main()
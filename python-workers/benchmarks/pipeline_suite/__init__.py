@@ -0,0 +1,3 @@
+"""
+Offline benchmark suite for the Python pipelines; run it with benchmarks/bench_pipelines.py.
+"""
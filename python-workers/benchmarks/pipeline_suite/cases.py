@@ -0,0 +1,128 @@
+"""
+Benchmark cases, one per pipeline module. Each case takes the options dict built by
+bench_pipelines.py (with the generated corpus under "documents") and returns harness.measure()'s
+result. Pipelines are imported inside the case, so a case whose dependencies are missing is
+skipped without affecting the others.
+
+Model-backed cases use fresh pipeline instances pointed at the stand-in models given in the
+options; passing the production model names benchmarks the real models instead.
+"""
+import numpy as np
+
+from pipeline_suite.corpus import generate_table
+from pipeline_suite.harness import measure
+
+EMBEDDING_DIMENSION = 384
+CANDIDATE_LABELS = ["finanças", "jurídico", "recursos humanos", "marketing", "relatório técnico", "confidencial"]
+
+def _texts(options: dict, kind: str = None) -> list:
+    return [document["text"] for document in options["documents"] if kind is None or document["kind"] == kind]
+
+def _words(text: str) -> int:
+    return len(text.split())
+
+def _fake_embeddings(chunk_texts: list, seed: int) -> np.ndarray:
+    # Topic extraction and chunked classification only need vectors of the right shape; random
+    # unit vectors keep the embedding model out of these cases
+    vectors = np.random.default_rng(seed).normal(size=(len(chunk_texts), EMBEDDING_DIMENSION)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def chunking(options: dict) -> dict:
+    from text_extraction import intelligent_chunking
+    return measure(intelligent_chunking, _texts(options), units=_words, warmup=options["warmup"], memory_items=options["memory_items"])
+
+def template_detection(options: dict) -> dict:
+    from pipelines.template_detection import TemplateDetectionPipeline
+    pipeline = TemplateDetectionPipeline()
+    return measure(pipeline.extract_features, _texts(options), units=_words, warmup=options["warmup"], memory_items=options["memory_items"])
+
+def finance_kpi_extractor(options: dict) -> dict:
+    from pipelines.finance_kpi_extractor import FinanceKPIExtractorPipeline
+    pipeline = FinanceKPIExtractorPipeline()
+    return measure(pipeline.extract_kpis, _texts(options, "finance"), units=_words, warmup=options["warmup"], memory_items=options["memory_items"])
+
+def legal_clause_extractor(options: dict) -> dict:
+    from pipelines.legal_clause_extractor import LegalClauseExtractorPipeline
+    pipeline = LegalClauseExtractorPipeline()
+    return measure(pipeline.extract_clauses, _texts(options, "legal"), units=_words, warmup=options["warmup"], memory_items=options["memory_items"])
+
+def tabular_processing(options: dict) -> dict:
+    from pipelines.tabular_processing import TabularProcessingPipeline
+    pipeline = TabularProcessingPipeline()
+    tables = [generate_table(options["table_rows"], options["table_columns"], seed=seed) for seed in range(options["tables"])]
+    return measure(
+        lambda table: pipeline.process(table, "benchmark.csv", on_page=lambda page: None), tables,
+        units=lambda table: options["table_rows"], warmup=options["warmup"], memory_items=options["memory_items"]
+    )
+
+def topic_extraction(options: dict) -> dict:
+    from text_extraction import intelligent_chunking
+    from pipelines.topic_extraction import TopicExtractionPipeline
+    pipeline = TopicExtractionPipeline()
+    items = []
+    for seed, text in enumerate(_texts(options)):
+        chunk_texts = intelligent_chunking(text, chunk_size=60, overlap=10)
+        items.append((chunk_texts, _fake_embeddings(chunk_texts, seed)))
+    return measure(lambda item: pipeline.extract(*item), items, units=lambda item: len(item[0]), warmup=options["warmup"], memory_items=options["memory_items"])
+
+def ner(options: dict) -> dict:
+    from pipelines.ner_service import NERService, split_sentences
+    service = NERService()
+    service.model_name = options["ner_model"]
+
+    def annotate_uncached(sentences):
+        # The sentence cache would turn the repeated (memory) pass into lookups
+        service._cache.clear()
+        return service.annotate(sentences)
+
+    # One item is the sentences of one document, as the worker annotates them in one call
+    items = [[sentence for sentence in split_sentences(text) if sentence] for text in _texts(options)]
+    return measure(annotate_uncached, items, units=len, warmup=options["warmup"], memory_items=options["memory_items"])
+
+def finance_ner(options: dict) -> dict:
+    from pipelines.finance_ner import FinanceNERTipeline
+    pipeline = FinanceNERTipeline()
+    pipeline.model_name = options["ner_model"]
+    return measure(pipeline.extract_financial_entities, _texts(options, "finance"), units=_words, warmup=options["warmup"], memory_items=options["memory_items"])
+
+def legal_ner(options: dict) -> dict:
+    from pipelines.legal_ner import LegalNERPipeline
+    pipeline = LegalNERPipeline()
+    pipeline.model_name = options["ner_model"]
+    return measure(pipeline.extract_legal_entities, _texts(options, "legal"), units=_words, warmup=options["warmup"], memory_items=options["memory_items"])
+
+def zero_shot_classification(options: dict) -> dict:
+    from text_extraction import intelligent_chunking
+    from pipelines.classification import ClassificationPipeline
+    pipeline = ClassificationPipeline()
+    pipeline.model_name = options["zero_shot_model"]
+    items = []
+    for seed, text in enumerate(_texts(options)):
+        chunk_texts = intelligent_chunking(text)
+        items.append({"chunk_texts": chunk_texts, "embeddings": _fake_embeddings(chunk_texts, seed), "examples": []})
+    return measure(
+        lambda document: pipeline.classify_documents([document], CANDIDATE_LABELS), items,
+        units=lambda document: len(document["chunk_texts"]), warmup=options["warmup"], memory_items=options["memory_items"]
+    )
+
+def finance_risk_classifier(options: dict) -> dict:
+    from pipelines.finance_risk_classifier import FinanceRiskClassifierPipeline
+    pipeline = FinanceRiskClassifierPipeline()
+    pipeline.model_name = options["zero_shot_model"]
+    return measure(pipeline.classify_risk, _texts(options, "finance"), units=_words, warmup=options["warmup"], memory_items=options["memory_items"])
+
+# Cases in run order; the model-backed ones come last
+CASES = {
+    "chunking": chunking,
+    "template_detection": template_detection,
+    "finance_kpi_extractor": finance_kpi_extractor,
+    "legal_clause_extractor": legal_clause_extractor,
+    "tabular_processing": tabular_processing,
+    "topic_extraction": topic_extraction,
+    "ner": ner,
+    "finance_ner": finance_ner,
+    "legal_ner": legal_ner,
+    "zero_shot_classification": zero_shot_classification,
+    "finance_risk_classifier": finance_risk_classifier,
+}
+MODEL_CASES = {"ner", "finance_ner", "legal_ner", "zero_shot_classification", "finance_risk_classifier"}
@@ -0,0 +1,140 @@
+"""
+Deterministic synthetic corpus for the pipeline benchmarks.
+
+Documents mimic what the ingestion worker sees: Portuguese and English financial reports (KPI
+sentences, risk wording), contracts (CLÁUSULA headings, numbered sub-clauses, all-caps titles)
+and meeting notes (names, bullet points, action items). The same seed always produces the same
+corpus, so runs on one machine are comparable.
+"""
+import csv
+import io
+import random
+
+FILLER_PT = (
+    "a empresa registrou crescimento consistente no período com destaque para a expansão das operações "
+    "e a melhoria da eficiência operacional em todas as unidades de negócio além da redução de custos "
+    "administrativos e do fortalecimento da posição de caixa para investimentos futuros no mercado nacional"
+).split()
+FILLER_EN = (
+    "the company reported consistent growth during the period driven by the expansion of operations "
+    "and improved operating efficiency across all business units as well as lower administrative costs "
+    "and a stronger cash position for future investments in international markets"
+).split()
+
+KPI_SENTENCES = (
+    "A Receita Líquida de R$ {value} {scale} superou as expectativas no {period}.",
+    "O Lucro Bruto de R$ {value} {scale} refletiu a melhora de margens no {period}.",
+    "O EBITDA de R$ {value} {scale} foi o maior da série histórica no {period}.",
+    "Net Revenue of $ {value} {scale} was reported for {period}.",
+    "Gross Profit de USD {value} {scale} grew year over year in {period}.",
+)
+SCALES = ("milhões", "mil", "bilhões", "million", "billion", "")
+PERIODS = ("1T24", "2T24", "3T24", "4T24", "Q1 2024", "Q2 2024", "FY2023", "exercício de 2023")
+RISK_SENTENCES = (
+    "O contrato prevê multa de 2% em caso de atraso no pagamento.",
+    "Há risco de rescisão antecipada por violação das obrigações assumidas.",
+    "Any breach of covenant may trigger early termination and a penalty fee.",
+    "Non-compliance with reporting duties could result in regulatory sanctions.",
+)
+ORDINALS = ("PRIMEIRA", "SEGUNDA", "TERCEIRA", "QUARTA", "QUINTA", "SEXTA", "SÉTIMA", "OITAVA", "NONA", "DÉCIMA")
+CLAUSE_SUBJECTS = ("OBJETO", "PRAZO", "PREÇO", "PAGAMENTO", "RESCISÃO", "MULTA", "CONFIDENCIALIDADE", "FORO")
+PEOPLE = ("Maria Silva", "João Pereira", "Ana Costa", "John Smith", "Emily Johnson", "Carlos Souza")
+ORGANIZATIONS = ("Banco Central", "Petrobras", "Acme Corp", "Globex Inc", "Vale S.A.", "Itaú Unibanco")
+ACTION_ITEMS = (
+    "- {person} vai enviar o relatório revisado até sexta-feira.",
+    "- {person} will schedule a follow-up meeting with {organization} next week.",
+    "- Action: {person} to review the budget before 15/03/2024.",
+)
+
+def _filler(rng: random.Random, words: int, english: bool) -> str:
+    vocabulary = FILLER_EN if english else FILLER_PT
+    start = rng.randrange(len(vocabulary))
+    text = " ".join(vocabulary[(start + i) % len(vocabulary)] for i in range(words))
+    return text[0].upper() + text[1:] + "."
+
+def _amount(rng: random.Random, brazilian: bool) -> str:
+    integer, decimals = rng.randint(1, 999_999), rng.randint(0, 99)
+    grouped = f"{integer:,}"
+    return f"{grouped.replace(',', '.')},{decimals:02d}" if brazilian else f"{grouped}.{decimals:02d}"
+
+def finance_document(rng: random.Random, words: int) -> str:
+    english = rng.random() < 0.4
+    lines, written, section = ["# Relatório Financeiro" if not english else "# Financial Report"], 0, 1
+    while written < words:
+        if written == 0 or rng.random() < 0.15:
+            lines.append(f"{section}. {'Resultados' if not english else 'Results'} {section}")
+            section += 1
+        template = rng.choice(KPI_SENTENCES)
+        lines.append(template.format(value=_amount(rng, brazilian="R$" in template or "de USD" in template), scale=rng.choice(SCALES), period=rng.choice(PERIODS)))
+        if rng.random() < 0.2:
+            lines.append(rng.choice(RISK_SENTENCES))
+        paragraph = _filler(rng, rng.randint(30, 80), english)
+        lines.append(paragraph)
+        written += len(paragraph.split()) + 12
+    return "\n".join(lines)
+
+def legal_document(rng: random.Random, words: int) -> str:
+    lines, written, clause = ["CONTRATO DE PRESTAÇÃO DE SERVIÇOS"], 0, 0
+    while written < words:
+        ordinal = ORDINALS[clause % len(ORDINALS)] + ("" if clause < len(ORDINALS) else f" {clause // len(ORDINALS)}")
+        lines.append(f"CLÁUSULA {ordinal} – DO {rng.choice(CLAUSE_SUBJECTS)}")
+        for sub in range(1, rng.randint(2, 5)):
+            paragraph = _filler(rng, rng.randint(20, 60), english=False)
+            lines.append(f"{clause + 1}.{sub}. {paragraph}")
+            written += len(paragraph.split())
+        if rng.random() < 0.3:
+            lines.append(rng.choice(RISK_SENTENCES))
+        clause += 1
+    return "\n".join(lines)
+
+def notes_document(rng: random.Random, words: int) -> str:
+    english = rng.random() < 0.5
+    lines, written = ["## Meeting notes" if english else "## Ata de reunião"], 0
+    while written < words:
+        person, organization = rng.choice(PEOPLE), rng.choice(ORGANIZATIONS)
+        paragraph = f"{person} presented the update from {organization}. " if english else f"{person} apresentou a atualização da {organization}. "
+        paragraph += _filler(rng, rng.randint(20, 60), english)
+        lines.append(paragraph)
+        lines.append(rng.choice(ACTION_ITEMS).format(person=rng.choice(PEOPLE), organization=organization))
+        written += len(paragraph.split()) + 10
+    return "\n".join(lines)
+
+DOCUMENT_KINDS = {"finance": finance_document, "legal": legal_document, "notes": notes_document}
+
+def generate_documents(documents: int, words: int, seed: int = 42) -> list:
+    """
+    Returns `documents` dicts with `kind` and `text`, cycling through the document kinds. Each
+    document has roughly `words` words, varied by ±50% so latency percentiles are meaningful.
+    """
+    rng = random.Random(seed)
+    kinds = list(DOCUMENT_KINDS)
+    corpus = []
+    for i in range(documents):
+        kind = kinds[i % len(kinds)]
+        corpus.append({"kind": kind, "text": DOCUMENT_KINDS[kind](rng, max(int(words * rng.uniform(0.5, 1.5)), 10))})
+    return corpus
+
+def generate_table(rows: int, columns: int, seed: int = 42) -> bytes:
+    """
+    CSV table mixing float, integer, boolean and text columns, with a few outliers and blanks.
+    """
+    rng = random.Random(seed)
+    kinds = [("float", "int", "bool", "text")[i % 4] for i in range(columns)]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([f"{kind}_{i}" for i, kind in enumerate(kinds)])
+    for _ in range(rows):
+        row = []
+        for kind in kinds:
+            if rng.random() < 0.01:
+                row.append("")
+            elif kind == "float":
+                row.append(f"{rng.gauss(100.0, 15.0) + (500.0 if rng.random() < 0.001 else 0.0):.3f}")
+            elif kind == "int":
+                row.append(str(rng.randint(0, 10_000)))
+            elif kind == "bool":
+                row.append(rng.choice(("true", "false")))
+            else:
+                row.append(rng.choice(PEOPLE))
+        writer.writerow(row)
+    return buffer.getvalue().encode('utf-8')
@@ -0,0 +1,137 @@
+"""
+Measurement and baseline handling for the pipeline benchmarks.
+
+A case is timed item by item (one document, table or sentence batch per call) after a warm-up
+call, giving throughput and latency percentiles. Peak memory is measured in a second pass under
+tracemalloc, so its overhead does not distort the timings. Every case runs in a forked child
+process: the high-water RSS of that child is the case's peak RSS, and caches or models loaded by
+one case cannot speed up the next.
+"""
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import time
+import tracemalloc
+
+import numpy as np
+
+# Metrics compared against a baseline, and whether a higher value is better
+COMPARED_METRICS = {
+    "items_per_second": True,
+    "units_per_second": True,
+    "p50_ms": False,
+    "p99_ms": False,
+    "peak_python_mb": False,
+    "peak_rss_mb": False,
+}
+
+def machine_info() -> dict:
+    return {
+        "node": platform.node(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+    }
+
+def measure(fn, items: list, units=None, warmup: int = 1, memory_items: int = None) -> dict:
+    """
+    Calls `fn(item)` for every item. `units(item)` gives the work size of an item (words, rows...)
+    for the units_per_second figure. The first `warmup` items are first called once untimed, to
+    absorb model loading and first-call compilation, and then timed again in the main pass along
+    with every other item. A separate pass over the first `memory_items` items measures peak memory.
+    """
+    for item in items[:warmup]:
+        fn(item)
+
+    latencies = []
+    start = time.perf_counter()
+    for item in items:
+        item_start = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - item_start)
+    elapsed = time.perf_counter() - start
+
+    peak_python = 0
+    tracemalloc.start()
+    try:
+        for item in items[:memory_items or len(items)]:
+            tracemalloc.reset_peak()
+            fn(item)
+            peak_python = max(peak_python, tracemalloc.get_traced_memory()[1])
+    finally:
+        tracemalloc.stop()
+
+    latencies_ms = np.asarray(latencies) * 1000.0
+    total_units = sum(units(item) for item in items) if units else len(items)
+    return {
+        "items": len(items),
+        "seconds": elapsed,
+        "items_per_second": len(items) / max(elapsed, 1e-9),
+        "units_per_second": total_units / max(elapsed, 1e-9),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "max_ms": float(latencies_ms.max()),
+        "peak_python_mb": peak_python / (1024 * 1024),
+    }
+
+def _run_case_in_child(case, options: dict, queue):
+    try:
+        result = case(options)
+        # ru_maxrss is in kilobytes on Linux
+        result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        queue.put(result)
+    except Exception as e:
+        queue.put({"skipped": f"{type(e).__name__}: {e}"})
+
+def run_case(case, options: dict, isolate: bool = True) -> dict:
+    """
+    Runs `case(options)` (which returns the dict of measure()), in a forked child when possible.
+    A case that raises (e.g. a model that cannot be downloaded) is reported as skipped.
+    """
+    if not isolate or "fork" not in multiprocessing.get_all_start_methods():
+        try:
+            return case(options)
+        except Exception as e:
+            return {"skipped": f"{type(e).__name__}: {e}"}
+
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    child = context.Process(target=_run_case_in_child, args=(case, options, queue))
+    child.start()
+    child.join()
+    if child.exitcode != 0:
+        return {"skipped": f"case process exited with code {child.exitcode}"}
+    return queue.get()
+
+def load_baseline(path: str):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def save_baseline(path: str, report: dict):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding='utf-8') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Returns one message per metric that got worse than the baseline by more than `tolerance`
+    (a fraction). Cases missing on either side or skipped are ignored.
+    """
+    regressions = []
+    for name, result in report["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous or "skipped" in result or "skipped" in previous:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = previous.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+                regressions.append(f"{name}.{metric}: {old:.4f} -> {new:.4f} ({change:+.1%})")
+    return regressions
@@ -1,33 +1,42 @@
-import pika
 import os
 import sys
 import json
-import psycopg2
 from psycopg2 import sql
 from psycopg2.extras import Json
 
 from pipelines.temporal_analysis import temporal_analysis_pipeline
 from pipelines.template_detection import template_detection_pipeline
+from pipelines.template_creation import template_creation_pipeline
 from pipelines.feedback_analysis import feedback_analysis_pipeline
 from pipelines.retraining import retraining_pipeline
+from result_cache import result_cache
+from consumer_pool import ConsumerPool
+from db_pool import db_pool
+from blob_store import open_raw_file
+from text_extraction import iter_plain_text
+from watermarks import run_incremental, ANALYTICS_BLOB_BATCH_SIZE
+from instrumentation import JobMetrics, METRICS_PORT, metrics
 
 def get_db_connection():
-    return psycopg2.connect(
-        dbname=os.environ.get("POSTGRES_DB"),
-        user=os.environ.get("POSTGRES_USER"),
-        password=os.environ.get("POSTGRES_PASSWORD"),
-        host=os.environ.get("DB_HOST")
-    )
+    return db_pool.getconn()
 
 def run_temporal_analysis():
     conn = get_db_connection()
     try:
-        patterns = temporal_analysis_pipeline.detect_recurring_topics(conn)
-        if not patterns:
-            print("No new temporal patterns detected.")
-            return
+        touched_topics = set()
+
+        def update_stats(cur, rows):
+            touched_topics.update(temporal_analysis_pipeline.update_topic_stats(cur, rows))
+
+        new_topics = run_incremental(conn, "temporal_analysis", temporal_analysis_pipeline.new_topics_query, update_stats)
+        print(f"Folded {new_topics} new topic occurrences into {len(touched_topics)} topic statistics.")
 
         with conn.cursor() as cur:
+            patterns = temporal_analysis_pipeline.detect_recurring_topics(cur, touched_topics)
+            if not patterns:
+                print("No new temporal patterns detected.")
+                return
+
             for pattern in patterns:
                 cur.execute(
                     sql.SQL("""
@@ -46,42 +55,44 @@ def run_temporal_analysis():
         print(f"Error during temporal analysis: {e}")
         conn.rollback()
     finally:
-        conn.close()
+        db_pool.putconn(conn)
+
+# Versions created after the watermark that still have no structure; blobs are read one at a time
+PENDING_STRUCTURES_QUERY = """
+    SELECT pv.created_at, pv.id
+    FROM processing_versions pv
+    JOIN raw_files rf ON pv.id = rf.processing_version_id
+    LEFT JOIN document_structures ds ON pv.id = ds.processing_version_id
+    WHERE (pv.created_at, pv.id) > (%(after_created_at)s, %(after_id)s) AND pv.created_at < %(before_created_at)s
+    AND ds.id IS NULL AND rf.mime_type NOT LIKE '%%csv%%' AND rf.mime_type NOT LIKE '%%spreadsheet%%'
+    ORDER BY pv.created_at, pv.id
+    LIMIT %(limit)s;
+"""
 
 def run_template_detection():
     conn = get_db_connection()
     try:
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT pv.id, rf.content
-                FROM processing_versions pv
-                JOIN raw_files rf ON pv.id = rf.processing_version_id
-                LEFT JOIN document_structures ds ON pv.id = ds.processing_version_id
-                WHERE ds.id IS NULL AND rf.mime_type NOT LIKE '%%csv%%' AND rf.mime_type NOT LIKE '%%spreadsheet%%';
-            """)
-            
-            versions_to_process = cur.fetchall()
-            if not versions_to_process:
-                print("No new document structures to detect.")
-                return
-
-            count = 0
-            for version_id, content_bytes in versions_to_process:
-                text = content_bytes.decode('utf-8', errors='ignore')
+        def detect_structures(cur, rows):
+            for _, version_id in rows:
+                with open_raw_file(cur, version_id) as raw_file:
+                    text = "".join(iter_plain_text(raw_file.source))
                 result = template_detection_pipeline.extract_features(text)
+                # The ingestion worker may have stored the structure since the batch was read
                 cur.execute(
-                    sql.SQL("INSERT INTO document_structures (id, processing_version_id, features, structure_hash) VALUES (gen_random_uuid(), %s, %s, %s)"),
+                    sql.SQL("INSERT INTO document_structures (id, processing_version_id, features, structure_hash) VALUES (gen_random_uuid(), %s, %s, %s) ON CONFLICT (processing_version_id) DO NOTHING"),
                     (version_id, Json(result['features']), result['structure_hash'])
                 )
-                count += 1
 
-            conn.commit()
-            print(f"Processed and saved {count} document structures.")
+        count = run_incremental(conn, "template_detection", PENDING_STRUCTURES_QUERY, detect_structures, batch_size=ANALYTICS_BLOB_BATCH_SIZE)
+        if not count:
+            print("No new document structures to detect.")
+            return
+        print(f"Processed and saved {count} document structures.")
     except Exception as e:
         print(f"Error during template detection: {e}")
         conn.rollback()
     finally:
-        conn.close()
+        db_pool.putconn(conn)
 
 def run_feedback_analysis():
     conn = get_db_connection()
@@ -115,7 +126,7 @@ def run_feedback_analysis():
         print(f"Error during feedback analysis: {e}")
         conn.rollback()
     finally:
-        conn.close()
+        db_pool.putconn(conn)
 
 def run_template_creation():
     conn = get_db_connection()
@@ -128,7 +139,7 @@ def run_template_creation():
     except Exception as e:
         print(f"Error during template creation: {e}")
     finally:
-        conn.close()
+        db_pool.putconn(conn)
 
 def run_retraining_job():
     conn = get_db_connection()
@@ -137,43 +148,69 @@ def run_retraining_job():
     except Exception as e:
         print(f"Error during retraining job simulation: {e}")
     finally:
-        conn.close()
+        db_pool.putconn(conn)
 
-def main():
-    rabbitmq_host = os.environ.get('RABBITMQ_HOST', 'rabbitmq')
-    connection = pika.BlockingConnection(pika.ConnectionParameters(host=rabbitmq_host))
-    channel = connection.channel()
-    
-    queue_name = 'analytics_queue'
-    channel.queue_declare(queue=queue_name, durable=True)
+def run_result_cache_invalidation(scope: str):
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            removed = result_cache.invalidate(cur, scope)
+            conn.commit()
+        print(f"Invalidated {removed} result cache entries (scope: {scope}, current pipeline version: {result_cache.pipeline_version}).")
+    except Exception as e:
+        print(f"Error during result cache invalidation: {e}")
+        conn.rollback()
+    finally:
+        db_pool.putconn(conn)
 
-    def callback(ch, method, properties, body):
-        try:
-            message = json.loads(body.decode('utf-8'))
-            print(f"Received analytics job: {message}")
-            
-            job_type = message.get("job_type")
-            if job_type == "detect_temporal_patterns":
-                run_temporal_analysis()
-            elif job_type == "detect_document_structures":
-                run_template_detection()
-            elif job_type == "analyze_feedback":
-                run_feedback_analysis()
-            elif job_type == "create_templates":
-                run_template_creation()
-            elif job_type == "trigger_retraining":
-                run_retraining_job()
-            else:
-                print(f"Unknown job type: {job_type}")
+def parse_analytics_message(body: bytes):
+    try:
+        return json.loads(body.decode('utf-8'))
+    except Exception as e:
+        print(f"Failed to decode analytics message: {e}")
+        return None
+
+def run_analytics_job(message: dict):
+    job_type = message.get("job_type")
+    if job_type == "detect_temporal_patterns":
+        run_temporal_analysis()
+    elif job_type == "detect_document_structures":
+        run_template_detection()
+    elif job_type == "analyze_feedback":
+        run_feedback_analysis()
+    elif job_type == "create_templates":
+        run_template_creation()
+    elif job_type == "trigger_retraining":
+        run_retraining_job()
+    elif job_type == "invalidate_result_cache":
+        run_result_cache_invalidation(message.get("scope", "stale"))
+    else:
+        print(f"Unknown job type: {job_type}")
 
+def handle_analytics_batch(messages: list, on_complete):
+    for message in messages:
+        print(f"Received analytics job: {message}")
+        job_metrics = JobMetrics("analytics_queue", message.get("published_at_ms"), job_type=message.get("job_type"))
+        try:
+            with job_metrics.span(str(message.get("job_type"))):
+                run_analytics_job(message)
         except Exception as e:
             print(f"Failed to process analytics job: {e}")
-        
-        ch.basic_ack(delivery_tag=method.delivery_tag)
+            job_metrics.status = "failed"
+        job_metrics.finish()
+        print(f"Database pool: {db_pool.stats()}")
+        on_complete(message)
 
-    channel.basic_consume(queue=queue_name, on_message_callback=callback)
-    print('Analytics worker started. Waiting for analytics jobs.')
-    channel.start_consuming()
+def main():
+    rabbitmq_host = os.environ.get('RABBITMQ_HOST', 'rabbitmq')
+    metrics.serve(METRICS_PORT)
+    # Analytics jobs scan whole tables, so the queue defaults to one job at a time;
+    # ANALYTICS_QUEUE_CONCURRENCY / ANALYTICS_QUEUE_PREFETCH raise it.
+    db_pool.warm_up()
+    try:
+        ConsumerPool(rabbitmq_host, 'analytics_queue', handle_analytics_batch, parse_analytics_message).run()
+    finally:
+        db_pool.closeall()
 
 if __name__ == '__main__':
     try:
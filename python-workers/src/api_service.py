@@ -1,20 +1,125 @@
 from fastapi import FastAPI
 from pydantic import BaseModel
-from sentence_transformers import SentenceTransformer
+from typing import Literal, Optional
+import asyncio
+import base64
+import os
+import numpy as np
+from pipelines.model_registry import model_registry
+from embedding_cache import EmbeddingCache
+
+# Concurrent /vectorize requests arriving within this window are encoded together in one call.
+VECTORIZE_BATCH_WINDOW_MS = int(os.environ.get("VECTORIZE_BATCH_WINDOW_MS", "5"))
+VECTORIZE_MAX_BATCH_SIZE = int(os.environ.get("VECTORIZE_MAX_BATCH_SIZE", "64"))
 
 app = FastAPI()
-embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+embedding_model = model_registry.get_known("embedding")
+embedding_cache = EmbeddingCache(embedding_model, "all-MiniLM-L6-v2")
+
+VectorEncoding = Literal["json", "base64-float32", "base64-float16"]
 
 class VectorizeRequest(BaseModel):
     text: str
+    encoding: VectorEncoding = "json"
 
 class VectorizeResponse(BaseModel):
-    vector: list[float]
+    vector: Optional[list[float]] = None
+    vector_b64: Optional[str] = None
+    dtype: Optional[str] = None
+
+class VectorizeBatchRequest(BaseModel):
+    texts: list[str]
+    encoding: VectorEncoding = "json"
+
+class VectorizeBatchResponse(BaseModel):
+    vectors: Optional[list[list[float]]] = None
+    vectors_b64: Optional[list[str]] = None
+    dtype: Optional[str] = None
+    dimension: int
+
+def encode_vector(vector: np.ndarray, encoding: str) -> dict:
+    """
+    Renders a vector either as a JSON float list or as base64 little-endian float32/float16 bytes.
+    """
+    if encoding == "json":
+        return {"vector": vector.tolist()}
+    dtype = "float16" if encoding == "base64-float16" else "float32"
+    raw_bytes = vector.astype(np.dtype(dtype).newbyteorder('<')).tobytes()
+    return {"vector_b64": base64.b64encode(raw_bytes).decode('ascii'), "dtype": dtype}
+
+class DynamicBatcher:
+    """
+    Coalesces concurrent single-text requests into one encode call. The first queued request
+    opens a window of `window_ms`; everything queued before it closes (up to `max_batch_size`)
+    is encoded together on a worker thread, keeping the event loop free.
+    """
+    def __init__(self, encode_fn, max_batch_size: int, window_ms: int):
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.window_seconds = window_ms / 1000.0
+        self._queue = None
+        self._task = None
 
-@app.post("/vectorize", response_model=VectorizeResponse)
-def vectorize(request: VectorizeRequest):
+    async def submit(self, text: str) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run())
+        future = loop.create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window_seconds
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                vectors = await loop.run_in_executor(None, self.encode_fn, [text for text, _ in batch])
+                for (_, future), vector in zip(batch, vectors):
+                    if not future.done():
+                        future.set_result(vector)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+vectorize_batcher = DynamicBatcher(embedding_cache.encode, VECTORIZE_MAX_BATCH_SIZE, VECTORIZE_BATCH_WINDOW_MS)
+
+@app.post("/vectorize", response_model=VectorizeResponse, response_model_exclude_none=True)
+async def vectorize(request: VectorizeRequest):
     """
     Receives a text string and returns its 384-dimension embedding vector.
+    Concurrent requests are batched into a single model call.
+    """
+    vector = await vectorize_batcher.submit(request.text)
+    return VectorizeResponse(**encode_vector(vector, request.encoding))
+
+@app.post("/vectorize/batch", response_model=VectorizeBatchResponse, response_model_exclude_none=True)
+async def vectorize_batch(request: VectorizeBatchRequest):
+    """
+    Receives a list of texts and returns their embedding vectors in the same order.
+    """
+    vectors = await asyncio.get_running_loop().run_in_executor(None, embedding_cache.encode, request.texts)
+    dimension = embedding_model.get_sentence_embedding_dimension()
+    if request.encoding == "json":
+        return VectorizeBatchResponse(vectors=[vector.tolist() for vector in vectors], dimension=dimension)
+    encoded = [encode_vector(vector, request.encoding) for vector in vectors]
+    dtype = "float16" if request.encoding == "base64-float16" else "float32"
+    return VectorizeBatchResponse(vectors_b64=[item["vector_b64"] for item in encoded], dtype=dtype, dimension=dimension)
+
+@app.get("/metrics/embedding-cache")
+def embedding_cache_metrics():
+    """
+    Returns hit/miss counters and the hit rate of the embedding cache.
     """
-    vector = embedding_model.encode(request.text)
-    return VectorizeResponse(vector=vector.tolist())
\ No newline at end of file
+    return embedding_cache.stats()
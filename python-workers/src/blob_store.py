@@ -0,0 +1,85 @@
+import os
+import tempfile
+from psycopg2 import sql
+
+from result_cache import content_hasher
+
+# Blobs up to RAW_BLOB_MEMORY_LIMIT bytes are read in one query; larger ones are copied in
+# RAW_BLOB_READ_SIZE slices into a temp file under RAW_BLOB_SPOOL_DIR, so at most one slice is
+# held in Python memory and the extractors read the file from disk. Content still stored
+# compressed (rows older than migration 025 that 029 has not rewritten) is always read in one
+# query, since every slice of a compressed value decompresses it from the start.
+RAW_BLOB_MEMORY_LIMIT = int(os.environ.get("RAW_BLOB_MEMORY_LIMIT", str(16 * 1024 * 1024)))
+RAW_BLOB_READ_SIZE = int(os.environ.get("RAW_BLOB_READ_SIZE", str(4 * 1024 * 1024)))
+RAW_BLOB_SPOOL_DIR = os.environ.get("RAW_BLOB_SPOOL_DIR") or None
+
+class RawBlob:
+    """
+    The raw file of a processing version. `source` is either the content as bytes (small files) or
+    the path of a spooled temp file; text and tabular extractors accept both. The temp file is
+    removed on close().
+    """
+    def __init__(self, file_name: str, mime_type: str, size: int, content_hash: str, content: bytes = None, path: str = None):
+        self.file_name = file_name
+        self.mime_type = mime_type
+        self.size = size
+        self.content_hash = content_hash
+        self._content = content
+        self.path = path
+
+    @property
+    def source(self):
+        return self._content if self._content is not None else self.path
+
+    def close(self):
+        if self.path and os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def _spool(cur, processing_version_id, size: int, digest, suffix: str) -> str:
+    fd, path = tempfile.mkstemp(prefix="raw_blob_", suffix=suffix, dir=RAW_BLOB_SPOOL_DIR)
+    try:
+        with os.fdopen(fd, "wb") as spool:
+            # bytea substring is 1-based; with EXTERNAL storage only the requested slice is read
+            for offset in range(1, size + 1, RAW_BLOB_READ_SIZE):
+                cur.execute(
+                    sql.SQL("SELECT substring(content FROM %s FOR %s) FROM raw_files WHERE processing_version_id = %s"),
+                    (offset, RAW_BLOB_READ_SIZE, processing_version_id)
+                )
+                piece = cur.fetchone()[0]
+                digest.update(piece)
+                spool.write(piece)
+                del piece
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+def open_raw_file(cur, processing_version_id):
+    """
+    Loads the raw file of a processing version as a RawBlob, streaming large content to disk.
+    Returns None when the version has no raw file.
+    """
+    cur.execute(
+        sql.SQL("SELECT file_name, mime_type, octet_length(content), pg_column_compression(content) IS NOT NULL FROM raw_files WHERE processing_version_id = %s"),
+        (processing_version_id,)
+    )
+    row = cur.fetchone()
+    if not row:
+        return None
+
+    file_name, mime_type, size, compressed = row
+    digest = content_hasher(mime_type)
+    if size <= RAW_BLOB_MEMORY_LIMIT or compressed:
+        cur.execute(sql.SQL("SELECT content FROM raw_files WHERE processing_version_id = %s"), (processing_version_id,))
+        content = bytes(cur.fetchone()[0])
+        digest.update(content)
+        return RawBlob(file_name, mime_type, size, digest.hexdigest(), content=content)
+
+    path = _spool(cur, processing_version_id, size, digest, os.path.splitext(file_name)[1])
+    return RawBlob(file_name, mime_type, size, digest.hexdigest(), path=path)
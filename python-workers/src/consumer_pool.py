@@ -0,0 +1,166 @@
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import os
+import signal
+import threading
+import pika
+
+RABBITMQ_HEARTBEAT = int(os.environ.get("RABBITMQ_HEARTBEAT", "60"))
+
+def queue_setting(queue_name: str, setting: str, default: int) -> int:
+    """
+    Reads a per-queue setting such as INGESTION_QUEUE_CONCURRENCY or ANALYTICS_QUEUE_PREFETCH.
+    """
+    return int(os.environ.get(f"{queue_name.upper()}_{setting}", default))
+
+class ConsumerPool:
+    """
+    Consumes one queue with `concurrency` handler threads. The connection's I/O loop stays on the
+    calling thread, so heartbeats keep flowing while handlers run long inference, and acks are
+    marshalled back to it with add_callback_threadsafe. Messages are grouped into batches of up to
+    `batch_size` (waiting at most `batch_wait_ms` for a batch to fill) before being handed to
+    `handle_batch(jobs, on_complete)`, which must call `on_complete(job)` once each job is done.
+    On SIGTERM/SIGINT the pool stops consuming, drains in-flight jobs and closes the connection.
+    """
+    def __init__(self, rabbitmq_host: str, queue_name: str, handle_batch, parse_message,
+                 concurrency: int = None, prefetch: int = None, batch_size: int = 1, batch_wait_ms: int = 200):
+        self.rabbitmq_host = rabbitmq_host
+        self.queue_name = queue_name
+        self.handle_batch = handle_batch
+        self.parse_message = parse_message
+        self.concurrency = concurrency or queue_setting(queue_name, "CONCURRENCY", 1)
+        self.batch_size = max(batch_size, 1)
+        self.prefetch = prefetch or queue_setting(queue_name, "PREFETCH", self.concurrency * self.batch_size)
+        self.batch_wait_seconds = batch_wait_ms / 1000.0
+        self._buffer = []
+        self._in_flight = 0
+        self._stopping = False
+        self._executor = None
+        self.connection = None
+        self.channel = None
+        self.consumer_tag = None
+
+    def run(self):
+        connection_params = pika.ConnectionParameters(host=self.rabbitmq_host, heartbeat=RABBITMQ_HEARTBEAT, connection_attempts=10, retry_delay=5)
+        self.connection = pika.BlockingConnection(connection_params)
+        self.channel = self.connection.channel()
+        self.channel.queue_declare(queue=self.queue_name, durable=True)
+        self.channel.basic_qos(prefetch_count=self.prefetch)
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=f"{self.queue_name}-consumer")
+        self.consumer_tag = self.channel.basic_consume(queue=self.queue_name, on_message_callback=self._on_message)
+
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self._on_signal)
+            signal.signal(signal.SIGINT, self._on_signal)
+
+        print(f"Consuming {self.queue_name} with {self.concurrency} handler threads (prefetch {self.prefetch}, batch size {self.batch_size}).")
+        while not (self._stopping and not self._in_flight and not self._buffer):
+            self.connection.process_data_events(time_limit=1)
+
+        self._executor.shutdown(wait=True)
+        self.connection.close()
+        print(f"Stopped consuming {self.queue_name}; all in-flight jobs finished.")
+
+    def _on_signal(self, signum, frame):
+        self.stop()
+
+    def stop(self):
+        if self._stopping:
+            return
+        self._stopping = True
+        print(f"Shutting down {self.queue_name} consumer: draining {self._in_flight + len(self._buffer)} in-flight jobs.")
+        self.connection.add_callback_threadsafe(self._cancel_and_flush)
+
+    def _cancel_and_flush(self):
+        if self.consumer_tag is not None:
+            self.channel.basic_cancel(self.consumer_tag)
+            self.consumer_tag = None
+        self._flush()
+
+    def _on_message(self, ch, method, properties, body):
+        job = self.parse_message(body)
+        if job is None:
+            ch.basic_ack(delivery_tag=method.delivery_tag)
+            return
+        job['delivery_tag'] = method.delivery_tag
+        self._buffer.append(job)
+        if len(self._buffer) >= self.batch_size:
+            self._flush()
+        elif len(self._buffer) == 1:
+            self.connection.call_later(self.batch_wait_seconds, self._flush)
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        jobs, self._buffer = self._buffer, []
+        self._in_flight += len(jobs)
+        self._executor.submit(self._run_batch, jobs)
+
+    def _run_batch(self, jobs: list):
+        acked = set()
+
+        def on_complete(job):
+            acked.add(job['delivery_tag'])
+            self.connection.add_callback_threadsafe(functools.partial(self._ack, job['delivery_tag']))
+
+        try:
+            self.handle_batch(jobs, on_complete)
+        except Exception as e:
+            print(f"Failed to process batch of {len(jobs)} jobs from {self.queue_name}: {e}")
+        finally:
+            # Jobs the handler never reported are acked as well, matching the one-shot delivery semantics
+            for job in jobs:
+                if job['delivery_tag'] not in acked:
+                    on_complete(job)
+
+    def _ack(self, delivery_tag):
+        self.channel.basic_ack(delivery_tag=delivery_tag)
+        self._in_flight -= 1
+
+def run_worker_processes(target, processes: int):
+    """
+    Supervisor mode: forks `processes` children that each run `target(slot)`, slot being the
+    child's index (kept when it is restarted). Models loaded before the call are shared
+    copy-on-write. Children that die are restarted; SIGTERM/SIGINT is forwarded to the children,
+    which drain their in-flight jobs before exiting.
+    """
+    children = {}  # pid -> slot
+    stopping = False
+
+    def spawn(slot):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                target(slot)
+            finally:
+                os._exit(0)
+        children[pid] = slot
+
+    def on_signal(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+
+    for slot in range(processes):
+        spawn(slot)
+    print(f"Supervisor started {processes} worker processes: {sorted(children)}")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        slot = children.pop(pid, None)
+        if not stopping and slot is not None:
+            print(f"Worker process {pid} exited with status {status}; restarting it.")
+            spawn(slot)
+    print("Supervisor stopped: all worker processes exited.")
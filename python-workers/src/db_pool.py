@@ -0,0 +1,182 @@
+import os
+import threading
+import time
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+
+# At most DB_POOL_MAX_SIZE connections are open per process; a checkout waits up to
+# DB_POOL_CHECKOUT_TIMEOUT_S for one to be returned. Idle connections older than
+# DB_POOL_HEALTH_CHECK_INTERVAL_S are probed with SELECT 1 before being handed out. Workers open
+# DB_POOL_MIN_SIZE connections before consuming and close the idle ones when they stop.
+DB_POOL_MIN_SIZE = int(os.environ.get("DB_POOL_MIN_SIZE", "0"))
+DB_POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", "4"))
+DB_POOL_CHECKOUT_TIMEOUT_S = float(os.environ.get("DB_POOL_CHECKOUT_TIMEOUT_S", "30"))
+DB_POOL_HEALTH_CHECK_INTERVAL_S = float(os.environ.get("DB_POOL_HEALTH_CHECK_INTERVAL_S", "30"))
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections. Connections are created lazily, checked for health on
+    checkout and replaced when broken. A pool inherited through fork() drops the parent's
+    connections and starts empty in the child.
+    """
+    def __init__(self, min_size: int = DB_POOL_MIN_SIZE, max_size: int = DB_POOL_MAX_SIZE,
+                 checkout_timeout: float = DB_POOL_CHECKOUT_TIMEOUT_S, health_check_interval: float = DB_POOL_HEALTH_CHECK_INTERVAL_S):
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._available = threading.Semaphore(self.max_size)
+        self._idle = []  # (connection, returned_at)
+        self._in_use = set()
+        self._checkouts = 0
+        self._wait_seconds_total = 0.0
+        self._wait_seconds_max = 0.0
+        self._timeouts = 0
+        self._connects = 0
+        self._reconnects = 0
+
+    def _connect(self):
+        conn = psycopg2.connect(
+            dbname=os.environ.get("POSTGRES_DB"),
+            user=os.environ.get("POSTGRES_USER"),
+            password=os.environ.get("POSTGRES_PASSWORD"),
+            host=os.environ.get("DB_HOST")
+        )
+        with self._lock:
+            self._connects += 1
+        return conn
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._reset()
+
+    def _is_healthy(self, conn, idle_since: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def warm_up(self):
+        with self._lock:
+            missing = self.min_size - len(self._idle) - len(self._in_use)
+        for _ in range(max(missing, 0)):
+            conn = self._connect()
+            with self._lock:
+                self._idle.append((conn, time.monotonic()))
+
+    def ensure_capacity(self, size: int):
+        """
+        Grows the pool to at least `size` connections, e.g. so that every job of a concurrently
+        processed batch can hold its own connection. The pool never shrinks.
+        """
+        with self._lock:
+            extra = size - self.max_size
+            if extra <= 0:
+                return
+            self.max_size = size
+        for _ in range(extra):
+            self._available.release()
+
+    def getconn(self):
+        self._check_fork()
+        start = time.monotonic()
+        if not self._available.acquire(timeout=self.checkout_timeout):
+            with self._lock:
+                self._timeouts += 1
+            raise PoolError(f"No database connection available after {self.checkout_timeout}s ({self.max_size} in use)")
+        waited = time.monotonic() - start
+
+        try:
+            conn = None
+            while conn is None:
+                with self._lock:
+                    idle = self._idle.pop() if self._idle else None
+                if idle is None:
+                    conn = self._connect()
+                elif self._is_healthy(*idle):
+                    conn = idle[0]
+                else:
+                    self._close_quietly(idle[0])
+                    with self._lock:
+                        self._reconnects += 1
+        except BaseException:
+            self._available.release()
+            raise
+
+        with self._lock:
+            self._in_use.add(conn)
+            self._checkouts += 1
+            self._wait_seconds_total += waited
+            self._wait_seconds_max = max(self._wait_seconds_max, waited)
+        return conn
+
+    def putconn(self, conn, discard: bool = False):
+        """
+        Returns a connection to the pool. Connections that are closed, broken or explicitly
+        discarded are closed instead, and an open transaction is rolled back before reuse.
+        """
+        with self._lock:
+            if conn not in self._in_use:
+                return
+            self._in_use.discard(conn)
+        try:
+            if not discard and not conn.closed:
+                status = conn.info.transaction_status
+                if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                    discard = True
+                elif status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+        except psycopg2.Error:
+            discard = True
+
+        if discard or conn.closed:
+            self._close_quietly(conn)
+        else:
+            with self._lock:
+                self._idle.append((conn, time.monotonic()))
+        self._available.release()
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_use = len(self._in_use)
+            return {
+                "max_size": self.max_size,
+                "in_use": in_use,
+                "idle": len(self._idle),
+                "utilization": round(in_use / self.max_size, 3) if self.max_size else 0.0,
+                "checkouts": self._checkouts,
+                "wait_ms_avg": round(1000.0 * self._wait_seconds_total / self._checkouts, 2) if self._checkouts else 0.0,
+                "wait_ms_max": round(1000.0 * self._wait_seconds_max, 2),
+                "timeouts": self._timeouts,
+                "connects": self._connects,
+                "reconnects": self._reconnects,
+            }
+
+    def closeall(self):
+        with self._lock:
+            for conn, _ in self._idle:
+                self._close_quietly(conn)
+            self._idle = []
+
+db_pool = ConnectionPool()
@@ -0,0 +1,205 @@
+import atexit
+from collections import OrderedDict
+from contextlib import contextmanager
+import fcntl
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+import numpy as np
+from instrumentation import model_call
+
+EMBEDDING_CACHE_SIZE = int(os.environ.get("EMBEDDING_CACHE_SIZE", "20000"))
+# Optional second tier: a directory holding memory-mapped float32 vectors. Empty disables it.
+EMBEDDING_CACHE_DIR = os.environ.get("EMBEDDING_CACHE_DIR", "")
+EMBEDDING_CACHE_DISK_CAPACITY = int(os.environ.get("EMBEDDING_CACHE_DISK_CAPACITY", "500000"))
+# The on-disk tier is synced at most this often (and at exit), not after every batch of misses.
+EMBEDDING_CACHE_FLUSH_SECONDS = float(os.environ.get("EMBEDDING_CACHE_FLUSH_SECONDS", "30"))
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+def normalize_text(text: str) -> str:
+    return WHITESPACE_PATTERN.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+class DiskEmbeddingStore:
+    """
+    Fixed-capacity ring of float32 vectors in a memory-mapped file, shared by every process
+    using the same directory. Each slot also stores the key digest it was written for, and reads
+    verify it, so a slot overwritten by another process reads as a miss instead of a wrong vector.
+    The slot cursor lives in a mapped file too, and writers take an exclusive file lock to claim
+    slots, so concurrent workers never hand out the same slot twice. A lookup that misses the
+    local index first indexes the slots other processes wrote since the last scan.
+    """
+    DIGEST_SIZE = 20
+
+    def __init__(self, directory: str, dimension: int, capacity: int, flush_seconds: float = EMBEDDING_CACHE_FLUSH_SECONDS):
+        os.makedirs(directory, exist_ok=True)
+        self.dimension = dimension
+        self.capacity = capacity
+        self.flush_seconds = flush_seconds
+        self._lock_file = open(os.path.join(directory, "lock"), "a+")
+        with self._locked(fcntl.LOCK_EX):
+            meta_path = os.path.join(directory, "meta.json")
+            meta = {}
+            if os.path.exists(meta_path):
+                with open(meta_path) as meta_file:
+                    meta = json.load(meta_file)
+            # Layout 2 stores keys as raw bytes; layout 1 (S20 strings) lost digests ending in NUL
+            expected = {"dimension": dimension, "capacity": capacity, "layout": 2}
+            mode = "r+" if meta == expected else "w+"
+            self.vectors = np.memmap(os.path.join(directory, "vectors.f32"), dtype=np.float32, mode=mode, shape=(capacity, dimension))
+            self.keys = np.memmap(os.path.join(directory, "keys.bin"), dtype=np.uint8, mode=mode, shape=(capacity, self.DIGEST_SIZE))
+            self.cursor = np.memmap(os.path.join(directory, "cursor.bin"), dtype=np.uint64, mode=mode, shape=(1,))
+            if mode == "w+":
+                with open(meta_path, "w") as meta_file:
+                    json.dump(expected, meta_file)
+        # An all-zero row is an empty slot
+        self.index = {self.keys[slot].tobytes(): int(slot) for slot in np.flatnonzero(self.keys.any(axis=1))}
+        self.scanned = int(self.cursor[0])
+        self.last_flush = time.monotonic()
+        atexit.register(self.flush)
+
+    @contextmanager
+    def _locked(self, operation):
+        fcntl.flock(self._lock_file, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _scan_new_slots(self):
+        """
+        Indexes the slots claimed since the last scan, by this or another process. Returns whether
+        there was anything new.
+        """
+        if int(self.cursor[0]) == self.scanned:
+            return False
+        with self._locked(fcntl.LOCK_SH):
+            cursor = int(self.cursor[0])
+            slots = np.arange(max(self.scanned, cursor - self.capacity), cursor) % self.capacity
+            for slot, key in zip(slots.tolist(), self.keys[slots]):
+                if key.any():
+                    self.index[key.tobytes()] = slot
+            self.scanned = cursor
+        return True
+
+    def get(self, digest: bytes):
+        slot = self.index.get(digest)
+        if slot is None and self._scan_new_slots():
+            slot = self.index.get(digest)
+        if slot is None or self.keys[slot].tobytes() != digest:
+            return None
+        vector = np.array(self.vectors[slot])
+        # A writer clears the key before replacing the vector, so a second check catches a
+        # vector that was being overwritten while it was copied
+        if self.keys[slot].tobytes() != digest:
+            self.index.pop(digest, None)
+            return None
+        return vector
+
+    def put_many(self, items: list):
+        """
+        Writes (digest, vector) pairs to consecutive slots, claimed under the file lock.
+        """
+        if not items:
+            return
+        with self._locked(fcntl.LOCK_EX):
+            first = int(self.cursor[0])
+            self.cursor[0] = first + len(items)
+            for offset, (digest, vector) in enumerate(items):
+                slot = (first + offset) % self.capacity
+                self.index.pop(self.keys[slot].tobytes(), None)
+                self.keys[slot] = 0
+                self.vectors[slot] = vector
+                self.keys[slot] = np.frombuffer(digest, dtype=np.uint8)
+                self.index[digest] = slot
+        if time.monotonic() - self.last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        # Other processes see writes through the shared mapping at once; flushing only makes them durable
+        self.vectors.flush()
+        self.keys.flush()
+        self.cursor.flush()
+        self.last_flush = time.monotonic()
+
+class EmbeddingCache:
+    """
+    Memoizes `model.encode` by a hash of the normalized text: an in-process LRU tier backed by an
+    optional on-disk tier. `encode` is a drop-in for SentenceTransformer.encode on a string or a list.
+    """
+    def __init__(self, model, model_name: str, max_entries=EMBEDDING_CACHE_SIZE, disk_dir=EMBEDDING_CACHE_DIR, disk_capacity=EMBEDDING_CACHE_DISK_CAPACITY):
+        self.model = model
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+        if disk_dir:
+            self._disk = DiskEmbeddingStore(os.path.join(disk_dir, model_name.replace('/', '_')), model.get_sentence_embedding_dimension(), disk_capacity)
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _digest(self, text: str) -> bytes:
+        return hashlib.sha1(f"{self.model_name}\0{normalize_text(text)}".encode('utf-8')).digest()
+
+    def _remember(self, digest: bytes, vector: np.ndarray):
+        self._memory[digest] = vector
+        self._memory.move_to_end(digest)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def encode(self, texts, **kwargs) -> np.ndarray:
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        digests = [self._digest(text) for text in texts]
+        vectors = [None] * len(texts)
+        missing = OrderedDict()
+
+        with self._lock:
+            for i, digest in enumerate(digests):
+                vector = self._memory.get(digest)
+                if vector is not None:
+                    self._memory.move_to_end(digest)
+                    self.memory_hits += 1
+                elif self._disk is not None and (vector := self._disk.get(digest)) is not None:
+                    self._remember(digest, vector)
+                    self.disk_hits += 1
+                else:
+                    missing.setdefault(digest, []).append(i)
+                    self.misses += 1
+                    continue
+                vectors[i] = vector
+
+        if missing:
+            with model_call(self.model_name):
+                encoded = self.model.encode([texts[positions[0]] for positions in missing.values()], **kwargs)
+            with self._lock:
+                written = []
+                for (digest, positions), vector in zip(missing.items(), encoded):
+                    vector = np.asarray(vector, dtype=np.float32)
+                    self._remember(digest, vector)
+                    written.append((digest, vector))
+                    for i in positions:
+                        vectors[i] = vector
+                if self._disk is not None:
+                    self._disk.put_many(written)
+
+        if single:
+            return vectors[0]
+        return np.stack(vectors) if vectors else np.empty((0, self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_entries": len(self._disk.index) if self._disk is not None else 0,
+        }
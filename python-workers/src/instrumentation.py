@@ -0,0 +1,189 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import threading
+import time
+
+# JOB_METRICS_LOG prints one JSON line per job with its stage timings and counters. METRICS_PORT
+# (unset = disabled) serves the aggregated histograms in Prometheus text format on /metrics.
+JOB_METRICS_LOG = os.environ.get("JOB_METRICS_LOG", "true").lower() == "true"
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 900.0)
+# Documents are bucketed by raw file size so stage latency can be read per document size
+SIZE_CLASSES = ((64 << 10, "xs"), (512 << 10, "s"), (4 << 20, "m"), (32 << 20, "l"))
+
+def size_class(size_bytes: int) -> str:
+    return next((label for limit, label in SIZE_CLASSES if size_bytes <= limit), "xl")
+
+def escape_label_value(value) -> str:
+    # Label values escape backslash, double quote and line feed, as the exposition format requires
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class MetricsRegistry:
+    """
+    Process-wide histograms and counters, rendered in the Prometheus text exposition format.
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+        self._counters = defaultdict(float)
+        self._server = None
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[i] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def inc(self, name: str, value: float = 1, **labels):
+        with self._lock:
+            self._counters[(name, tuple(sorted(labels.items())))] += value
+
+    @staticmethod
+    def _labels(labels, extra=()) -> str:
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{key}="{escape_label_value(value)}"' for key, value in pairs) + "}"
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self._histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (metric, labels), histogram in sorted(self._histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, count in zip(self.buckets, histogram):
+                        lines.append(f"{name}_bucket{self._labels(labels, [('le', bound)])} {count}")
+                    lines.append(f"{name}_bucket{self._labels(labels, [('le', '+Inf')])} {histogram[-1]}")
+                    lines.append(f"{name}_sum{self._labels(labels)} {histogram[-2]}")
+                    lines.append(f"{name}_count{self._labels(labels)} {histogram[-1]}")
+            for name in sorted({name for name, _ in self._counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (metric, labels), value in sorted(self._counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{self._labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int):
+        """
+        Serves /metrics on a daemon thread. Does nothing when port is 0 or a server is running.
+        """
+        if not port or self._server is not None:
+            return
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True).start()
+        print(f"Serving metrics on port {port}.")
+
+metrics = MetricsRegistry()
+
+@contextmanager
+def model_call(model: str):
+    """
+    Times one model invocation into the model_call_seconds histogram.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.observe("model_call_seconds", time.perf_counter() - start, model=model)
+
+class JobMetrics:
+    """
+    Stage timings and item counters of one job. Stages can be timed with span() or recorded from
+    timings measured elsewhere; finish() feeds the histograms (labelled with the document's size
+    class, known only by then) and prints the structured per-job log line. `status` is the outcome
+    reported unless finish() is given another one.
+    """
+    def __init__(self, queue: str, published_at_ms=None, **attributes):
+        self.queue = queue
+        self.attributes = attributes
+        self.status = "processed"
+        self.started_at = time.perf_counter()
+        self.stages = defaultdict(float)
+        self.counters = defaultdict(int)
+        self.queue_wait_seconds = max(time.time() - published_at_ms / 1000.0, 0.0) if published_at_ms else None
+
+    @contextmanager
+    def span(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[stage] += time.perf_counter() - start
+
+    def record(self, stage: str, seconds: float):
+        self.stages[stage] += seconds
+
+    def count(self, kind: str, amount: int = 1):
+        self.counters[kind] += amount
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def finish(self, status: str = None):
+        status = status or self.status
+        total_seconds = time.perf_counter() - self.started_at
+        document_size = size_class(self.counters.get("raw_bytes", 0))
+        for stage, seconds in self.stages.items():
+            metrics.observe("pipeline_stage_seconds", seconds, stage=stage, size_class=document_size)
+        for kind, amount in self.counters.items():
+            metrics.inc("pipeline_items_total", amount, kind=kind)
+        metrics.observe("job_seconds", total_seconds, queue=self.queue, status=status)
+        metrics.inc("jobs_total", queue=self.queue, status=status)
+        if self.queue_wait_seconds is not None:
+            metrics.observe("queue_wait_seconds", self.queue_wait_seconds, queue=self.queue)
+
+        if JOB_METRICS_LOG:
+            print(json.dumps({
+                "event": "job_metrics",
+                "queue": self.queue,
+                "status": status,
+                **{key: str(value) for key, value in self.attributes.items()},
+                "size_class": document_size,
+                "queue_wait_ms": round(self.queue_wait_seconds * 1000.0, 1) if self.queue_wait_seconds is not None else None,
+                "total_ms": round(total_seconds * 1000.0, 1),
+                "stages_ms": {stage: round(seconds * 1000.0, 1) for stage, seconds in self.stages.items()},
+                "counters": dict(self.counters),
+            }, ensure_ascii=False))
+
+@contextmanager
+def span_all(job_metrics: list, stage: str):
+    """
+    Times a stage shared by several jobs (e.g. one batched model call) and records it on each.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        for job_metric in job_metrics:
+            job_metric.record(stage, elapsed)
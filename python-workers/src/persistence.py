@@ -0,0 +1,105 @@
+import os
+from psycopg2 import sql
+from psycopg2.extras import execute_values, Json
+
+# Rows sent per INSERT statement. Each result table is written with one execute_values call,
+# which psycopg2 splits into pages of this size.
+PERSISTENCE_PAGE_SIZE = int(os.environ.get("PERSISTENCE_PAGE_SIZE", "1000"))
+
+def bulk_insert(cur, table: str, columns: list, rows: list, suffix: str = "", fetch: bool = False):
+    """
+    Inserts all rows into `table` with generated ids, using as few round trips as possible.
+    """
+    if not rows:
+        return []
+    query = sql.SQL("INSERT INTO {table} (id, {columns}) VALUES %s {suffix}").format(
+        table=sql.Identifier(table),
+        columns=sql.SQL(", ").join(map(sql.Identifier, columns)),
+        suffix=sql.SQL(suffix),
+    )
+    template = "(gen_random_uuid(), " + ", ".join(["%s"] * len(columns)) + ")"
+    return execute_values(cur, query, rows, template=template, page_size=PERSISTENCE_PAGE_SIZE, fetch=fetch)
+
+def insert_chunks(cur, processing_version_id, chunks_for_processing: list, embeddings, start_position: int = 0):
+    """
+    Writes (chunk_id, text_content) chunks and their embeddings in a single pass, numbering
+    positions from `start_position`. Chunk ids are generated by the caller, so other results
+    can reference them before the chunks are written.
+    """
+    rows = [
+        (chunk_id, processing_version_id, chunk_text, start_position + i, len(chunk_text.split()), embeddings[i].tolist())
+        for i, (chunk_id, chunk_text) in enumerate(chunks_for_processing)
+    ]
+    if rows:
+        execute_values(
+            cur,
+            "INSERT INTO chunks (id, processing_version_id, text_content, position, token_count, embedding) VALUES %s",
+            rows,
+            template="(%s, %s, %s, %s, %s, %s::vector)",
+            page_size=PERSISTENCE_PAGE_SIZE,
+        )
+
+def insert_topics(cur, processing_version_id, topics: list):
+    bulk_insert(cur, "topics", ["processing_version_id", "topic_text", "weight", "topic_type"],
+                [(processing_version_id, t['topic_text'], t['weight'], t['topic_type']) for t in topics])
+
+def insert_action_items(cur, processing_version_id, action_items: list):
+    bulk_insert(cur, "action_items", ["processing_version_id", "task_text", "original_text", "assignee_name", "due_date", "confidence", "priority", "dependencies"],
+                [(processing_version_id, item['task_text'], item['original_text'], item['assignee_name'], item['due_date'], item['confidence'], item['priority'], item['dependencies']) for item in action_items])
+
+def upsert_entities(cur, entities: list) -> dict:
+    """
+    Upserts all entities in one statement and maps each (name, type) key to its id.
+    """
+    unique_keys = list(dict.fromkeys((entity['name'], entity['type']) for entity in entities))
+    rows = bulk_insert(cur, "entities", ["name", "entity_type"], unique_keys,
+                       suffix="ON CONFLICT (name, entity_type) DO UPDATE SET name=EXCLUDED.name RETURNING id, name, entity_type",
+                       fetch=True)
+    return {(name, entity_type): entity_id for entity_id, name, entity_type in rows}
+
+def insert_entity_mentions(cur, processing_version_id, mentions: list, entity_id_map: dict):
+    rows = []
+    for mention in mentions:
+        entity_key = (mention['entity_name'], mention['entity_type'])
+        if entity_key in entity_id_map:
+            rows.append((processing_version_id, mention['chunk_id'], entity_id_map[entity_key], mention['mentioned_text'], int(mention['confidence'] * 100)))
+    bulk_insert(cur, "entity_mentions", ["processing_version_id", "chunk_id", "entity_id", "mentioned_text", "confidence"], rows)
+
+def insert_relationships(cur, processing_version_id, relationship_rows: list):
+    """
+    `relationship_rows` holds already resolved (source_entity_id, target_entity_id, type, weight, context) tuples.
+    """
+    bulk_insert(cur, "relationships", ["processing_version_id", "source_entity_id", "target_entity_id", "relationship_type", "weight", "context_snippet"],
+                [(processing_version_id, *row) for row in relationship_rows])
+
+def insert_classifications(cur, processing_version_id, classifications: list):
+    bulk_insert(cur, "document_classifications", ["processing_version_id", "label", "confidence", "classifier_type"],
+                [(processing_version_id, c['label'], int(c['confidence'] * 100), c['classifier_type']) for c in classifications],
+                suffix="ON CONFLICT (processing_version_id, label) DO NOTHING")
+
+def insert_tabular_data_page(cur, processing_version_id, tabular_data_id, page: dict):
+    # rows_json is already serialized by the tabular pipeline and is cast server-side
+    cur.execute(sql.SQL("""
+        INSERT INTO tabular_data_pages (id, tabular_data_id, processing_version_id, page_number, row_offset, row_count, rows)
+        VALUES (gen_random_uuid(), %s, %s, %s, %s, %s, %s::jsonb)
+    """), (tabular_data_id, processing_version_id, page['page_number'], page['row_offset'], page['row_count'], page['rows_json']))
+
+def insert_tabular_data(cur, processing_version_id, tabular_data_id, result: dict):
+    cur.execute(sql.SQL("""
+        INSERT INTO tabular_data (id, processing_version_id, data_json, detected_schema, row_count, column_count, summary_stats, anomalies, page_count)
+        VALUES (%s, %s, %s::jsonb, %s, %s, %s, %s, %s, %s)
+    """), (tabular_data_id, processing_version_id, result['data_json'], Json(result['detected_schema']), result['row_count'], result['column_count'],
+           Json(result['summary_stats']), Json(result['anomalies']), result['page_count']))
+
+def insert_financial_kpis(cur, processing_version_id, financial_kpis: list):
+    bulk_insert(cur, "financial_kpis", ["processing_version_id", "kpi_name", "kpi_value", "kpi_currency", "period", "source_snippet"],
+                [(processing_version_id, kpi['kpi_name'], kpi['kpi_value'], kpi['kpi_currency'], kpi['period'], kpi['source_snippet']) for kpi in financial_kpis])
+
+def insert_legal_clauses(cur, processing_version_id, legal_clauses: list):
+    bulk_insert(cur, "legal_clauses", ["processing_version_id", "clause_type", "clause_text", "confidence", "clause_number", "parent_number", "depth", "position"],
+                [(processing_version_id, clause['clause_type'], clause['clause_text'], clause['confidence'],
+                  clause['clause_number'], clause['parent_number'], clause['depth'], clause['position']) for clause in legal_clauses])
+
+def insert_review_items(cur, processing_version_id, items_for_review: list):
+    bulk_insert(cur, "review_queue", ["processing_version_id", "prediction_id", "prediction_type", "reason", "priority"],
+                [(processing_version_id, item['prediction_id'], item['prediction_type'], item['reason'], item['priority']) for item in items_for_review])
@@ -0,0 +1,122 @@
+import os
+import warnings
+import numpy as np
+
+# Default threshold per method: |z| for zscore, modified z-score (Iglewicz-Hoaglin) for mad,
+# and the IQR multiplier (Tukey fences) for iqr.
+DEFAULT_THRESHOLDS = {"zscore": 3.0, "mad": 3.5, "iqr": 1.5}
+
+class AnomalyDetector:
+    """
+    Flags outliers in every numeric column at once. Each method reduces to a per-column
+    [lower, upper] band, so detection is a single broadcast comparison over a 2-D array instead
+    of a Python loop over rows:
+
+    - zscore: mean ± threshold * std
+    - mad:    median ± threshold * MAD / 0.6745
+    - iqr:    [Q1 - threshold * IQR, Q3 + threshold * IQR]
+
+    Columns with zero spread are never flagged. NaNs are ignored.
+    """
+    def __init__(self, method: str = None, threshold: float = None, max_anomalies: int = None):
+        self.method = method or os.environ.get("TABULAR_ANOMALY_METHOD", "zscore")
+        if self.method not in DEFAULT_THRESHOLDS:
+            raise ValueError(f"Unknown anomaly detection method '{self.method}', expected one of {sorted(DEFAULT_THRESHOLDS)}")
+        configured = os.environ.get("TABULAR_ANOMALY_THRESHOLD")
+        self.threshold = threshold if threshold is not None else float(configured) if configured else DEFAULT_THRESHOLDS[self.method]
+        self.max_anomalies = max_anomalies if max_anomalies is not None else int(os.environ.get("TABULAR_MAX_ANOMALIES", "1000"))
+
+    @property
+    def reason(self) -> str:
+        return {
+            "zscore": f"Z-score > {self.threshold:g}",
+            "mad": f"Modified z-score > {self.threshold:g}",
+            "iqr": f"Outside {self.threshold:g} x IQR fences",
+        }[self.method]
+
+    @property
+    def needs_quantiles(self) -> bool:
+        return self.method != "zscore"
+
+    def bounds_from_moments(self, mean: np.ndarray, std: np.ndarray) -> tuple:
+        """
+        z-score band from precomputed (e.g. running) moments.
+        """
+        spread = np.where(std > 0, self.threshold * std, np.nan)
+        return mean - spread, mean + spread
+
+    def bounds(self, values: np.ndarray) -> tuple:
+        """
+        Per-column (lower, upper) bands computed from a 2-D float array (rows x columns).
+        """
+        # All-NaN columns warn in the nan-aware reductions; they simply get a NaN band
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            if self.method == "zscore":
+                return self.bounds_from_moments(np.nanmean(values, axis=0), np.nanstd(values, axis=0, ddof=1))
+            if self.method == "mad":
+                median = np.nanmedian(values, axis=0)
+                mad = np.nanmedian(np.abs(values - median), axis=0)
+                spread = np.where(mad > 0, self.threshold * mad / 0.6745, np.nan)
+                return median - spread, median + spread
+            q1, q3 = np.nanpercentile(values, [25, 75], axis=0)
+            iqr = np.where(q3 > q1, q3 - q1, np.nan)
+            return q1 - self.threshold * iqr, q3 + self.threshold * iqr
+
+    def detect(self, values: np.ndarray, columns: list, lower: np.ndarray, upper: np.ndarray, row_offset: int = 0, limit: int = None) -> list:
+        """
+        Returns anomalies in row order as dicts with row, column, value and reason. Columns whose
+        band is NaN (no spread) are skipped by the comparison itself.
+        """
+        limit = self.max_anomalies if limit is None else limit
+        if limit <= 0:
+            return []
+        outside = (values < lower) | (values > upper)
+        rows, cols = np.nonzero(outside)
+        rows, cols = rows[:limit], cols[:limit]
+        reason = self.reason
+        return [
+            {"row": row_offset + row, "column": columns[col], "value": value, "reason": reason}
+            for row, col, value in zip(rows.tolist(), cols.tolist(), values[rows, cols].tolist())
+        ]
+
+    def detect_frame(self, df, limit: int = None) -> list:
+        """
+        Detects anomalies over all numeric columns of a DataFrame without adding columns to it or
+        iterating its rows; a homogeneous float block is viewed, not copied, by to_numpy.
+        """
+        columns = list(df.select_dtypes(include=['number']).columns)
+        if not columns:
+            return []
+        values = df[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        lower, upper = self.bounds(values)
+        return self.detect(values, columns, lower, upper, limit=limit)
+
+class ReservoirSample:
+    """
+    Uniform sample of up to `capacity` rows from a stream of 2-D chunks (Algorithm R, vectorized
+    per chunk). Robust bands are estimated on it when the table is too large to keep in memory;
+    tables with at most `capacity` rows are sampled completely, so their bands are exact.
+    """
+    def __init__(self, capacity: int, seed: int = 0):
+        self.capacity = capacity
+        self.seen = 0
+        self.rows = None
+        self._rng = np.random.default_rng(seed)
+
+    def add(self, values: np.ndarray):
+        if self.rows is None:
+            self.rows = np.empty((0, values.shape[1]), dtype=values.dtype)
+        free = max(self.capacity - len(self.rows), 0)
+        if free:
+            self.rows = np.concatenate([self.rows, values[:free]])
+        rest = values[free:]
+        if len(rest):
+            positions = self.seen + free + np.arange(len(rest))
+            slots = (self._rng.random(len(rest)) * (positions + 1)).astype(np.int64)
+            keep = slots < self.capacity
+            # Later rows overwrite earlier ones in the same slot, as in the sequential algorithm
+            self.rows[slots[keep]] = rest[keep]
+        self.seen += len(values)
+
+anomaly_detector = AnomalyDetector()
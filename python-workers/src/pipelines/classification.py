@@ -1,37 +1,199 @@
-from transformers import pipeline
+from collections import OrderedDict
+import hashlib
+import os
+import threading
+import numpy as np
+from pipelines.model_registry import model_registry
+from instrumentation import model_call
 
 class ClassificationPipeline:
-    def __init__(self):
-        self.pipeline = None
+    def __init__(self, batch_size=8):
         self.model_name = "facebook/bart-large-mnli"
+        self.batch_size = batch_size
+        self.hypothesis_template = "This example is {}."
+        # Chunked mode classifies up to `max_chunks` representative chunks per document and pools
+        # their scores; `full_text` keeps the single-call behaviour on the (truncated) full text.
+        self.mode = os.environ.get("CLASSIFICATION_MODE", "chunked")
+        self.max_chunks = int(os.environ.get("CLASSIFICATION_MAX_CHUNKS", "8"))
+        self.pooling = os.environ.get("CLASSIFICATION_POOLING", "mean")
+        # Embedding-centroid fast path for documents whose labelled examples cover at least two of the
+        # candidate labels: accepted when the best label is similar enough and clearly ahead of the
+        # runner-up, otherwise NLI decides.
+        self.centroid_min_similarity = float(os.environ.get("CLASSIFICATION_CENTROID_MIN_SIMILARITY", "0.6"))
+        self.centroid_min_margin = float(os.environ.get("CLASSIFICATION_CENTROID_MIN_MARGIN", "0.1"))
+        self._hypothesis_cache = {}
+        self._centroid_cache = OrderedDict()
+        # Stages and consumer threads classify concurrently; the lock guards both caches
+        self._cache_lock = threading.Lock()
 
-    def _load_pipeline(self):
-        if self.pipeline is None:
-            self.pipeline = pipeline("zero-shot-classification", model=self.model_name)
+    def _get_pipeline(self):
+        return model_registry.get("zero-shot-classification", self.model_name)
+
+    def _build_sequence(self, text: str, examples: list = None) -> tuple:
+        if not examples:
+            return text, "zero-shot"
+        prompt_examples = "\n".join([f"Texto: \"{ex['text']}\" => Rótulo: \"{ex['label']}\"" for ex in examples])
+        return f"{prompt_examples}\n---\nTexto: \"{text}\" => Rótulo: ", "few-shot"
 
     def classify(self, text: str, candidate_labels: list, examples: list = None) -> list:
-        self._load_pipeline()
-        
-        if not text or not candidate_labels:
-            return []
-
-        classifier_type = "zero-shot"
-        sequence_to_classify = text
-
-        if examples:
-            classifier_type = "few-shot"
-            prompt_examples = "\n".join([f"Texto: \"{ex['text']}\" => Rótulo: \"{ex['label']}\"" for ex in examples])
-            sequence_to_classify = f"{prompt_examples}\n---\nTexto: \"{text}\" => Rótulo: "
-        
-        results = self.pipeline(sequence_to_classify, candidate_labels, multi_label=True)
-        
-        classifications = []
-        for i, label in enumerate(results['labels']):
-            classifications.append({
-                "label": label,
-                "confidence": round(results['scores'][i], 4),
-                "classifier_type": classifier_type
-            })
-        return classifications
-
-classification_pipeline = ClassificationPipeline()
\ No newline at end of file
+        return self.classify_batch([text], candidate_labels, examples_list=[examples])[0]
+
+    def classify_batch(self, texts: list, candidate_labels: list, examples_list: list = None) -> list:
+        """
+        Classifies several documents against the same candidate labels in one batched model call.
+        Returns one list of classifications per input text, in input order.
+        """
+        classifications_per_text = [[] for _ in texts]
+        if not texts or not candidate_labels:
+            return classifications_per_text
+
+        examples_list = examples_list or [None] * len(texts)
+        indices, sequences, classifier_types = [], [], []
+        for i, (text, examples) in enumerate(zip(texts, examples_list)):
+            if not text:
+                continue
+            sequence, classifier_type = self._build_sequence(text, examples)
+            indices.append(i)
+            sequences.append(sequence)
+            classifier_types.append(classifier_type)
+
+        if not sequences:
+            return classifications_per_text
+
+        classifier = self._get_pipeline()
+        with model_call(self.model_name):
+            results = classifier(sequences, candidate_labels, multi_label=True, batch_size=self.batch_size)
+        if isinstance(results, dict):
+            results = [results]
+
+        for i, classifier_type, result in zip(indices, classifier_types, results):
+            classifications_per_text[i] = [
+                {
+                    "label": label,
+                    "confidence": round(result['scores'][j], 4),
+                    "classifier_type": classifier_type
+                }
+                for j, label in enumerate(result['labels'])
+            ]
+        return classifications_per_text
+
+    def _encoded_hypotheses(self, tokenizer, candidate_labels: list) -> list:
+        # Hypotheses only depend on the label set, so they are tokenized once and reused for every premise
+        key = tuple(candidate_labels)
+        with self._cache_lock:
+            if key not in self._hypothesis_cache:
+                hypotheses = [self.hypothesis_template.format(label) for label in candidate_labels]
+                self._hypothesis_cache[key] = tokenizer(hypotheses, add_special_tokens=False)['input_ids']
+            return self._hypothesis_cache[key]
+
+    def _entailment_scores(self, premises: list, candidate_labels: list) -> np.ndarray:
+        """
+        Multi-label NLI scores, shape (len(premises), len(candidate_labels)). Each premise is tokenized
+        once and truncated to leave room for the longest hypothesis, instead of once per label.
+        """
+        import torch
+
+        classifier = self._get_pipeline()
+        tokenizer, model = classifier.tokenizer, classifier.model
+        hypothesis_ids = self._encoded_hypotheses(tokenizer, candidate_labels)
+        premise_budget = tokenizer.model_max_length - max(len(ids) for ids in hypothesis_ids) - tokenizer.num_special_tokens_to_add(pair=True)
+        premise_ids = [ids[:premise_budget] for ids in tokenizer(premises, add_special_tokens=False)['input_ids']]
+
+        label2id = {label.lower(): index for label, index in model.config.label2id.items()}
+        entailment_id = label2id.get("entailment", len(label2id) - 1)
+        contradiction_id = label2id.get("contradiction", 0)
+
+        pairs = [tokenizer.build_inputs_with_special_tokens(premise, hypothesis) for premise in premise_ids for hypothesis in hypothesis_ids]
+        scores = []
+        with torch.no_grad(), model_call(self.model_name):
+            for start in range(0, len(pairs), self.batch_size):
+                batch = tokenizer.pad({"input_ids": pairs[start:start + self.batch_size]}, return_tensors="pt")
+                batch = {name: tensor.to(model.device) for name, tensor in batch.items()}
+                logits = model(**batch).logits[:, [contradiction_id, entailment_id]]
+                scores.append(torch.softmax(logits, dim=-1)[:, 1].cpu().numpy())
+        return np.concatenate(scores).reshape(len(premises), len(candidate_labels))
+
+    def _label_centroids(self, examples: list) -> tuple:
+        key = hashlib.sha1("\0".join(f"{ex['label']}\0{ex['text']}" for ex in examples).encode('utf-8')).hexdigest()
+        with self._cache_lock:
+            if key not in self._centroid_cache:
+                vectors = np.asarray(model_registry.get_known("embedding").encode([ex['text'] for ex in examples]), dtype=np.float32)
+                labels = sorted({ex['label'] for ex in examples})
+                centroids = np.stack([vectors[[i for i, ex in enumerate(examples) if ex['label'] == label]].mean(axis=0) for label in labels])
+                centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+                self._centroid_cache[key] = (labels, centroids)
+                while len(self._centroid_cache) > 256:
+                    self._centroid_cache.popitem(last=False)
+            else:
+                self._centroid_cache.move_to_end(key)
+            return self._centroid_cache[key]
+
+    def _classify_by_centroid(self, document_vector: np.ndarray, examples: list, candidate_labels: list):
+        """
+        Ranks the candidate labels that have examples by cosine similarity to their centroid. Returns
+        None, leaving the document to NLI, unless at least two candidate labels have examples and the
+        best one is both similar enough and clearly ahead of the runner-up.
+        """
+        candidates = set(candidate_labels)
+        examples = [ex for ex in examples if ex['label'] in candidates]
+        if len({ex['label'] for ex in examples}) < 2:
+            return None
+        labels, centroids = self._label_centroids(examples)
+        similarities = centroids @ document_vector
+        order = np.argsort(-similarities)
+        best = float(similarities[order[0]])
+        runner_up = float(similarities[order[1]])
+        if best < self.centroid_min_similarity or best - runner_up < self.centroid_min_margin:
+            return None
+        return [
+            {"label": labels[i], "confidence": round(max(float(similarities[i]), 0.0), 4), "classifier_type": "embedding-centroid"}
+            for i in order
+        ]
+
+    def classify_documents(self, documents: list, candidate_labels: list) -> list:
+        """
+        Classifies documents given as dicts with `chunk_texts`, `embeddings` and `examples`.
+        Documents whose labelled examples decide the label by embedding similarity skip NLI; the
+        rest have their most representative chunks scored by NLI in one batched pass, with the
+        chunk scores pooled per label. Returns one list of classifications per document.
+        """
+        if self.mode != "chunked":
+            return self.classify_batch([" ".join(doc['chunk_texts']) for doc in documents], candidate_labels, examples_list=[doc.get('examples') for doc in documents])
+
+        results = [[] for _ in documents]
+        premises, owners = [], []
+        for doc_index, doc in enumerate(documents):
+            if not doc['chunk_texts'] or not candidate_labels:
+                continue
+            vectors = np.asarray(doc['embeddings'], dtype=np.float32)
+            vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            document_vector = vectors.mean(axis=0)
+            document_vector /= max(float(np.linalg.norm(document_vector)), 1e-12)
+
+            if doc.get('examples'):
+                centroid_result = self._classify_by_centroid(document_vector, doc['examples'], candidate_labels)
+                if centroid_result is not None:
+                    results[doc_index] = centroid_result
+                    continue
+
+            # Most representative chunks: closest to the document's mean embedding
+            selected = np.argsort(-(vectors @ document_vector))[:self.max_chunks]
+            for i in sorted(selected):
+                premises.append(doc['chunk_texts'][i])
+                owners.append(doc_index)
+
+        if not premises:
+            return results
+
+        scores = self._entailment_scores(premises, candidate_labels)
+        owners = np.asarray(owners)
+        for doc_index in np.unique(owners):
+            doc_scores = scores[owners == doc_index]
+            pooled = doc_scores.max(axis=0) if self.pooling == "max" else doc_scores.mean(axis=0)
+            results[doc_index] = [
+                {"label": candidate_labels[j], "confidence": round(float(pooled[j]), 4), "classifier_type": "zero-shot-chunked"}
+                for j in np.argsort(-pooled)
+            ]
+        return results
+
+classification_pipeline = ClassificationPipeline()
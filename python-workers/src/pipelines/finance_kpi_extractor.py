@@ -1,53 +1,267 @@
+import json
+import os
 import re
+import unicodedata
 from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+
+# Declarative KPI rules (name, value kind, pt/en aliases) plus the currency and scale vocabularies.
+# FINANCE_KPI_RULES points at another JSON file with the same layout to replace them.
+FINANCE_KPI_RULES = os.environ.get("FINANCE_KPI_RULES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "finance_kpi_rules.json"))
+
+# How far (in characters) after a KPI name its value may appear, and around it the period
+VALUE_WINDOW = 120
+PERIOD_WINDOW = 150
+
+# Base letters and the accented forms they also match, so "liquida" and "líquida" are the same alias
+ACCENT_VARIANTS = {'a': 'aáàâã', 'e': 'eéê', 'i': 'ií', 'o': 'oóôõ', 'u': 'uúü', 'c': 'cç'}
+
+NUMBER_SEPARATORS = {"pt": (".", ","), "en": (",", ".")}  # locale -> (thousands, decimal)
+
+SENTENCE_END_PATTERN = re.compile(r'[;\n]|[.!?](?:\s|$)')
+YEAR_PATTERN = re.compile(r'(?:19|20)\d{2}')
+
+MONTHS = {
+    'janeiro': 1, 'fevereiro': 2, 'marco': 3, 'abril': 4, 'maio': 5, 'junho': 6, 'julho': 7, 'agosto': 8,
+    'setembro': 9, 'outubro': 10, 'novembro': 11, 'dezembro': 12,
+    'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6, 'july': 7, 'august': 8,
+    'september': 9, 'october': 10, 'november': 11, 'december': 12,
+}
+ORDINALS = {'primeiro': 1, 'segundo': 2, 'terceiro': 3, 'quarto': 4, 'first': 1, 'second': 2, 'third': 3, 'fourth': 4}
+_YEAR = r"(?:19|20)?\d{2}"
+_ORDINAL = "|".join(ORDINALS)
+# Reporting periods, normalized to 2024-Q1, 2024-H1, 2024-9M, 2024-03 or 2024. Bare years rank last.
+# The lookahead on the first letter of every alternative lets most word starts fail immediately.
+PERIOD_PATTERN = re.compile(
+    rf"(?<!\w)(?=[\dqhfeajmsondpt])(?:"
+    rf"(?P<q_n>[1-4])\s?[TQ]\s?(?P<q_y>{_YEAR})"
+    rf"|Q(?P<qe_n>[1-4])\s?['’]?\s?(?P<qe_y>{_YEAR})"
+    rf"|(?:(?P<qw_n>[1-4])\s?[ºo°]?|(?P<qw_o>{_ORDINAL}))\s+(?:trimestre|quarter)\s+(?:de\s+|of\s+)?(?P<qw_y>(?:19|20)\d{{2}})"
+    rf"|(?P<h_n>[12])\s?[SH]\s?(?P<h_y>{_YEAR})"
+    rf"|H(?P<he_n>[12])\s?['’]?\s?(?P<he_y>{_YEAR})"
+    rf"|(?P<hw_o>primeiro|segundo|first|second)\s+(?:semestre|half)\s+(?:de\s+|of\s+)?(?P<hw_y>(?:19|20)\d{{2}})"
+    rf"|(?P<m_n>[369])\s?M\s?(?P<m_y>{_YEAR})"
+    rf"|FY\s?['’]?(?P<fy_y>{_YEAR})"
+    rf"|(?:exerc[ií]cio|ano\s+fiscal|fiscal\s+year)\s+(?:de\s+|of\s+)?(?P<fw_y>(?:19|20)\d{{2}})"
+    rf"|(?P<mo_n>{'|'.join(MONTHS).replace('marco', 'mar[cç]o')})\s+(?:de\s+|of\s+)?(?P<mo_y>(?:19|20)\d{{2}})"
+    rf"|(?P<y>(?:19|20)\d{{2}})(?![.,]\d)"
+    rf")(?!\w)",
+    re.IGNORECASE
+)
+
+@lru_cache(maxsize=4096)
+def fold(text: str) -> str:
+    """
+    Case-, accent- and whitespace-insensitive form of a KPI alias.
+    """
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return " ".join("".join(char for char in decomposed if not unicodedata.combining(char)).split())
+
+def _full_year(year: str) -> int:
+    return int(year) if len(year) == 4 else 2000 + int(year)
+
+def normalize_period(match: re.Match):
+    groups = {name: value for name, value in match.groupdict().items() if value is not None}
+    if 'q_y' in groups: return f"{_full_year(groups['q_y'])}-Q{groups['q_n']}"
+    if 'qe_y' in groups: return f"{_full_year(groups['qe_y'])}-Q{groups['qe_n']}"
+    if 'qw_y' in groups: return f"{groups['qw_y']}-Q{groups.get('qw_n') or ORDINALS[fold(groups['qw_o'])]}"
+    if 'h_y' in groups: return f"{_full_year(groups['h_y'])}-H{groups['h_n']}"
+    if 'he_y' in groups: return f"{_full_year(groups['he_y'])}-H{groups['he_n']}"
+    if 'hw_y' in groups: return f"{groups['hw_y']}-H{ORDINALS[fold(groups['hw_o'])]}"
+    if 'm_y' in groups: return f"{_full_year(groups['m_y'])}-{groups['m_n']}M"
+    if 'fy_y' in groups: return str(_full_year(groups['fy_y']))
+    if 'fw_y' in groups: return groups['fw_y']
+    if 'mo_y' in groups: return f"{groups['mo_y']}-{MONTHS[fold(groups['mo_n'])]:02d}"
+    return groups.get('y')
+
+def load_rules(path: str = FINANCE_KPI_RULES) -> dict:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def _alias_regex(aliases: list) -> str:
+    """
+    Compiles folded aliases into one regex shaped like a prefix trie (as the template header
+    pattern does), matching accents optionally and any run of whitespace between words. At a
+    position the longest alias wins.
+    """
+    trie = {}
+    for alias in aliases:
+        node = trie
+        for char in alias:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def char_regex(char: str) -> str:
+        if char == " ":
+            return r"\s+"
+        if char in ACCENT_VARIANTS:
+            return f"[{ACCENT_VARIANTS[char]}]"
+        return re.escape(char)
+
+    def build(node) -> str:
+        branches = [char_regex(char) + build(child) for char, child in sorted(node.items()) if char != ""]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
 
 class FinanceKPIExtractorPipeline:
-    def __init__(self):
-        # Regex patterns for common KPIs in Portuguese and English
-        # Pattern captures: (KPI Name), (Currency Symbol), (Value), (Scale like million/billion)
-        self.kpi_patterns = [
-            re.compile(r'(Receita\s*Líquida|Net\s*Revenue)\s*de\s*(R\$|\$|USD)\s*([\d.,]+)\s*(milhões|milhão|mil|bi|bilhões|billion|million)?', re.IGNORECASE),
-            re.compile(r'(Lucro\s*Bruto|Gross\s*Profit)\s*de\s*(R\$|\$|USD)\s*([\d.,]+)\s*(milhões|milhão|mil|bi|bilhões|billion|million)?', re.IGNORECASE),
-            re.compile(r'(EBITDA)\s*de\s*(R\$|\$|USD)\s*([\d.,]+)\s*(milhões|milhão|mil|bi|bilhões|billion|million)?', re.IGNORECASE),
-        ]
-        self.scale_multipliers = {
-            'mil': 1_000,
-            'milhão': 1_000_000,
-            'milhões': 1_000_000,
-            'million': 1_000_000,
-            'bi': 1_000_000_000,
-            'bilhões': 1_000_000_000,
-            'billion': 1_000_000_000,
-        }
-
-    def _parse_value(self, value_str: str, scale_str: str) -> Decimal:
-        # Normalize number format (e.g., "1.234,56" -> "1234.56")
-        cleaned_value_str = value_str.replace('.', '').replace(',', '.')
+    """
+    Rule-based KPI extraction. All KPI names of the rule set are compiled into a single scanner,
+    so the document is scanned once however many rules there are. The value of each KPI mention
+    is then read from the text right after it (up to the next mention or the end of the sentence),
+    which keeps the total work linear in the document size.
+
+    Rule kinds decide which values are accepted: `currency` amounts need a currency or a scale
+    word, `percent` values a percent sign, `ratio` values an optional "x", and `count` values
+    are plain numbers. kpi_currency holds the ISO currency, "%" or "x".
+    """
+    def __init__(self, rules: dict = None):
+        self.configure(rules or load_rules())
+
+    def configure(self, rules: dict):
+        self.rules = rules["rules"]
+        self.currencies = {fold(symbol): code for symbol, code in rules["currencies"].items()}
+        self.scale_multipliers = {fold(scale): Decimal(str(multiplier)) for scale, multiplier in rules["scales"].items()}
+
+        # Folded alias -> (rule, language); an alias shared by both languages has no language
+        self.aliases = {}
+        for rule in self.rules:
+            for language, aliases in rule["aliases"].items():
+                for alias in aliases:
+                    key = fold(alias)
+                    previous = self.aliases.get(key)
+                    if previous is not None and previous[0] is not rule:
+                        raise ValueError(f"KPI alias '{alias}' is used by both '{previous[0]['name']}' and '{rule['name']}'")
+                    self.aliases[key] = (rule, language if previous is None or previous[1] == language else None)
+
+        first_letters = re.escape("".join(sorted({ACCENT_VARIANTS.get(alias[0], alias[0]) for alias in self.aliases})))
+        self.scanner = re.compile(rf"(?<!\w)(?=[{first_letters}]){_alias_regex(self.aliases)}(?!\w)", re.IGNORECASE)
+
+        def alternatives(words) -> str:
+            return "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+        currency = alternatives(rules["currencies"])
+        self.value_pattern = re.compile(
+            rf"(?P<lead_sign>[-−–](?={currency}))?(?:(?P<currency>{currency})\s*)?(?P<sign>[-−–])?"
+            rf"(?<![\w.,])(?P<number>\d{{1,3}}(?:[.,]\d{{3}})+(?:[.,]\d+)?|\d+(?:[.,]\d+)?)"
+            rf"(?:\s*(?P<scale>{alternatives(rules['scales'])})(?!\w))?"
+            rf"(?:\s*(?P<unit>%|por\s+cento|percent|x(?!\w)|vezes|times))?"
+            rf"(?:\s*(?:de\s+)?(?P<currency_after>{currency})(?!\w))?",
+            re.IGNORECASE
+        )
+
+    @staticmethod
+    def parse_number(number: str, locale: str):
+        """
+        Parses "1.234,56" (pt) or "1,234.56" (en). A single separator followed by exactly three
+        digits is a thousands separator when it is the locale's one ("500.000" in pt), otherwise
+        it is the decimal separator.
+        """
+        thousands, decimal = NUMBER_SEPARATORS[locale]
+        separators = [char for char in number if char in ".,"]
+        if len(set(separators)) == 2:
+            decimal = separators[-1]
+            thousands = "," if decimal == "." else "."
+        elif len(separators) > 1:
+            thousands, decimal = separators[0], None
+        elif len(separators) == 1:
+            single = separators[0]
+            if not (single == thousands and len(number) - number.index(single) - 1 == 3):
+                thousands, decimal = ("," if single == "." else "."), single
+        cleaned = number.replace(thousands, "")
+        if decimal:
+            cleaned = cleaned.replace(decimal, ".")
         try:
-            value = Decimal(cleaned_value_str)
-            if scale_str:
-                multiplier = self.scale_multipliers.get(scale_str.lower(), 1)
-                value *= multiplier
-            return value
+            return Decimal(cleaned)
         except InvalidOperation:
             return None
 
+    def _read_value(self, text: str, rule: dict, language, start: int, end: int):
+        """
+        Returns (value, unit, value_start, value_end) for the first number between start and end that
+        fits the rule's kind, or None.
+        """
+        for candidate in self.value_pattern.finditer(text, start, end):
+            if candidate.end() < len(text) and text[candidate.end()].isalnum():
+                continue  # Part of a token such as "1T24"
+            currency_symbol = candidate.group('currency') or candidate.group('currency_after')
+            currency = self.currencies.get(fold(currency_symbol)) if currency_symbol else None
+            scale, unit = candidate.group('scale'), fold(candidate.group('unit') or "")
+            if not (currency or scale or unit) and YEAR_PATTERN.fullmatch(candidate.group('number')):
+                continue  # "Receita Líquida de 2023 foi de ..."
+            percent = unit in ("%", "por cento", "percent")
+            times = unit in ("x", "vezes", "times")
+
+            kind = rule["kind"]
+            if kind == "currency" and (percent or times or not (currency or scale)):
+                continue
+            if kind == "percent" and (not percent or currency):
+                continue
+            if kind == "ratio" and (percent or currency or scale):
+                continue
+            if kind == "count" and (percent or times or currency):
+                continue
+
+            locale = "pt" if currency == "BRL" else language or ("en" if currency else "pt")
+            value = self.parse_number(candidate.group('number'), locale)
+            if value is None:
+                continue
+            if scale:
+                value *= self.scale_multipliers.get(fold(scale), 1)
+            if candidate.group('lead_sign') or candidate.group('sign'):
+                value = -value
+            unit = currency if kind == "currency" else "%" if kind == "percent" else "x" if kind == "ratio" else None
+            return value, unit, candidate.start(), candidate.end()
+        return None
+
+    def _nearest_period(self, text: str, start: int, end: int, value_start: int, sentence_start: int):
+        """
+        The reporting period closest to the KPI mention text[start:end] (name through value), looked
+        up in the same sentence within PERIOD_WINDOW characters. Periods between the name and the
+        value ("Receita Líquida do 3T24 foi de ...") are the closest; only text overlapping the value
+        itself, text[value_start:end], is skipped. Quarters, halves, months and fiscal years win over
+        bare years.
+        """
+        window_end = min(end + PERIOD_WINDOW, len(text))
+        sentence_end = SENTENCE_END_PATTERN.search(text, end, window_end)
+        best, best_rank = None, None
+        for match in PERIOD_PATTERN.finditer(text, max(sentence_start, start - PERIOD_WINDOW), sentence_end.start() if sentence_end else window_end):
+            if match.start() < end and match.end() > value_start:
+                continue  # Part of the value itself
+            distance = start - match.end() if match.end() <= start else max(match.start() - end, 0)
+            rank = (match.group('y') is not None, distance)
+            if best_rank is None or rank < best_rank:
+                best, best_rank = match, rank
+        return normalize_period(best) if best else None
+
     def extract_kpis(self, text: str) -> list:
         kpis = []
-        for pattern in self.kpi_patterns:
-            matches = pattern.finditer(text)
-            for match in matches:
-                kpi_name, currency, value_str, scale = match.groups()
-                value = self._parse_value(value_str, scale)
-                
-                if value is not None:
-                    kpis.append({
-                        "kpi_name": kpi_name.split(' ')[0].strip(), # "Receita Líquida" -> "Receita"
-                        "kpi_value": value,
-                        "kpi_currency": "BRL" if currency == "R$" else "USD",
-                        "period": None, # Placeholder for future period extraction
-                        "source_snippet": match.group(0)
-                    })
+        mentions = list(self.scanner.finditer(text))
+        for i, mention in enumerate(mentions):
+            rule, language = self.aliases[fold(mention.group(0))]
+            # The value must follow before the next KPI mention and within the same sentence
+            window_end = min(mentions[i + 1].start() if i + 1 < len(mentions) else len(text), mention.end() + VALUE_WINDOW)
+            sentence_end = SENTENCE_END_PATTERN.search(text, mention.end(), window_end)
+            if sentence_end:
+                window_end = sentence_end.start()
+
+            value = self._read_value(text, rule, language, mention.end(), window_end)
+            if value is None:
+                continue
+            kpi_value, unit, value_start, value_end = value
+            sentence_start = max(mention.start() - PERIOD_WINDOW, 0)
+            for previous_end in SENTENCE_END_PATTERN.finditer(text, sentence_start, mention.start()):
+                sentence_start = previous_end.end()
+            kpis.append({
+                "kpi_name": rule["name"],
+                "kpi_value": kpi_value,
+                "kpi_currency": unit,
+                "period": self._nearest_period(text, mention.start(), value_end, value_start, sentence_start),
+                "source_snippet": text[mention.start():value_end]
+            })
         return kpis
 
-finance_kpi_extractor_pipeline = FinanceKPIExtractorPipeline()
\ No newline at end of file
+finance_kpi_extractor_pipeline = FinanceKPIExtractorPipeline()
@@ -1,44 +1,139 @@
-from transformers import pipeline
+import os
 import re
+from pipelines.model_registry import model_registry
+from instrumentation import model_call
+from pipelines.template_application import build_header_pattern
+
+# At most this many candidate clauses per document go through NLI, those with the most keyword hits first.
+FINANCE_RISK_MAX_CLAUSES = int(os.environ.get("FINANCE_RISK_MAX_CLAUSES", "64"))
+# The document risk is the mean severity of its this-many riskiest clauses.
+FINANCE_RISK_TOP_K = int(os.environ.get("FINANCE_RISK_TOP_K", "3"))
+
+# A clause is the sentence around a keyword hit, looked for at most this far on each side.
+CLAUSE_WINDOW = 600
+CLAUSE_BOUNDARY_PATTERN = re.compile(r'[.!?](?=\s)|\n\s*\n')
+
+# Keyword stems by risk category; a stem also matches its inflections ("multas", "breaches").
+RISK_KEYWORDS = {
+    "penalidade": ['multa', 'penalidade', 'penalt'],
+    "rescisão": ['rescisão', 'rescisao', 'rescindir', 'termination', 'terminate'],
+    "violação": ['violação', 'violacao', 'violation', 'breach', 'inadimpl', 'default'],
+    "conformidade": ['não conformidade', 'nao conformidade', 'non-compliance', 'noncompliance', 'descumpr'],
+    "contencioso": ['litígio', 'litigio', 'processo judicial', 'litigation', 'lawsuit', 'contingência', 'contingencia'],
+    "liquidez": ['vencimento antecipado', 'acceleration', 'covenant', 'insolvência', 'insolvencia', 'recuperação judicial', 'going concern'],
+}
+
+CANDIDATE_LABELS = ["baixo risco", "médio risco", "alto risco"]
+# Severity of each label when a clause's probabilities are folded into one risk score in [0, 1]
+LABEL_SEVERITY = {"baixo risco": 0.0, "médio risco": 0.5, "alto risco": 1.0}
+# Document risk score thresholds, highest first
+RISK_LEVEL_THRESHOLDS = [(0.6, "alto risco"), (0.35, "médio risco"), (0.0, "baixo risco")]
+# Risk level of a document without any candidate clause: the model never saw it, so no risk is claimed
+NOT_ASSESSED = "não avaliado"
 
 class FinanceRiskClassifierPipeline:
-    def __init__(self):
-        self.pipeline = None
+    """
+    Two-stage risk engine. A keyword automaton finds the risky clauses in one pass over the text;
+    only those clauses are scored by zero-shot NLI, in one batched call, and the document risk is
+    aggregated from the clause scores. Long filings cost NLI in proportion to their risky clauses,
+    and the model never sees only the truncated head of the document.
+    """
+
+    def __init__(self, batch_size=8):
         self.model_name = "facebook/bart-large-mnli"
-        self.risk_keywords = [
-            'multa', 'penalidade', 'rescisão', 'violação', 'não conformidade', 
-            'penalty', 'termination', 'violation', 'non-compliance', 'breach'
-        ]
+        self.batch_size = batch_size
+        self.risk_keywords = RISK_KEYWORDS
+        self.categories = {keyword.lower(): category for category, keywords in RISK_KEYWORDS.items() for keyword in keywords}
+        # Left word boundary only, so stems match their inflections
+        self.keyword_pattern = re.compile(rf"(?<!\w){build_header_pattern(list(self.categories)).pattern}", re.IGNORECASE)
+
+    def _get_pipeline(self):
+        # Same (task, model) as ClassificationPipeline, so the registry hands out the already loaded model
+        return model_registry.get("zero-shot-classification", self.model_name)
 
-    def _load_pipeline(self):
-        if self.pipeline is None:
-            self.pipeline = pipeline("zero-shot-classification", model=self.model_name)
+    def _clause_bounds(self, text: str, position: int) -> tuple:
+        window_start = max(0, position - CLAUSE_WINDOW)
+        start = window_start
+        for boundary in CLAUSE_BOUNDARY_PATTERN.finditer(text, window_start, position):
+            start = boundary.end()
+        end_match = CLAUSE_BOUNDARY_PATTERN.search(text, position, position + CLAUSE_WINDOW)
+        end = end_match.end() if end_match else min(len(text), position + CLAUSE_WINDOW)
+        return start, end
 
     def _find_risky_clauses(self, text: str) -> list:
-        clauses = []
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        for sentence in sentences:
-            if any(keyword in sentence.lower() for keyword in self.risk_keywords):
-                clauses.append(sentence.strip())
+        """
+        Candidate clauses in document order: {clause, keywords, categories, offset}. Keyword hits
+        inside an already found clause are added to it, so each sentence is bounded once.
+        """
+        clauses, clause_end = [], -1
+        for match in self.keyword_pattern.finditer(text):
+            keyword = match.group(0).lower()
+            if match.start() >= clause_end:
+                start, clause_end = self._clause_bounds(text, match.start())
+                clauses.append({"clause": text[start:clause_end], "keywords": [], "categories": [], "offset": start})
+            clause = clauses[-1]
+            if keyword not in clause["keywords"]:
+                clause["keywords"].append(keyword)
+            category = self.categories[keyword]
+            if category not in clause["categories"]:
+                clause["categories"].append(category)
+
+        for clause in clauses:
+            clause["clause"] = " ".join(clause["clause"].split())
         return clauses
 
+    def _score_clauses(self, clauses: list):
+        """
+        Adds NLI label scores and a severity in [0, 1] to each clause, in one batched model call.
+        """
+        classifier = self._get_pipeline()
+        with model_call(self.model_name):
+            results = classifier([clause["clause"] for clause in clauses], CANDIDATE_LABELS, multi_label=False, batch_size=self.batch_size)
+        if isinstance(results, dict):
+            results = [results]
+
+        for clause, result in zip(clauses, results):
+            scores = dict(zip(result['labels'], result['scores']))
+            clause["scores"] = {label: round(scores[label], 4) for label in CANDIDATE_LABELS}
+            clause["risk_level"] = result['labels'][0]
+            clause["risk_score"] = round(sum(LABEL_SEVERITY[label] * score for label, score in scores.items()), 4)
+
     def classify_risk(self, text: str) -> dict:
-        self._load_pipeline()
-        
-        candidate_labels = ["baixo risco", "médio risco", "alto risco"]
-        results = self.pipeline(text, candidate_labels, multi_label=False)
-        
-        risk_level = results['labels'][0]
-        confidence = int(results['scores'][0] * 100)
-        
-        risky_clauses = self._find_risky_clauses(text)
-        summary = f"Risco avaliado como '{risk_level}'. Encontradas {len(risky_clauses)} cláusulas de risco potencial."
+        """
+        Returns risk_level, confidence (0-100), summary, identified_clauses (the text of every
+        candidate clause, in document order) and clause_scores (the candidates that went through
+        NLI, as {clause, keywords, categories, offset, scores, risk_level, risk_score}).
+        """
+        candidates = self._find_risky_clauses(text)
+        # Clauses hitting several keywords (or categories) are the likeliest risks, so they are scored first
+        scored = sorted(candidates, key=lambda clause: (-len(clause["categories"]), -len(clause["keywords"]), clause["offset"]))[:FINANCE_RISK_MAX_CLAUSES]
+        scored.sort(key=lambda clause: clause["offset"])
+
+        if not scored:
+            return {
+                "risk_level": NOT_ASSESSED,
+                "confidence": 0,
+                "summary": "Risco não avaliado: nenhuma cláusula de risco potencial encontrada.",
+                "identified_clauses": [],
+                "clause_scores": [],
+            }
+
+        self._score_clauses(scored)
+        riskiest = sorted(scored, key=lambda clause: clause["risk_score"], reverse=True)[:FINANCE_RISK_TOP_K]
+        document_score = sum(clause["risk_score"] for clause in riskiest) / len(riskiest)
+        risk_level = next(level for threshold, level in RISK_LEVEL_THRESHOLDS if document_score >= threshold)
+        confidence = int(100 * sum(clause["scores"][risk_level] for clause in riskiest) / len(riskiest))
 
+        summary = (
+            f"Risco avaliado como '{risk_level}' (pontuação {document_score:.2f}). "
+            f"Encontradas {len(candidates)} cláusulas de risco potencial; {len(scored)} avaliadas pelo modelo."
+        )
         return {
             "risk_level": risk_level,
             "confidence": confidence,
             "summary": summary,
-            "identified_clauses": risky_clauses
+            "identified_clauses": [clause["clause"] for clause in candidates],
+            "clause_scores": scored,
         }
 
-finance_risk_classifier_pipeline = FinanceRiskClassifierPipeline()
\ No newline at end of file
+finance_risk_classifier_pipeline = FinanceRiskClassifierPipeline()
@@ -1,73 +1,97 @@
-from transformers import pipeline
-from collections import defaultdict
 import re
 import itertools
+from pipelines.ner_service import ner_service, split_sentences
 
 class KnowledgeGraphPipeline:
-    def __init__(self):
-        self.ner_pipeline = None
+    def __init__(self, max_contexts=3):
         self.entity_map = {
             'PER': 'person', 'ORG': 'organization', 'LOC': 'location', 'MISC': 'miscellaneous'
         }
+        # Checked in order; the first pattern that matches a sentence gives the relationship type
         self.relation_patterns = {
-            'manages': r'\b(manages|leads|gerencia|lidera)\b',
-            'collaborates_with': r'\b(collaborates with|works with|with|junto com|com)\b',
+            'manages': re.compile(r'\b(manages|leads|gerencia|lidera)\b', re.IGNORECASE),
+            'collaborates_with': re.compile(r'\b(collaborates with|works with|with|junto com|com)\b', re.IGNORECASE),
         }
+        self.max_contexts = max_contexts
 
-    def _load_pipelines(self):
-        if self.ner_pipeline is None:
-            self.ner_pipeline = pipeline("ner", model="dslim/bert-base-NER", grouped_entities=True)
-
-    def _infer_relationships(self, sentence, entities_in_sentence):
-        relationships = []
-        if len(entities_in_sentence) < 2:
-            return relationships
-
-        for pair in itertools.permutations(entities_in_sentence, 2):
-            source_entity, target_entity = pair
-            
-            for rel_type, pattern in self.relation_patterns.items():
-                if re.search(pattern, sentence, re.IGNORECASE):
-                    relationships.append({
-                        'source': source_entity['word'],
-                        'target': target_entity['word'],
-                        'type': rel_type,
-                        'context': sentence.strip()
-                    })
-                    break 
-        return relationships
+    def _sentence_relationship_type(self, sentence: str):
+        return next((rel_type for rel_type, pattern in self.relation_patterns.items() if pattern.search(sentence)), None)
+
+    def _infer_relationships(self, sentence, entities_in_sentence, aggregated: dict):
+        """
+        Adds the relationships of one sentence to `aggregated`, keyed by (source, target, type).
+        The relation patterns are evaluated once per sentence, not once per entity pair.
+        """
+        names = list(dict.fromkeys(entity['word'] for entity in entities_in_sentence))
+        if len(names) < 2:
+            return
+        rel_type = self._sentence_relationship_type(sentence)
+        if rel_type is None:
+            return
+
+        context = sentence.strip()
+        for source, target in itertools.permutations(names, 2):
+            relationship = aggregated.get((source, target, rel_type))
+            if relationship is None:
+                aggregated[(source, target, rel_type)] = {'source': source, 'target': target, 'type': rel_type, 'count': 1, 'contexts': [context]}
+                continue
+            relationship['count'] += 1
+            if len(relationship['contexts']) < self.max_contexts and context not in relationship['contexts']:
+                relationship['contexts'].append(context)
+
+    def build_graph_components(self, sentences_with_ids: list, all_ner_results: list) -> tuple:
+        entities, mentions, aggregated = {}, [], {}
+
+        for (chunk_id, sentence), ner_results in zip(sentences_with_ids, all_ner_results):
+            entities_in_sentence = []
+
+            for result in ner_results:
+                entity_name = result['word']
+                entity_type = self.entity_map.get(result['entity_group'])
+                if not entity_type: continue
+
+                entities_in_sentence.append(result)
+
+                if (entity_name, entity_type) not in entities:
+                    entities[(entity_name, entity_type)] = {"name": entity_name, "type": entity_type}
+
+                mentions.append({
+                    "chunk_id": chunk_id, "entity_name": entity_name, "entity_type": entity_type,
+                    "mentioned_text": result['word'], "confidence": result['score']
+                })
+
+            self._infer_relationships(sentence, entities_in_sentence, aggregated)
+
+        return list(entities.values()), mentions, list(aggregated.values())
 
     def extract_graph_components(self, chunk_texts_with_ids: list) -> tuple:
-        self._load_pipelines()
-        
-        entities, mentions, relationships = {}, [], []
-        
-        for chunk_id, text in chunk_texts_with_ids:
-            sentences = re.split(r'(?<=[.!?])\s+', text)
-            for sentence in sentences:
-                if not sentence: continue
-                
-                ner_results = self.ner_pipeline(sentence)
-                entities_in_sentence = []
-
-                for result in ner_results:
-                    entity_name = result['word']
-                    entity_type = self.entity_map.get(result['entity_group'])
-                    if not entity_type: continue
-
-                    entities_in_sentence.append(result)
-                    
-                    if (entity_name, entity_type) not in entities:
-                        entities[(entity_name, entity_type)] = {"name": entity_name, "type": entity_type}
-                    
-                    mentions.append({
-                        "chunk_id": chunk_id, "entity_name": entity_name, "entity_type": entity_type,
-                        "mentioned_text": result['word'], "confidence": result['score']
-                    })
-                
-                sentence_relationships = self._infer_relationships(sentence, entities_in_sentence)
-                relationships.extend(sentence_relationships)
-        
-        return list(entities.values()), mentions, relationships
-
-knowledge_graph_pipeline = KnowledgeGraphPipeline()
\ No newline at end of file
+        """
+        Returns (entities, mentions, relationships). Relationships are deduplicated per
+        (source, target, type) with an occurrence count and up to `max_contexts` example sentences.
+        """
+        sentences_with_ids = [
+            (chunk_id, sentence)
+            for chunk_id, text in chunk_texts_with_ids
+            for sentence in split_sentences(text) if sentence
+        ]
+        all_ner_results = ner_service.annotate([sentence for _, sentence in sentences_with_ids])
+        return self.build_graph_components(sentences_with_ids, all_ner_results)
+
+    def assemble_relationships(self, relationships: list, entity_id_map: dict) -> list:
+        """
+        Resolves relationship endpoints to entity ids through a name index built once, instead of
+        scanning every entity for every relationship. When a name exists with several entity types,
+        the first one in `entity_id_map` wins. Returns (source_id, target_id, type, weight, context) rows.
+        """
+        name_index = {}
+        for (name, _), entity_id in entity_id_map.items():
+            name_index.setdefault(name, entity_id)
+
+        rows = []
+        for rel in relationships:
+            source_id, target_id = name_index.get(rel['source']), name_index.get(rel['target'])
+            if source_id and target_id:
+                rows.append((source_id, target_id, rel['type'], rel['count'], "\n".join(rel['contexts'])))
+        return rows
+
+knowledge_graph_pipeline = KnowledgeGraphPipeline()
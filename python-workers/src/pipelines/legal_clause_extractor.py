@@ -1,33 +1,205 @@
 import re
 
+# Lines longer than this are never headings, so they skip the heading checks entirely.
+MAX_HEADING_LENGTH = 200
+# An all-caps line counts as a title only up to this many words; longer ones are body text of
+# contracts scanned entirely in capitals.
+MAX_TITLE_WORDS = 8
+# Words a title does not end with, but a line wrapped mid-sentence often does.
+CONNECTIVES = frozenset({
+    "A", "À", "AO", "AOS", "AS", "COM", "DA", "DAS", "DE", "DO", "DOS", "E", "EM", "NA", "NAS", "NO", "NOS",
+    "O", "OS", "OU", "PARA", "PELA", "PELO", "POR", "QUE", "SE", "AN", "AND", "BY", "FOR", "IN", "OF", "OR", "THE", "TO", "WITH",
+})
+MAX_DEPTH = 6
+
+UNITS = {
+    "primeira": 1, "segunda": 2, "terceira": 3, "quarta": 4, "quinta": 5,
+    "sexta": 6, "setima": 7, "oitava": 8, "nona": 9, "unica": 1,
+    "primeiro": 1, "segundo": 2, "terceiro": 3, "quarto": 4, "quinto": 5,
+    "sexto": 6, "setimo": 7, "oitavo": 8, "nono": 9, "unico": 1,
+}
+TENS = {
+    "decima": 10, "vigesima": 20, "trigesima": 30, "quadragesima": 40, "quinquagesima": 50,
+    "decimo": 10, "vigesimo": 20, "trigesimo": 30, "quadragesimo": 40, "quinquagesimo": 50,
+}
+ROMAN = {"I": 1, "V": 5, "X": 10, "L": 50, "C": 100}
+ACCENTS = str.maketrans("áéíóúâêôãõç", "aeiouaeoaoc")
+
+_UNIT = r"(?:primeir[ao]|segund[ao]|terceir[ao]|quart[ao]|quint[ao]|sext[ao]|s[ée]tim[ao]|oitav[ao]|non[ao])"
+_TEN = r"(?:d[ée]cim[ao]|vig[ée]sim[ao]|trig[ée]sim[ao]|quadrag[ée]sim[ao]|quinquag[ée]sim[ao])"
+ORDINAL = rf"(?:{_TEN}(?:\s+{_UNIT})?|{_UNIT}|[úu]nic[ao])"
+
+# Every pattern is anchored at the start of a single line, and no two adjacent quantifiers can
+# match the same characters, so classifying a line is linear in its length.
+CLAUSE_HEADING_PATTERN = re.compile(
+    rf"(?:CL[ÁA]USULA|CLAUSE|SE[ÇC][ÃA]O|SECTION|ARTIGO|ARTICLE|ART\.)\s*"
+    rf"(?P<number>\d{{1,3}}(?:\.\d{{1,3}}){{0,5}}|{ORDINAL}|(?-i:[IVXLC]{{1,8}})\b)[ºª°o]?\.?"
+    rf"(?:\s*[-–—:]\s*|\s+|$)(?P<title>.*)",
+    re.IGNORECASE
+)
+PARAGRAPH_PATTERN = re.compile(
+    rf"(?:§\s*(?P<symbol>\d{{1,3}})[ºo°]?|PAR[ÁA]GRAFO\s+(?P<word>{ORDINAL}|\d{{1,3}}[ºo°]?))\.?(?:\s*[-–—:.]\s*|\s+|$)(?P<rest>.*)",
+    re.IGNORECASE
+)
+# "1. DO OBJETO", "2 – DO PREÇO", "3) ...", "4.1 O prazo...". A top-level number needs a separator,
+# so body lines such as "30 dias após..." are not taken for clause 30.
+NUMBERED_PATTERN = re.compile(r"(?P<number>\d{1,3}(?:\.\d{1,3}){0,5})(?P<separator>\.|\)|\s*[-–—])?\s+(?P<rest>\S.*)")
+
+def iter_lines(text: str):
+    """
+    Yields the lines of `text` one at a time, without building the list of all lines.
+    """
+    start = 0
+    while True:
+        end = text.find("\n", start)
+        if end < 0:
+            yield text[start:]
+            return
+        yield text[start:end]
+        start = end + 1
+
+def ordinal_value(token: str):
+    """
+    Numeric value of a clause number token: "3", "3º", "III", "TERCEIRA", "DÉCIMA PRIMEIRA".
+    Dotted numbers keep their dots ("4.1"); unknown tokens are returned as written.
+    """
+    token = token.strip().rstrip("ºª°o.") if token[:1].isdigit() else token.strip()
+    if token[:1].isdigit():
+        return token
+    words = token.lower().translate(ACCENTS).split()
+    if words and all(word in UNITS or word in TENS for word in words):
+        return str(sum(TENS.get(word, 0) + UNITS.get(word, 0) for word in words))
+    if token.upper() == token and all(char in ROMAN for char in token):
+        values = [ROMAN[char] for char in token]
+        return str(sum(-value if value < following else value for value, following in zip(values, values[1:] + [0])))
+    return token
+
+def is_title_line(line: str) -> bool:
+    """
+    Short all-caps lines ("DO OBJETO", "CONFIDENCIALIDADE") are headings. Checked with string
+    methods rather than a character-class regex, so all-caps input cannot cause backtracking.
+    """
+    if not line.isupper() or line[-1] in ".,;":
+        return False
+    words = line.split()
+    return len(words) <= MAX_TITLE_WORDS and words[-1] not in CONNECTIVES and sum(char.isalpha() for char in line) >= 5
+
 class LegalClauseExtractorPipeline:
+    """
+    Segments contracts into clauses line by line, in one pass and without keeping more than the
+    clause being built. Headings are "CLÁUSULA PRIMEIRA", "Art. 5º", "§ 2º"/"Parágrafo único",
+    numbered lines ("1. DO OBJETO", "4.2 ...") and short all-caps titles. Each clause carries its
+    number, its parent's number and its depth, so sub-clauses ("4.2", "§ 1º") nest under theirs.
+    Text before the first heading (the preamble) is not a clause.
+    """
+
     def __init__(self):
-        self.clause_pattern = re.compile(
-            r'^(CLÁUSULA\s+[A-Zªº]+|[\d\.]+\s*[-–—.]?\s*DO\s+[A-Z\s]+|([A-Z\s]{5,}))', 
-            re.IGNORECASE | re.MULTILINE
-        )
+        self.clause_pattern = CLAUSE_HEADING_PATTERN
+        self.paragraph_pattern = PARAGRAPH_PATTERN
+        self.numbered_pattern = NUMBERED_PATTERN
+
+    def _classify(self, line: str, previous_line_ended: bool):
+        """
+        Returns (kind, number, title, body, confidence) for a heading line, or None for body text.
+        `title` is stored as clause_type; `body` is text following the heading on the same line.
+        """
+        if len(line) > MAX_HEADING_LENGTH:
+            return None
+        match = self.clause_pattern.match(line)
+        if match:
+            number, title = ordinal_value(match.group("number")), match.group("title")
+            if not title:
+                return "untitled_clause", number, line, "", 95
+            # "Art. 5º O locatário..." starts the clause text on the heading line
+            if title[-1] in ".;:" or len(title.split()) > MAX_TITLE_WORDS:
+                return "clause", number, line[:match.start("title")].strip(" -–—:"), title, 95
+            return "clause", number, line, "", 95
+        match = self.paragraph_pattern.match(line)
+        if match:
+            number = match.group("symbol") or ordinal_value(match.group("word"))
+            return "paragraph", "§" + number, line[:match.start("rest")].strip(" -–—:."), match.group("rest"), 90
+        match = self.numbered_pattern.match(line)
+        if match and ("." in match.group("number") or match.group("separator")):
+            number, rest = match.group("number"), match.group("rest")
+            if number.count(".") >= MAX_DEPTH:
+                return None
+            if is_title_line(rest):
+                return "numbered", number, line, "", 90
+            return "numbered", number, number, rest, 85
+        # A wrapped all-caps sentence continues the previous line; a title follows a blank line or
+        # a line that ended a sentence
+        if previous_line_ended and is_title_line(line):
+            return "title", None, line, "", 75
+        return None
+
+    def iter_clauses(self, lines):
+        """
+        Yields clause dicts (clause_type, clause_text, confidence, clause_number, parent_number,
+        depth, position) from an iterable of lines, each one as soon as the next heading is seen.
+        """
+        open_numbers = []  # numbers of the enclosing clauses, outermost first
+        current, body = None, []
+        awaiting_title = False
+        previous_line_ended = True
+        position = 0
+
+        for raw_line in lines:
+            line = raw_line.strip()
+            if not line:
+                previous_line_ended = True
+                continue
+
+            heading = self._classify(line, previous_line_ended)
+            previous_line_ended = line[-1] in ".:;"
+
+            # "CLÁUSULA PRIMEIRA" with its title on the next line
+            if awaiting_title and heading is None and is_title_line(line):
+                current["clause_type"] = f"{current['clause_type']} – {line}"
+                awaiting_title = False
+                continue
+            awaiting_title = False
+
+            if heading is None:
+                if current is not None:
+                    body.append(line)
+                continue
+
+            if current is not None:
+                current["clause_text"] = "\n".join(body)
+                yield current
+
+            kind, number, title, rest, confidence = heading
+            if kind == "title":
+                parent, depth = None, 1
+                open_numbers = []
+            elif kind == "paragraph":
+                parent = open_numbers[0] if open_numbers else None
+                number = f"{parent}.{number}" if parent else number
+                depth = 2 if parent else 1
+                open_numbers = [parent, number] if parent else [number]
+            else:
+                parts = number.split(".")
+                parent, depth = (".".join(parts[:-1]) or None), len(parts)
+                open_numbers = [".".join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+            current = {
+                "clause_type": title,
+                "clause_text": "",
+                "confidence": confidence,  # Confiança baseada em regras
+                "clause_number": number,
+                "parent_number": parent,
+                "depth": depth,
+                "position": position,
+            }
+            body = [rest] if rest else []
+            awaiting_title = kind == "untitled_clause"
+            position += 1
+
+        if current is not None:
+            current["clause_text"] = "\n".join(body)
+            yield current
 
     def extract_clauses(self, text: str) -> list:
-        clauses = []
-        matches = list(self.clause_pattern.finditer(text))
-
-        if not matches:
-            return clauses
-
-        for i, current_match in enumerate(matches):
-            clause_title = current_match.group(0).strip()
-            
-            start_pos = current_match.end()
-            end_pos = matches[i + 1].start() if (i + 1) < len(matches) else len(text)
-            
-            clause_content = text[start_pos:end_pos].strip()
-
-            clauses.append({
-                "clause_type": clause_title,
-                "clause_text": clause_content,
-                "confidence": 90 # Confiança baseada em regras
-            })
-            
-        return clauses
-
-legal_clause_extractor_pipeline = LegalClauseExtractorPipeline()
\ No newline at end of file
+        return list(self.iter_clauses(iter_lines(text)))
+
+legal_clause_extractor_pipeline = LegalClauseExtractorPipeline()
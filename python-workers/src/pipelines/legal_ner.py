@@ -1,21 +1,21 @@
-from transformers import pipeline
+from pipelines.model_registry import model_registry
+from instrumentation import model_call
 
 class LegalNERPipeline:
     def __init__(self):
-        self.pipeline = None
         # NER-Specialized Template for English Legal Documents
         self.model_name = "maastrichtlawtech/legal-ner-bert"
 
-    def _load_pipeline(self):
-        if self.pipeline is None:
-            self.pipeline = pipeline("ner", model=self.model_name, grouped_entities=True)
+    def _get_pipeline(self):
+        # Vertical model: evictable under MODEL_MEMORY_BUDGET_MB, so it is fetched from the registry on every call
+        return model_registry.get("ner", self.model_name, evictable=True, grouped_entities=True)
 
     def extract_legal_entities(self, text: str) -> list:
-        self._load_pipeline()
-        
         if not text:
             return []
 
-        return self.pipeline(text)
+        pipeline = self._get_pipeline()
+        with model_call(self.model_name):
+            return pipeline(text)
 
 legal_ner_pipeline = LegalNERPipeline()
\ No newline at end of file
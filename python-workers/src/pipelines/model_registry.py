@@ -0,0 +1,143 @@
+from collections import OrderedDict
+import os
+import threading
+import time
+
+SENTENCE_EMBEDDING_TASK = "sentence-embedding"
+
+# Models used by the ingestion pipelines, in the order they are loaded by an eager warm-up.
+# Vertical models are evictable: they are only needed for some documents and can be dropped
+# under memory pressure and reloaded on demand.
+KNOWN_MODELS = {
+    "embedding": {"task": SENTENCE_EMBEDDING_TASK, "model_name": "all-MiniLM-L6-v2"},
+    "summarization": {"task": "summarization", "model_name": "Falconsai/text_summarization"},
+    "ner": {"task": "ner", "model_name": "dslim/bert-base-NER", "kwargs": {"grouped_entities": True}},
+    "zero_shot": {"task": "zero-shot-classification", "model_name": "facebook/bart-large-mnli"},
+    "finance_ner": {"task": "ner", "model_name": "Jean-Baptiste/roberta-large-ner-english", "kwargs": {"grouped_entities": True}, "evictable": True},
+    "legal_ner": {"task": "ner", "model_name": "maastrichtlawtech/legal-ner-bert", "kwargs": {"grouped_entities": True}, "evictable": True},
+}
+
+def _current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+def _memory_footprint_mb(model) -> float:
+    inner_model = getattr(model, "model", model)
+    if hasattr(inner_model, "get_memory_footprint"):
+        return inner_model.get_memory_footprint() / (1024 * 1024)
+    if hasattr(inner_model, "parameters"):
+        return sum(p.numel() * p.element_size() for p in inner_model.parameters()) / (1024 * 1024)
+    return 0.0
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded models, deduplicated by (task, model name, pipeline kwargs).
+    Records load time and memory per model and, when MODEL_MEMORY_BUDGET_MB is set, evicts the
+    least recently used evictable models to stay under the budget.
+    """
+    def __init__(self, memory_budget_mb=None):
+        if memory_budget_mb is None:
+            memory_budget_mb = float(os.environ.get("MODEL_MEMORY_BUDGET_MB", "0"))
+        self.memory_budget_mb = memory_budget_mb
+        self._models = OrderedDict()
+        self._lock = threading.RLock()
+        self._load_locks = {}  # key -> Lock held while that model loads
+
+    def _key(self, task: str, model_name: str, kwargs: dict) -> tuple:
+        return (task, model_name, tuple(sorted(kwargs.items())))
+
+    def _load(self, task: str, model_name: str, kwargs: dict):
+        if task == SENTENCE_EMBEDDING_TASK:
+            from sentence_transformers import SentenceTransformer
+            return SentenceTransformer(model_name, **kwargs)
+        from transformers import pipeline
+        return pipeline(task, model=model_name, **kwargs)
+
+    def get(self, task: str, model_name: str, evictable: bool = False, **kwargs):
+        key = self._key(task, model_name, kwargs)
+        with self._lock:
+            if key in self._models:
+                return self._use(key)
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Loading can take minutes, so it happens outside the registry lock: lookups of models that
+        # are already loaded go on, and only callers of this same model wait for it
+        with load_lock:
+            with self._lock:
+                if key in self._models:
+                    return self._use(key)
+            rss_before = _current_rss_mb()
+            start = time.perf_counter()
+            model = self._load(task, model_name, kwargs)
+            entry = {
+                "model": model,
+                "task": task,
+                "model_name": model_name,
+                "evictable": evictable,
+                "load_seconds": time.perf_counter() - start,
+                "footprint_mb": _memory_footprint_mb(model),
+                "rss_delta_mb": max(_current_rss_mb() - rss_before, 0.0),
+                "uses": 0,
+            }
+            print(f"Model registry: loaded {task}/{model_name} in {entry['load_seconds']:.1f}s ({entry['footprint_mb']:.1f} MB weights, +{entry['rss_delta_mb']:.1f} MB RSS).")
+            with self._lock:
+                self._models[key] = entry
+                self._enforce_budget(keep=key)
+                return self._use(key)
+
+    def _use(self, key: tuple):
+        entry = self._models[key]
+        entry["uses"] += 1
+        entry["last_used"] = time.monotonic()
+        self._models.move_to_end(key)
+        return entry["model"]
+
+    def get_known(self, alias: str):
+        spec = KNOWN_MODELS[alias]
+        return self.get(spec["task"], spec["model_name"], evictable=spec.get("evictable", False), **spec.get("kwargs", {}))
+
+    def total_footprint_mb(self) -> float:
+        with self._lock:
+            return sum(entry["footprint_mb"] for entry in self._models.values())
+
+    def _enforce_budget(self, keep: tuple):
+        if not self.memory_budget_mb:
+            return
+        # _models is kept in least-recently-used order
+        for key in list(self._models):
+            if self.total_footprint_mb() <= self.memory_budget_mb:
+                break
+            entry = self._models[key]
+            if key != keep and entry["evictable"]:
+                del self._models[key]
+                print(f"Model registry: evicted {entry['task']}/{entry['model_name']} ({entry['footprint_mb']:.1f} MB) to stay under the {self.memory_budget_mb:.0f} MB budget.")
+
+    def warm_up(self, aliases: list = None):
+        """
+        Eagerly loads the given known models (all of them by default) so the first job after a
+        restart does not pay the loading cost.
+        """
+        for alias in aliases or list(KNOWN_MODELS):
+            if alias not in KNOWN_MODELS:
+                print(f"Model registry: unknown model '{alias}' in warm-up list, skipping.")
+                continue
+            self.get_known(alias)
+        self.report()
+
+    def stats(self) -> list:
+        with self._lock:
+            return [
+                {key: value for key, value in entry.items() if key not in ("model", "last_used")}
+                for entry in self._models.values()
+            ]
+
+    def report(self):
+        for entry in self.stats():
+            print(f"  - {entry['task']}/{entry['model_name']}: load {entry['load_seconds']:.1f}s, {entry['footprint_mb']:.1f} MB weights, +{entry['rss_delta_mb']:.1f} MB RSS, {entry['uses']} uses{' (evictable)' if entry['evictable'] else ''}")
+        print(f"Model registry: {len(self._models)} models resident, {self.total_footprint_mb():.1f} MB of weights (budget: {self.memory_budget_mb or 'unlimited'}).")
+
+model_registry = ModelRegistry()
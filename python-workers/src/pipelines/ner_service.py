@@ -0,0 +1,68 @@
+from collections import OrderedDict
+import os
+import re
+import threading
+from pipelines.model_registry import model_registry
+from instrumentation import model_call
+
+SENTENCE_SPLIT_PATTERN = re.compile(r'(?<=[.!?])\s+')
+
+def split_sentences(text: str) -> list:
+    return SENTENCE_SPLIT_PATTERN.split(text)
+
+def normalize_sentence(sentence: str) -> str:
+    # Chunk text is whitespace-normalized while raw text keeps its line breaks; both key the same entry
+    return " ".join(sentence.split())
+
+class NERService:
+    """
+    Single `dslim/bert-base-NER` pipeline shared by every pipeline that needs general NER
+    (action items, knowledge graph). Sentences are run through the model in batches and the
+    per-sentence results are kept in a bounded LRU cache, so a sentence seen by one pipeline
+    is not run through the model again by the next one. Sentences are whitespace-normalized
+    before lookup and inference, so raw text and chunk text share entries.
+    """
+    def __init__(self, batch_size=32, cache_size=None):
+        self.model_name = "dslim/bert-base-NER"
+        self.batch_size = batch_size
+        self.cache_size = cache_size or int(os.environ.get("NER_CACHE_SIZE", "20000"))
+        self._cache = OrderedDict()
+        # Pipeline stages may call annotate concurrently; the lock also lets the second caller find
+        # the first caller's sentences in the cache instead of running them through the model again.
+        self._lock = threading.Lock()
+
+    def _get_pipeline(self):
+        return model_registry.get("ner", self.model_name, grouped_entities=True)
+
+    def annotate(self, sentences: list) -> list:
+        """
+        Returns the NER results for each sentence, in input order.
+        Only sentences that are not cached yet go through the model, in one batched call.
+        """
+        sentences = [normalize_sentence(sentence) for sentence in sentences]
+        with self._lock:
+            return self._annotate(sentences)
+
+    def _annotate(self, sentences: list) -> list:
+        missing = list(dict.fromkeys(s for s in sentences if s and s not in self._cache))
+        if missing:
+            with model_call(self.model_name):
+                results = self._get_pipeline()(missing, batch_size=self.batch_size)
+            for sentence, entities in zip(missing, results):
+                self._cache[sentence] = entities
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        annotations = []
+        for sentence in sentences:
+            entities = self._cache.get(sentence)
+            if entities is None:
+                # Empty sentence, or evicted by this same call on a very large input
+                with model_call(self.model_name):
+                    entities = self._get_pipeline()(sentence) if sentence else []
+            else:
+                self._cache.move_to_end(sentence)
+            annotations.append(entities)
+        return annotations
+
+ner_service = NERService()
@@ -1,21 +1,143 @@
-from transformers import pipeline
+import os
+import numpy as np
+from pipelines.model_registry import model_registry
+from instrumentation import model_call
 
 class SummarizationPipeline:
-    def __init__(self):
+    def __init__(self, batch_size=8):
         self.model_name = "Falconsai/text_summarization"
-        self.pipeline = None
+        self.max_input_length = 1024
+        self.batch_size = batch_size
+        # Map-reduce settings for long documents. The token budget caps how many chunk tokens
+        # (approximated by words) go through the map stage, which keeps latency predictable.
+        self.mode = os.environ.get("SUMMARIZATION_MODE", "hierarchical")
+        self.token_budget = int(os.environ.get("SUMMARIZATION_TOKEN_BUDGET", "4096"))
+        self.near_duplicate_threshold = 0.95
+        self.map_max_length = 80
+        self.reduce_group_words = 350
 
-    def _load_pipeline(self):
-        if self.pipeline is None:
-            self.pipeline = pipeline("summarization", model=self.model_name)
+    def _get_pipeline(self):
+        return model_registry.get("summarization", self.model_name)
+
+    def _generate(self, texts: list, max_length: int, min_length: int) -> list:
+        summarizer = self._get_pipeline()
+        with model_call(self.model_name):
+            summary_list = summarizer(texts, max_length=max_length, min_length=min_length, do_sample=False, truncation=True, batch_size=self.batch_size)
+        return [summary['summary_text'] for summary in summary_list]
 
     def summarize(self, text: str) -> str:
-        self._load_pipeline()
+        return self.summarize_batch([text])[0]
+
+    def summarize_batch(self, texts: list) -> list:
+        """
+        Summarizes several documents with a single batched model call.
+        """
+        if not texts:
+            return []
+
+        truncated_texts = [text[:self.max_input_length] for text in texts]
+        return self._generate(truncated_texts, max_length=150, min_length=30)
+
+    def _select_representative_chunks(self, chunk_texts: list, embeddings) -> list:
+        """
+        Picks the chunks to summarize, in document order: near-duplicate chunks (cosine similarity
+        above the threshold to an already picked chunk) are skipped, and when the token budget is
+        exceeded, chunks are picked by maximal marginal relevance against the document centroid.
+        """
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+        candidates = []
+        for i in range(len(chunk_texts)):
+            if candidates and float(np.max(vectors[candidates] @ vectors[i])) > self.near_duplicate_threshold:
+                continue
+            candidates.append(i)
+
+        average_tokens = max(np.mean([len(chunk_texts[i].split()) for i in candidates]), 1.0)
+        max_chunks = max(1, int(self.token_budget // average_tokens))
+        if len(candidates) <= max_chunks:
+            return candidates
+
+        centroid = vectors[candidates].mean(axis=0)
+        relevance = vectors[candidates] @ centroid
+        selected = [int(np.argmax(relevance))]
+        redundancy = vectors[candidates] @ vectors[candidates[selected[0]]]
+        while len(selected) < max_chunks:
+            scores = 0.5 * relevance - 0.5 * redundancy
+            scores[selected] = -np.inf
+            best = int(np.argmax(scores))
+            selected.append(best)
+            redundancy = np.maximum(redundancy, vectors[candidates] @ vectors[candidates[best]])
+        return sorted(candidates[i] for i in selected)
+
+    def summarize_long_batch(self, documents: list) -> list:
+        """
+        Map-reduce summarization for several documents given as (chunk_texts, chunk_embeddings) pairs.
+        Representative chunks of every document are summarized in one batched map call, then the
+        partial summaries are merged group by group (again batched across documents) until each
+        document has a single summary.
+        """
+        if self.mode != "hierarchical":
+            return self.summarize_batch([" ".join(chunk_texts) for chunk_texts, _ in documents])
+
+        selections = [self._select_representative_chunks(chunk_texts, embeddings) if chunk_texts else [] for chunk_texts, embeddings in documents]
+        single_pass = [len(selection) <= 1 for selection in selections]
+
+        map_inputs, owners = [], []
+        for doc_index, ((chunk_texts, _), selection) in enumerate(zip(documents, selections)):
+            if single_pass[doc_index]:
+                continue
+            for i in selection:
+                map_inputs.append(chunk_texts[i])
+                owners.append(doc_index)
+        partials = [[] for _ in documents]
+        if map_inputs:
+            for doc_index, summary in zip(owners, self._generate(map_inputs, max_length=self.map_max_length, min_length=10)):
+                partials[doc_index].append(summary)
+
+        # Documents that fit in one chunk are summarized directly in the final pass
+        for doc_index, ((chunk_texts, _), selection) in enumerate(zip(documents, selections)):
+            if single_pass[doc_index]:
+                partials[doc_index] = [chunk_texts[selection[0]]] if selection else [""]
+
+        while True:
+            groups, owners = [], []
+            for doc_index, summaries in enumerate(partials):
+                if len(summaries) <= 1:
+                    continue
+                if sum(len(summary.split()) for summary in summaries) <= self.reduce_group_words:
+                    # Small enough to be the input of the final pass as is
+                    partials[doc_index] = [" ".join(summaries)]
+                    continue
+                group, group_words = [], 0
+                for summary in summaries:
+                    words = len(summary.split())
+                    # At least two summaries per group, so every round shrinks the list
+                    if len(group) >= 2 and group_words + words > self.reduce_group_words:
+                        groups.append(" ".join(group))
+                        owners.append(doc_index)
+                        group, group_words = [], 0
+                    group.append(summary)
+                    group_words += words
+                groups.append(" ".join(group))
+                owners.append(doc_index)
+            if not groups:
+                break
+
+            merged = [[] for _ in documents]
+            for doc_index, summary in zip(owners, self._generate(groups, max_length=self.map_max_length, min_length=10)):
+                merged[doc_index].append(summary)
+            partials = [merged[i] if merged[i] else partials[i] for i in range(len(documents))]
 
-        max_input_length = 1024
-        truncated_text = text[:max_input_length]
+        final_inputs = [summaries[0] if summaries else "" for summaries in partials]
+        results = [""] * len(documents)
+        indices = [i for i, text in enumerate(final_inputs) if text]
+        if indices:
+            for i, summary in zip(indices, self._generate([final_inputs[i] for i in indices], max_length=150, min_length=30)):
+                results[i] = summary
+        return results
 
-        summary_list = self.pipeline(truncated_text, max_length=150, min_length=30, do_sample=False)
-        return summary_list[0]['summary_text']
+    def summarize_long(self, chunk_texts: list, embeddings) -> str:
+        return self.summarize_long_batch([(chunk_texts, embeddings)])[0]
 
-summarization_pipeline = SummarizationPipeline()
\ No newline at end of file
+summarization_pipeline = SummarizationPipeline()
@@ -1,63 +1,234 @@
 import pandas as pd
+import numpy as np
 import io
-import json
+import itertools
+import os
+from pipelines.anomaly_detection import AnomalyDetector, ReservoirSample
+
+class RunningColumnStats:
+    """
+    Count, mean, variance, min and max of numeric columns, merged chunk by chunk
+    (Chan et al. parallel update), so the full table is never held in memory.
+    """
+    def __init__(self, columns: list):
+        self.columns = list(columns)
+        size = len(self.columns)
+        self.count = np.zeros(size)
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+        self.min = np.full(size, np.inf)
+        self.max = np.full(size, -np.inf)
+
+    def update(self, values: np.ndarray):
+        present = ~np.isnan(values)
+        count = present.sum(axis=0)
+        if not count.any():
+            return
+        safe_count = np.maximum(count, 1)
+        mean = np.where(present, values, 0.0).sum(axis=0) / safe_count
+        m2 = np.where(present, (values - mean) ** 2, 0.0).sum(axis=0)
+
+        total = self.count + count
+        delta = mean - self.mean
+        safe_total = np.maximum(total, 1)
+        self.mean = self.mean + delta * count / safe_total
+        self.m2 = self.m2 + m2 + delta ** 2 * self.count * count / safe_total
+        self.count = total
+        self.min = np.minimum(self.min, np.where(present, values, np.inf).min(axis=0))
+        self.max = np.maximum(self.max, np.where(present, values, -np.inf).max(axis=0))
+
+    @property
+    def std(self) -> np.ndarray:
+        # Sample standard deviation, as pandas computes it
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > 1, np.sqrt(self.m2 / np.maximum(self.count - 1, 1)), np.nan)
+
+    def to_dict(self) -> dict:
+        std = self.std
+        summary = {}
+        for i, column in enumerate(self.columns):
+            if not self.count[i]:
+                continue
+            summary[column] = {
+                "count": float(self.count[i]),
+                "mean": float(self.mean[i]),
+                "std": None if np.isnan(std[i]) else float(std[i]),
+                "min": float(self.min[i]),
+                "max": float(self.max[i]),
+            }
+        return summary
+
+# Dtype a column is widened to when a later chunk holds values its current dtype cannot represent
+WIDER_DTYPES = {"boolean": "object", "Int64": "Float64", "Float64": "object"}
 
 class TabularProcessingPipeline:
-    def _detect_anomalies(self, df: pd.DataFrame) -> list:
-        anomalies = []
-        numeric_cols = df.select_dtypes(include=['number']).columns
-        if numeric_cols.empty:
-            return anomalies
-
-        # Simple anomaly detection using Z-score on the first numeric column
-        col_to_check = numeric_cols[0]
-        mean = df[col_to_check].mean()
-        std = df[col_to_check].std()
-        
-        if std > 0:
-            df['z_score'] = (df[col_to_check] - mean) / std
-            # Find rows where the z-score is > 3 or < -3
-            outliers = df[abs(df['z_score']) > 3]
-            for index, row in outliers.iterrows():
-                anomalies.append({
-                    "row": int(index),
-                    "column": col_to_check,
-                    "value": row[col_to_check],
-                    "reason": "Z-score > 3",
-                })
-        return anomalies
+    def __init__(self):
+        # Rows parsed per chunk, rows per persisted page, and rows used to infer column dtypes
+        self.page_rows = int(os.environ.get("TABULAR_PAGE_ROWS", "5000"))
+        self.chunk_rows = max(self.page_rows, int(os.environ.get("TABULAR_CHUNK_ROWS", "50000")) // self.page_rows * self.page_rows)
+        self.sample_rows = int(os.environ.get("TABULAR_SAMPLE_ROWS", "10000"))
+        self.robust_sample_rows = int(os.environ.get("TABULAR_ROBUST_SAMPLE_ROWS", "200000"))
+        self.anomaly_detector = AnomalyDetector()
 
-    def process(self, file_bytes: bytes, file_name: str) -> dict:
+    def _open(self, source):
+        return io.BytesIO(source) if isinstance(source, (bytes, bytearray, memoryview)) else source
+
+    def _infer_dtypes(self, sample: pd.DataFrame) -> dict:
+        # Nullable numeric dtypes, so a missing value in a later chunk does not break the declared type
+        dtypes = {}
+        for column, dtype in sample.dtypes.items():
+            if pd.api.types.is_bool_dtype(dtype):
+                dtypes[column] = "boolean"
+            elif pd.api.types.is_integer_dtype(dtype):
+                dtypes[column] = "Int64"
+            elif pd.api.types.is_float_dtype(dtype):
+                dtypes[column] = "Float64"
+        return dtypes
+
+    def _apply_dtypes(self, frame: pd.DataFrame, dtypes: dict) -> pd.DataFrame:
+        """
+        Casts a chunk to the dtypes inferred so far. The sample only hints at the types: a column
+        whose values no longer fit (a decimal or text in an integer column) is widened through
+        WIDER_DTYPES, and `dtypes` is updated so later chunks keep the wider type.
+        """
+        for column, dtype in list(dtypes.items()):
+            if column not in frame.columns:
+                continue
+            while True:
+                try:
+                    frame[column] = frame[column].astype(dtype)
+                    break
+                except (TypeError, ValueError):
+                    dtype = dtypes[column] = WIDER_DTYPES[dtype]
+        return frame
+
+    def _numeric_values(self, frame: pd.DataFrame, columns: list) -> np.ndarray:
+        # Columns widened to object by a later chunk still contribute their numeric values
+        numeric = frame[columns].apply(lambda column: column if pd.api.types.is_numeric_dtype(column) else pd.to_numeric(column, errors='coerce'))
+        return numeric.to_numpy(dtype=np.float64, na_value=np.nan)
+
+    def _iter_excel_frames(self, source, usecols=None):
+        import openpyxl
+
+        workbook = openpyxl.load_workbook(self._open(source), read_only=True, data_only=True)
         try:
-            if file_name.endswith('.csv'):
-                df = pd.read_csv(io.BytesIO(file_bytes))
-            elif file_name.endswith('.xlsx'):
-                df = pd.read_excel(io.BytesIO(file_bytes))
-            else:
-                return None
-        except Exception as e:
-            print(f"Failed to parse tabular file {file_name}: {e}")
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            header = [name if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+            dtypes = None
+            while True:
+                batch = list(itertools.islice(rows, self.chunk_rows))
+                if not batch:
+                    return
+                frame = pd.DataFrame(batch, columns=header).infer_objects()
+                if dtypes is None:
+                    dtypes = self._infer_dtypes(frame)
+                frame = self._apply_dtypes(frame, dtypes)
+                yield frame[usecols] if usecols is not None else frame
+        finally:
+            workbook.close()
+
+    def _iter_frames(self, source, file_name: str, usecols=None):
+        """
+        Yields the table in chunks of `chunk_rows` rows, with dtypes inferred on a sample and
+        widened when a later chunk does not fit them.
+        """
+        if file_name.endswith('.csv'):
+            sample = pd.read_csv(self._open(source), nrows=self.sample_rows)
+            dtypes = self._infer_dtypes(sample)
+            if usecols is not None:
+                dtypes = {column: dtypes[column] for column in usecols if column in dtypes}
+            for frame in pd.read_csv(self._open(source), usecols=usecols, chunksize=self.chunk_rows):
+                yield self._apply_dtypes(frame, dtypes)
+        elif file_name.endswith('.xlsx'):
+            yield from self._iter_excel_frames(source, usecols)
+
+    def _anomaly_bounds(self, stats: RunningColumnStats, sample: ReservoirSample) -> tuple:
+        if sample is None:
+            return self.anomaly_detector.bounds_from_moments(stats.mean, stats.std)
+        if sample.rows is None or not len(sample.rows):
+            empty = np.full(len(stats.columns), np.nan)
+            return empty, empty
+        return self.anomaly_detector.bounds(sample.rows)
+
+    def _detect_anomalies(self, source, file_name: str, stats: RunningColumnStats, sample: ReservoirSample) -> list:
+        """
+        The bands need statistics of the whole column (running moments for z-scores, a row sample
+        for median/MAD and IQR), so anomalies come from a second pass that only parses the numeric
+        columns with a band.
+        """
+        lower, upper = self._anomaly_bounds(stats, sample)
+        checked = np.flatnonzero(~np.isnan(lower) & ~np.isnan(upper))
+        if not len(checked):
+            return []
+        columns = [stats.columns[i] for i in checked]
+        lower, upper = lower[checked], upper[checked]
+
+        anomalies, row_offset = [], 0
+        for frame in self._iter_frames(source, file_name, usecols=columns):
+            values = self._numeric_values(frame, columns)
+            anomalies.extend(self.anomaly_detector.detect(values, columns, lower, upper, row_offset=row_offset, limit=self.anomaly_detector.max_anomalies - len(anomalies)))
+            if len(anomalies) >= self.anomaly_detector.max_anomalies:
+                break
+            row_offset += len(frame)
+        return anomalies
+
+    def process(self, source, file_name: str, on_page=None) -> dict:
+        """
+        Streams a CSV/XLSX file given as bytes or as the path of a spooled copy. Row data is
+        handed to `on_page(page)` in pages of `page_rows` rows, as dicts with page_number,
+        row_offset, row_count and rows_json (a JSON array string). Summary statistics are
+        accumulated over all numeric columns while streaming. `data_json` in the result holds the
+        first page as a preview; for tables that fit in one page it is the whole table.
+        """
+        if not file_name.endswith(('.csv', '.xlsx')):
             return None
 
-        # Schema Inference
-        schema = {col: str(dtype) for col, dtype in df.dtypes.items()}
+        schema, stats, sample, preview = None, None, None, "[]"
+        row_count = page_count = 0
+        try:
+            for frame in self._iter_frames(source, file_name):
+                if stats is None:
+                    stats = RunningColumnStats(frame.select_dtypes(include=['number']).columns)
+                    if self.anomaly_detector.needs_quantiles:
+                        sample = ReservoirSample(self.robust_sample_rows)
+                # Schema Inference: columns only ever widen, so the last chunk has the final dtypes
+                schema = {col: str(dtype) for col, dtype in frame.dtypes.items()}
 
-        # Summary Stats
-        stats = df.describe().to_dict()
+                if stats.columns:
+                    values = self._numeric_values(frame, stats.columns)
+                    stats.update(values)
+                    if sample is not None:
+                        sample.add(values)
 
-        # Anomaly Detection
-        anomalies = self._detect_anomalies(df)
+                for start in range(0, len(frame), self.page_rows):
+                    page = frame.iloc[start:start + self.page_rows]
+                    rows_json = page.to_json(orient='records')
+                    if page_count == 0:
+                        preview = rows_json
+                    if on_page:
+                        on_page({"page_number": page_count, "row_offset": row_count, "row_count": len(page), "rows_json": rows_json})
+                    page_count += 1
+                    row_count += len(page)
 
-        # Convert data to JSON
-        data_json = df.to_json(orient='records')
+            if schema is None:
+                print(f"Tabular file {file_name} has no rows.")
+                return None
+            anomalies = self._detect_anomalies(source, file_name, stats, sample)
+        except Exception as e:
+            print(f"Failed to parse tabular file {file_name}: {e}")
+            return None
 
         return {
-            "data_json": json.loads(data_json),
+            "data_json": preview,
             "detected_schema": schema,
-            "summary_stats": stats,
+            "summary_stats": stats.to_dict(),
             "anomalies": anomalies,
-            "row_count": len(df),
-            "column_count": len(df.columns),
+            "row_count": row_count,
+            "column_count": len(schema),
+            "page_count": page_count,
         }
 
-tabular_processing_pipeline = TabularProcessingPipeline()
\ No newline at end of file
+tabular_processing_pipeline = TabularProcessingPipeline()
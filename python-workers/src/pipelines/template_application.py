@@ -1,21 +1,63 @@
 import re
+import threading
+from collections import OrderedDict
+
+def build_header_pattern(headers: list) -> re.Pattern:
+    """
+    Compiles the headers into one case-insensitive regex shaped like a prefix trie, so headers that
+    share a prefix are matched together in a single left-to-right pass (the Aho-Corasick idea, run
+    by the C regex engine). At a given position the longest header wins.
+    """
+    trie = {}
+    for header in headers:
+        node = trie
+        for char in header.lower():
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char != ""]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{body})?" if "" in node else body
+
+    return re.compile(f"({build(trie)})", re.IGNORECASE)
 
 class TemplateApplicationPipeline:
+    def __init__(self, cache_size=512):
+        # Compiled header patterns keyed by the template's section names
+        self.cache_size = cache_size
+        self._patterns = OrderedDict()
+        self._lock = threading.Lock()
+
+    def header_pattern(self, section_names: tuple) -> re.Pattern:
+        with self._lock:
+            pattern = self._patterns.get(section_names)
+            if pattern is not None:
+                self._patterns.move_to_end(section_names)
+                return pattern
+        pattern = build_header_pattern(list(section_names))
+        with self._lock:
+            self._patterns[section_names] = pattern
+            while len(self._patterns) > self.cache_size:
+                self._patterns.popitem(last=False)
+        return pattern
+
     def apply_template(self, text: str, template: dict) -> dict:
         """
         Parses a text according to a given template definition.
         Returns a dictionary with section names as keys and their content as values.
         """
         structured_content = {}
-        sections = template.get("sections", [])
-        
+        sections = [section for section in template.get("sections", []) if section.get('name')]
+
         if not sections:
             return structured_content
 
-        # Create a regex to find all headers at once
-        header_patterns = [re.escape(section['name']) for section in sections]
-        splitter_pattern = re.compile(f"({'|'.join(header_patterns)})", re.IGNORECASE)
-        
+        # One compiled pattern finds all headers at once; it is built once per template
+        splitter_pattern = self.header_pattern(tuple(section['name'] for section in sections))
+
         parts = splitter_pattern.split(text)
         if len(parts) < 2:
             return {} # Template could not be applied
@@ -30,7 +72,7 @@ class TemplateApplicationPipeline:
             section_name = section['name'].lower()
             if section_name in content_map:
                 structured_content[section_name] = content_map[section_name]
-        
+
         return structured_content
 
-template_application_pipeline = TemplateApplicationPipeline()
\ No newline at end of file
+template_application_pipeline = TemplateApplicationPipeline()
@@ -1,49 +1,123 @@
+import os
 import psycopg2
+import psycopg2.extras
 from psycopg2 import sql
 from collections import Counter
+from pipelines.template_detection import template_detection_pipeline
 
 class TemplateCreationPipeline:
+    def __init__(self):
+        # A structure joins a cluster when its estimated header-set similarity to the cluster's
+        # first member reaches this value; templates are created for clusters of min_cluster_size.
+        self.min_similarity = float(os.environ.get("TEMPLATE_CLUSTER_MIN_SIMILARITY", "0.8"))
+        self.min_cluster_size = 3
+        self.max_clusters_per_bucket = 8
+
+    def _signature(self, features: dict) -> list:
+        # Structures stored before signatures existed get one from their headers
+        return features.get('minhash') or template_detection_pipeline.structure_signature(features.get('headers', []))
+
+    def cluster_structures(self, structures: list) -> list:
+        """
+        Groups (structure_hash, features) pairs into near-identical layouts. Structures are bucketed
+        by the LSH band keys of their MinHash signatures, and each one is only compared with the
+        first member of the (few) clusters it shares a bucket with, so there is no pairwise comparison.
+        Identical structure hashes always fall in the same cluster.
+        """
+        parent = list(range(len(structures)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        signatures = [self._signature(features) for _, features in structures]
+        by_hash, buckets = {}, {}
+        for i, (structure_hash, _) in enumerate(structures):
+            if structure_hash in by_hash:
+                parent[find(i)] = find(by_hash[structure_hash])
+                continue
+            by_hash[structure_hash] = i
+            for key in template_detection_pipeline.lsh_bands(signatures[i]):
+                heads = buckets.setdefault(key, [])
+                joined = False
+                for head in heads:
+                    root = find(head)
+                    if root == find(i) or template_detection_pipeline.signature_similarity(signatures[root], signatures[i]) >= self.min_similarity:
+                        parent[find(i)] = root
+                        joined = True
+                        break
+                # A bucket remembers a few distinct clusters, which keeps the work per structure bounded
+                if not joined and len(heads) < self.max_clusters_per_bucket:
+                    heads.append(i)
+
+        clusters = {}
+        for i in range(len(structures)):
+            clusters.setdefault(find(i), []).append(i)
+        return [[structures[i] for i in members] for members in clusters.values()]
+
     def create_templates_from_structures(self, conn):
         cur = conn.cursor()
-        
-        # Finds hashes of structures that appear multiple times and do not yet have a template
+
+        # Structures whose hash neither keys a template nor was grouped into one by an earlier run
         cur.execute("""
-            SELECT ds.structure_hash, jsonb_agg(ds.features) as all_features
+            SELECT ds.structure_hash, ds.features
             FROM document_structures ds
-            LEFT JOIN document_templates dt ON ds.structure_hash = dt.structure_hash
-            WHERE dt.id IS NULL
-            GROUP BY ds.structure_hash
-            HAVING COUNT(ds.id) > 2;
+            WHERE NOT EXISTS (SELECT 1 FROM document_templates dt WHERE dt.structure_hash = ds.structure_hash)
+            AND NOT EXISTS (SELECT 1 FROM document_template_structures dts WHERE dts.structure_hash = ds.structure_hash);
         """)
-        
-        potential_templates = cur.fetchall()
+
+        potential_templates = [
+            cluster for cluster in self.cluster_structures(cur.fetchall())
+            if len(cluster) >= self.min_cluster_size
+        ]
         created_templates = []
 
-        for structure_hash, all_features in potential_templates:
+        for cluster in potential_templates:
+            all_features = [features for _, features in cluster]
+            # The template is keyed by the most frequent exact hash of the cluster
+            structure_hash = Counter(structure_hash for structure_hash, _ in cluster).most_common(1)[0][0]
+
             # Logic to create a template from aggregated features, finds the most common headers
             header_counter = Counter()
             for feature_set in all_features:
                 header_counter.update(feature_set.get('headers', []))
-            
+
             common_headers = [header for header, count in header_counter.items() if count > len(all_features) / 2]
-            
+
             if common_headers:
                 template_definition = {
                     "sections": [{"name": header, "required": True} for header in sorted(common_headers)]
                 }
                 template_name = f"Auto-Template-{structure_hash[:8]}"
-                
+
                 cur.execute(
                     sql.SQL("""
                         INSERT INTO document_templates (id, template_name, structure_hash, structure_definition, usage_count)
                         VALUES (gen_random_uuid(), %s, %s, %s, %s)
+                        ON CONFLICT (structure_hash) DO NOTHING
+                        RETURNING id
                     """),
                     (template_name, structure_hash, psycopg2.extras.Json(template_definition), len(all_features))
                 )
-                created_templates.append(template_name)
-        
+                inserted = cur.fetchone()
+                if inserted:
+                    template_id = inserted[0]
+                    created_templates.append(template_name)
+                else:
+                    # Another run created it concurrently; the members still belong to that template
+                    cur.execute(sql.SQL("SELECT id FROM document_templates WHERE structure_hash = %s"), (structure_hash,))
+                    template_id = cur.fetchone()[0]
+
+                psycopg2.extras.execute_values(
+                    cur,
+                    "INSERT INTO document_template_structures (structure_hash, template_id) VALUES %s ON CONFLICT (structure_hash) DO NOTHING",
+                    [(member_hash, template_id) for member_hash in sorted({member_hash for member_hash, _ in cluster})]
+                )
+
         conn.commit()
         cur.close()
         return created_templates
 
-template_creation_pipeline = TemplateCreationPipeline()
\ No newline at end of file
+template_creation_pipeline = TemplateCreationPipeline()
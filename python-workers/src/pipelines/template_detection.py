@@ -1,35 +1,127 @@
 import re
 import json
 import hashlib
+import random
+import numpy as np
+
+# Mersenne prime for the MinHash universal hash family. Tokens and coefficients stay below 2**32,
+# so a * token + b fits in uint64 and the whole signature is one vectorized expression.
+_MINHASH_PRIME = np.uint64((1 << 61) - 1)
 
 class TemplateDetectionPipeline:
+    def __init__(self, num_permutations=64, bands=16, seed=1):
+        # Matched once per line: headers like "1. Title", "1.2. Title", "## Title" and bullet points
+        self.header_pattern = re.compile(r'(?:(#\s*)|(\d+(?:\.\d+)*\.\s*))(.*)')
+        self.bullet_pattern = re.compile(r'\s*[\*\-](?:\s|$)')
+        rng = random.Random(seed)
+        self.minhash_a = np.array([rng.randrange(1, 1 << 32) for _ in range(num_permutations)], dtype=np.uint64)[:, None]
+        self.minhash_b = np.array([rng.randrange(0, 1 << 32) for _ in range(num_permutations)], dtype=np.uint64)[:, None]
+        self.bands = bands
+
     def _hash_structure(self, features: dict) -> str:
         # Create a stable hash from the detected features
         feature_string = json.dumps(features, sort_keys=True)
         return hashlib.sha256(feature_string.encode('utf-8')).hexdigest()
 
+    def structure_signature(self, headers: list) -> list:
+        """
+        MinHash signature of the header set: the fraction of equal positions in two signatures
+        estimates the Jaccard similarity of the two header sets.
+        """
+        tokens = {int.from_bytes(hashlib.blake2b(header.encode('utf-8'), digest_size=4).digest(), 'big') for header in set(headers)}
+        if not tokens:
+            return []
+        tokens = np.fromiter(tokens, dtype=np.uint64, count=len(tokens))[None, :]
+        return ((self.minhash_a * tokens + self.minhash_b) % _MINHASH_PRIME).min(axis=1).tolist()
+
+    def lsh_bands(self, signature: list) -> list:
+        """
+        Splits a signature into bands and hashes each one. Layouts whose header sets are similar
+        share at least one band key with high probability, so they can be grouped by key.
+        """
+        if not signature:
+            return []
+        rows = len(signature) // self.bands
+        return [
+            f"{band}:" + hashlib.blake2b(json.dumps(signature[band * rows:(band + 1) * rows]).encode('utf-8'), digest_size=8).hexdigest()
+            for band in range(self.bands)
+        ]
+
+    @staticmethod
+    def signature_similarity(first: list, second: list) -> float:
+        if not first or len(first) != len(second):
+            return 0.0
+        return sum(a == b for a, b in zip(first, second)) / len(first)
+
     def extract_features(self, text: str) -> dict:
-        features = {}
-        
-        # Simple regex to find headers like "1. Title", "1.2 Title", "## Title"
-        header_pattern = re.compile(r'^(#\s*.*|\d+(?:\.\d+)*\.\s*.*)', re.MULTILINE)
-        headers = header_pattern.findall(text)
-        
-        # Clean up headers
-        cleaned_headers = [re.sub(r'^(#\s*|\d+(?:\.\d+)*\.\s*)', '', h).strip().lower() for h in headers]
-        
-        features['header_count'] = len(cleaned_headers)
-        features['headers'] = cleaned_headers
-        
-        # Simple regex for bullet points
-        bullet_pattern = re.compile(r'^\s*[\*\-]\s+', re.MULTILINE)
-        features['bullet_point_count'] = len(bullet_pattern.findall(text))
-        
-        structure_hash = self._hash_structure(features)
-        
+        """
+        Scans the text once, line by line, collecting headers, their numbering depth, the length of
+        the section under each header and the bullet points. The structure hash covers the header
+        list and counts and stays equal to the original multiline-regex implementation, so stored
+        templates keep matching; the MinHash signature lets near-identical layouts be grouped.
+        """
+        headers, header_depths, section_lengths = [], [], []
+        bullet_point_count = 0
+        # The original patterns' \s could run across newlines. A header with nothing after its marker
+        # took the next non-blank line as its title, and a bullet with nothing after its marker
+        # swallowed the indentation of the next non-blank line, hiding an indented bullet there.
+        untitled_header = None
+        bullet_swallows_indent = False
+
+        lines = text.split('\n')
+        last_line = len(lines) - 1
+        for index, line in enumerate(lines):
+            if line.isspace() or not line:
+                if section_lengths:
+                    section_lengths[-1] += len(line) + 1
+                continue
+
+            bullet = self.bullet_pattern.match(line)
+            if bullet:
+                marker_rest = line.lstrip()[1:]
+                counted = not (bullet_swallows_indent and line[0].isspace()) and (marker_rest or index < last_line)
+                if counted:
+                    bullet_point_count += 1
+                bullet_swallows_indent = bool(counted) and not marker_rest.strip()
+            else:
+                bullet_swallows_indent = False
+
+            if untitled_header is not None:
+                headers[untitled_header] = line.strip().lower()
+                untitled_header = None
+                continue
+
+            header = self.header_pattern.match(line)
+            if header:
+                markdown_marker, numbering, title = header.groups()
+                if not title.strip():
+                    untitled_header = len(headers)
+                headers.append(title.strip().lower())
+                if numbering:
+                    header_depths.append(numbering.count('.'))
+                else:
+                    header_depths.append(1 + len(title) - len(title.lstrip('#')))
+                section_lengths.append(0)
+                continue
+            if section_lengths:
+                section_lengths[-1] += len(line) + 1
+
+        layout = {
+            'header_count': len(headers),
+            'headers': headers,
+            'bullet_point_count': bullet_point_count,
+        }
+        structure_hash = self._hash_structure(layout)
+
+        features = dict(layout)
+        features['header_depths'] = header_depths
+        features['max_numbering_depth'] = max(header_depths, default=0)
+        features['section_lengths'] = section_lengths
+        features['minhash'] = self.structure_signature(headers)
+
         return {
             "features": features,
             "structure_hash": structure_hash
         }
 
-template_detection_pipeline = TemplateDetectionPipeline()
\ No newline at end of file
+template_detection_pipeline = TemplateDetectionPipeline()
@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+from psycopg2 import sql
+from pipelines.template_application import template_application_pipeline
+
+# How often the index checks document_templates for new or updated rows, how often it reloads
+# everything (which also drops deleted templates), and the header-set Jaccard similarity a
+# template needs to be used for a document whose structure hash does not match exactly.
+TEMPLATE_INDEX_REFRESH_S = float(os.environ.get("TEMPLATE_INDEX_REFRESH_S", "30"))
+TEMPLATE_INDEX_FULL_RELOAD_S = float(os.environ.get("TEMPLATE_INDEX_FULL_RELOAD_S", "900"))
+TEMPLATE_MATCH_MIN_SIMILARITY = float(os.environ.get("TEMPLATE_MATCH_MIN_SIMILARITY", "0.8"))
+
+class TemplateIndex:
+    """
+    In-process index of document_templates. Templates are loaded once, their header patterns are
+    compiled at load time, and later refreshes only fetch rows changed since the last one, so
+    matching a document needs neither a database round trip nor a regex compilation. Lookups
+    try the exact structure hash first, then the template whose header set is most similar
+    (Jaccard), found through an inverted header index.
+    """
+    def __init__(self, refresh_interval=TEMPLATE_INDEX_REFRESH_S, full_reload_interval=TEMPLATE_INDEX_FULL_RELOAD_S, min_similarity=TEMPLATE_MATCH_MIN_SIMILARITY):
+        self.refresh_interval = refresh_interval
+        self.full_reload_interval = full_reload_interval
+        self.min_similarity = min_similarity
+        self._lock = threading.Lock()
+        self._templates = {}  # id -> template entry
+        self._by_hash = {}
+        self._by_header = {}
+        self._last_updated_at = None
+        self._last_refresh = 0.0
+        self._last_full_reload = 0.0
+
+    def _entry(self, template_id, structure_hash, definition) -> dict:
+        section_names = tuple(section['name'] for section in definition.get("sections", []) if section.get('name'))
+        if section_names:
+            # Warms the shared pattern cache so apply_template never compiles on the hot path
+            template_application_pipeline.header_pattern(section_names)
+        return {
+            "id": template_id,
+            "structure_hash": structure_hash,
+            "definition": definition,
+            "headers": frozenset(name.lower() for name in section_names),
+        }
+
+    def _add(self, entry: dict):
+        self._remove(entry["id"])
+        self._templates[entry["id"]] = entry
+        self._by_hash[entry["structure_hash"]] = entry
+        for header in entry["headers"]:
+            self._by_header.setdefault(header, set()).add(entry["id"])
+
+    def _remove(self, template_id):
+        old = self._templates.pop(template_id, None)
+        if old is None:
+            return
+        if self._by_hash.get(old["structure_hash"]) is old:
+            del self._by_hash[old["structure_hash"]]
+        for header in old["headers"]:
+            ids = self._by_header.get(header)
+            if ids:
+                ids.discard(template_id)
+                if not ids:
+                    del self._by_header[header]
+
+    def refresh(self, cur, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_refresh < self.refresh_interval:
+            return
+        with self._lock:
+            if not force and now - self._last_refresh < self.refresh_interval:
+                return
+            full = force or self._last_updated_at is None or now - self._last_full_reload >= self.full_reload_interval
+            if full:
+                cur.execute(sql.SQL("SELECT id, structure_hash, structure_definition, updated_at FROM document_templates"))
+            else:
+                # A small overlap catches rows committed late with an earlier timestamp
+                cur.execute(
+                    sql.SQL("SELECT id, structure_hash, structure_definition, updated_at FROM document_templates WHERE updated_at > %s - INTERVAL '1 minute'"),
+                    (self._last_updated_at,)
+                )
+            rows = cur.fetchall()
+
+            if full:
+                self._templates, self._by_hash, self._by_header = {}, {}, {}
+                self._last_full_reload = now
+            for template_id, structure_hash, definition, updated_at in rows:
+                self._add(self._entry(template_id, structure_hash, definition))
+                if self._last_updated_at is None or updated_at > self._last_updated_at:
+                    self._last_updated_at = updated_at
+            self._last_refresh = now
+
+    def lookup(self, cur, structure_hash: str, headers: list) -> tuple:
+        """
+        Returns (template_definition, similarity) for the best matching template, or (None, 0.0).
+        Similarity is 1.0 for an exact structure hash match.
+        """
+        self.refresh(cur)
+        with self._lock:
+            exact = self._by_hash.get(structure_hash)
+            if exact is not None:
+                return exact["definition"], 1.0
+
+            document_headers = frozenset(header.lower() for header in headers)
+            candidate_ids = set()
+            for header in document_headers:
+                candidate_ids.update(self._by_header.get(header, ()))
+
+            best, best_similarity = None, 0.0
+            for template_id in candidate_ids:
+                template_headers = self._templates[template_id]["headers"]
+                similarity = len(document_headers & template_headers) / len(document_headers | template_headers)
+                if similarity > best_similarity:
+                    best, best_similarity = self._templates[template_id], similarity
+
+        if best is None or best_similarity < self.min_similarity:
+            return None, 0.0
+        return best["definition"], best_similarity
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"templates": len(self._templates), "indexed_headers": len(self._by_header)}
+
+template_index = TemplateIndex()
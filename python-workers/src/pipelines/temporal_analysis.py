@@ -1,56 +1,118 @@
+import math
+from collections import defaultdict
 import psycopg2
 from psycopg2 import sql
+from psycopg2.extras import execute_values
 import numpy as np
 
 class TemporalAnalysisPipeline:
-    def detect_recurring_topics(self, conn) -> list:
-        patterns = []
-        # This query uses the LAG function to find the time between occurrences of the same topic
-        query = """
-        WITH TopicIntervals AS (
-            SELECT
-                topic_text,
-                EXTRACT(EPOCH FROM (pv.created_at - LAG(pv.created_at, 1) OVER (PARTITION BY topic_text ORDER BY pv.created_at))) AS interval_seconds
-            FROM topics t
-            JOIN processing_versions pv ON t.processing_version_id = pv.id
-        ),
-        TopicStats AS (
-            SELECT
-                topic_text,
-                COUNT(*) as occurrences,
-                percentile_cont(0.5) WITHIN GROUP (ORDER BY interval_seconds) as median_interval,
-                stddev(interval_seconds) as stddev_interval
-            FROM TopicIntervals
-            WHERE interval_seconds IS NOT NULL
-            GROUP BY topic_text
-            HAVING COUNT(*) > 2
+    """
+    Keeps per-topic interval statistics up to date from newly inserted topics instead of
+    recomputing LAG windows over the whole topics table. Interval mean and variance are maintained
+    with Welford's online update; the median is taken over the most recent `recent_window` intervals.
+    """
+    # Topics inserted after the watermark, with the creation time of the version they belong to
+    new_topics_query = """
+        SELECT t.created_at, t.id, t.topic_text, pv.created_at
+        FROM topics t
+        JOIN processing_versions pv ON t.processing_version_id = pv.id
+        WHERE (t.created_at, t.id) > (%(after_created_at)s, %(after_id)s) AND t.created_at < %(before_created_at)s
+        ORDER BY t.created_at, t.id
+        LIMIT %(limit)s;
+    """
+
+    def __init__(self, recent_window=64):
+        self.recent_window = recent_window
+
+    def update_topic_stats(self, cur, rows) -> set:
+        """
+        Folds (created_at, id, topic_text, occurred_at) rows into topic_interval_stats and returns the
+        topics that were touched. An occurrence older than the topic's last one is counted but adds
+        no interval, since the interval it splits was already recorded.
+        """
+        occurrences = defaultdict(list)
+        for _, _, topic, occurred_at in rows:
+            occurrences[topic].append(occurred_at)
+        if not occurrences:
+            return set()
+
+        cur.execute(
+            sql.SQL("""
+                SELECT topic_text, occurrences, last_seen_at, interval_count, interval_mean, interval_m2, recent_intervals
+                FROM topic_interval_stats WHERE topic_text = ANY(%s) FOR UPDATE
+            """),
+            (list(occurrences),)
+        )
+        existing = {row[0]: row[1:] for row in cur.fetchall()}
+
+        updates = []
+        for topic, timestamps in occurrences.items():
+            count, last_seen, n, mean, m2, recent = existing.get(topic, (0, None, 0, 0.0, 0.0, []))
+            recent = list(recent or [])
+            for occurred_at in sorted(timestamps):
+                count += 1
+                if last_seen is not None and occurred_at >= last_seen:
+                    interval = (occurred_at - last_seen).total_seconds()
+                    n += 1
+                    delta = interval - mean
+                    mean += delta / n
+                    m2 += delta * (interval - mean)
+                    recent.append(interval)
+                if last_seen is None or occurred_at > last_seen:
+                    last_seen = occurred_at
+            updates.append((topic, count, last_seen, n, mean, m2, recent[-self.recent_window:]))
+
+        execute_values(
+            cur,
+            """
+                INSERT INTO topic_interval_stats (topic_text, occurrences, last_seen_at, interval_count, interval_mean, interval_m2, recent_intervals)
+                VALUES %s
+                ON CONFLICT (topic_text) DO UPDATE SET
+                occurrences = EXCLUDED.occurrences,
+                last_seen_at = EXCLUDED.last_seen_at,
+                interval_count = EXCLUDED.interval_count,
+                interval_mean = EXCLUDED.interval_mean,
+                interval_m2 = EXCLUDED.interval_m2,
+                recent_intervals = EXCLUDED.recent_intervals,
+                updated_at = NOW();
+            """,
+            updates,
+            template="(%s, %s, %s, %s, %s, %s, %s::double precision[])"
         )
-        SELECT
-            topic_text,
-            median_interval,
-            stddev_interval
-        FROM TopicStats
-        WHERE stddev_interval IS NOT NULL AND (stddev_interval / median_interval) < 0.1;
+        return set(occurrences)
+
+    def detect_recurring_topics(self, cur, topics) -> list:
         """
-        
-        cur = conn.cursor()
-        cur.execute(query)
-        
-        for row in cur.fetchall():
-            topic, median, stddev = row
+        Evaluates the recurrence of the given topics from their maintained statistics.
+        """
+        patterns = []
+        if not topics:
+            return patterns
+
+        cur.execute(
+            sql.SQL("""
+                SELECT topic_text, interval_count, interval_m2, recent_intervals
+                FROM topic_interval_stats WHERE topic_text = ANY(%s) AND interval_count > 2
+            """),
+            (list(topics),)
+        )
+        for topic, n, m2, recent in cur.fetchall():
+            median = float(np.median(recent)) if recent else 0.0
+            stddev = math.sqrt(m2 / (n - 1))
+            if median <= 0 or (stddev / median) >= 0.1:
+                continue
+
             period = "unknown"
             # 604800 seconds = 7 days, 10% tolerance
             if 544320 < median < 665280:
                 period = "weekly"
-            
+
             patterns.append({
                 "pattern_type": "recurring_topic",
                 "topic": topic,
                 "period": period,
                 "confidence": 1.0 - (stddev / median)
             })
-            
-        cur.close()
         return patterns
 
-temporal_analysis_pipeline = TemporalAnalysisPipeline()
\ No newline at end of file
+temporal_analysis_pipeline = TemporalAnalysisPipeline()
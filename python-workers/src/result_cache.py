@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+from psycopg2 import sql
+
+from pipelines.model_registry import KNOWN_MODELS
+
+# Bump PIPELINE_VERSION whenever pipeline logic (chunking, rules, thresholds) changes in a way that
+# should invalidate cached results. Model upgrades are picked up automatically through KNOWN_MODELS.
+PIPELINE_VERSION = os.environ.get("PIPELINE_VERSION", "5")
+RESULT_CACHE_ENABLED = os.environ.get("RESULT_CACHE_ENABLED", "true").lower() == "true"
+
+# Per-version result tables and the columns copied on a cache hit. Chunks with their entity mentions
+# and tabular data with its pages are cloned separately, because children must point at the new ids.
+CLONED_TABLES = {
+    "topics": ["topic_text", "weight", "topic_type"],
+    "action_items": ["task_text", "original_text", "assignee_name", "due_date", "confidence", "priority", "dependencies"],
+    "relationships": ["source_entity_id", "target_entity_id", "relationship_type", "weight", "context_snippet"],
+    "document_classifications": ["label", "confidence", "classifier_type"],
+    "document_structures": ["features", "structure_hash"],
+    "financial_kpis": ["kpi_name", "kpi_value", "kpi_currency", "period", "source_snippet"],
+    "financial_risk_analysis": ["risk_level", "confidence", "summary", "identified_clauses", "clause_scores"],
+    "legal_clauses": ["clause_type", "clause_text", "confidence", "clause_number", "parent_number", "depth", "position"],
+}
+
+def current_pipeline_version() -> str:
+    models_fingerprint = hashlib.sha256(json.dumps(KNOWN_MODELS, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+    return f"{PIPELINE_VERSION}:{models_fingerprint}"
+
+def content_hasher(mime_type: str):
+    """
+    Returns the digest object behind content_hash, for callers that feed the content in pieces.
+    """
+    digest = hashlib.sha256(mime_type.encode('utf-8'))
+    digest.update(b"\0")
+    return digest
+
+def content_hash(mime_type: str, content_bytes: bytes) -> str:
+    digest = content_hasher(mime_type)
+    digest.update(content_bytes)
+    return digest.hexdigest()
+
+class ResultCache:
+    """
+    Reuses the results of an earlier processing version whose raw content and pipeline version
+    are identical, by cloning its rows into the new processing version instead of running inference.
+    """
+    def __init__(self, enabled=RESULT_CACHE_ENABLED):
+        self.enabled = enabled
+        self.pipeline_version = current_pipeline_version()
+        self.hits = 0
+        self.misses = 0
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def lookup(self, cur, content_hash_value: str, processing_version_id):
+        """
+        Returns the processing version holding cached results for this content, or None on a miss.
+        """
+        if not self.enabled:
+            return None
+        cur.execute(sql.SQL("""
+            SELECT c.source_processing_version_id
+            FROM processing_result_cache c
+            JOIN processing_versions pv ON pv.id = c.source_processing_version_id
+            WHERE c.content_hash = %s AND c.pipeline_version = %s AND c.source_processing_version_id <> %s
+              AND pv.status LIKE 'Processed%%'
+        """), (content_hash_value, self.pipeline_version, processing_version_id))
+        row = cur.fetchone()
+        if row:
+            self.hits += 1
+        else:
+            self.misses += 1
+        print(f"Result cache {'hit' if row else 'miss'} for version_id {processing_version_id} (hits: {self.hits}, misses: {self.misses}, hit rate: {self.hit_rate():.0%}).")
+        return row[0] if row else None
+
+    def clone(self, cur, source_version_id, target_version_id):
+        cur.execute(sql.SQL("""
+            WITH source_chunks AS MATERIALIZED (
+                SELECT id, gen_random_uuid() AS new_id, text_content, speaker, position, token_count, embedding
+                FROM chunks WHERE processing_version_id = %(source)s
+            ),
+            inserted_chunks AS (
+                INSERT INTO chunks (id, processing_version_id, text_content, speaker, position, token_count, embedding)
+                SELECT new_id, %(target)s, text_content, speaker, position, token_count, embedding FROM source_chunks
+                RETURNING id
+            )
+            INSERT INTO entity_mentions (id, processing_version_id, chunk_id, entity_id, mentioned_text, confidence)
+            SELECT gen_random_uuid(), %(target)s, sc.new_id, em.entity_id, em.mentioned_text, em.confidence
+            FROM entity_mentions em
+            LEFT JOIN source_chunks sc ON sc.id = em.chunk_id
+            WHERE em.processing_version_id = %(source)s
+        """), {"source": source_version_id, "target": target_version_id})
+
+        cur.execute(sql.SQL("""
+            WITH source_tables AS (
+                SELECT id, gen_random_uuid() AS new_id, sheet_name, data_json, detected_schema, row_count, column_count, summary_stats, anomalies, page_count
+                FROM tabular_data WHERE processing_version_id = %(source)s
+            ), inserted_tables AS (
+                INSERT INTO tabular_data (id, processing_version_id, sheet_name, data_json, detected_schema, row_count, column_count, summary_stats, anomalies, page_count)
+                SELECT new_id, %(target)s, sheet_name, data_json, detected_schema, row_count, column_count, summary_stats, anomalies, page_count FROM source_tables
+                RETURNING id
+            )
+            INSERT INTO tabular_data_pages (id, tabular_data_id, processing_version_id, page_number, row_offset, row_count, rows)
+            SELECT gen_random_uuid(), st.new_id, %(target)s, p.page_number, p.row_offset, p.row_count, p.rows
+            FROM tabular_data_pages p
+            JOIN source_tables st ON st.id = p.tabular_data_id
+        """), {"source": source_version_id, "target": target_version_id})
+
+        for table, columns in CLONED_TABLES.items():
+            column_list = sql.SQL(", ").join(map(sql.Identifier, columns))
+            cur.execute(sql.SQL("INSERT INTO {table} (id, processing_version_id, {columns}) SELECT gen_random_uuid(), %s, {columns} FROM {table} WHERE processing_version_id = %s").format(
+                table=sql.Identifier(table), columns=column_list
+            ), (target_version_id, source_version_id))
+
+        cur.execute(sql.SQL("""
+            UPDATE processing_versions target
+            SET summary_text = source.summary_text, summary_type = source.summary_type,
+                summary_confidence = source.summary_confidence, status = source.status
+            FROM processing_versions source
+            WHERE target.id = %s AND source.id = %s
+        """), (target_version_id, source_version_id))
+
+        cur.execute(sql.SQL("UPDATE processing_result_cache SET hit_count = hit_count + 1, last_hit_at = NOW() WHERE source_processing_version_id = %s"), (source_version_id,))
+
+    def store(self, cur, content_hash_value: str, processing_version_id):
+        if not self.enabled:
+            return
+        cur.execute(sql.SQL("""
+            INSERT INTO processing_result_cache (id, content_hash, pipeline_version, source_processing_version_id)
+            VALUES (gen_random_uuid(), %s, %s, %s)
+            ON CONFLICT (content_hash, pipeline_version) DO NOTHING
+        """), (content_hash_value, self.pipeline_version, processing_version_id))
+
+    def invalidate(self, cur, scope: str = "stale") -> int:
+        """
+        Drops cache entries. `stale` removes entries produced by other pipeline/model versions
+        (e.g. after a model upgrade); `all` empties the cache.
+        """
+        if scope == "all":
+            cur.execute(sql.SQL("DELETE FROM processing_result_cache"))
+        else:
+            cur.execute(sql.SQL("DELETE FROM processing_result_cache WHERE pipeline_version <> %s"), (self.pipeline_version,))
+        return cur.rowcount
+
+result_cache = ResultCache()
@@ -0,0 +1,98 @@
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+import os
+import time
+
+# thread: every stage runs on a thread pool (model inference releases the GIL).
+# process: stages flagged cpu_bound (pure-Python rule engines) run on a process pool, the rest on threads.
+# serial: stages run one after another in dependency order, as before.
+PIPELINE_EXECUTOR = os.environ.get("PIPELINE_EXECUTOR", "thread")
+PIPELINE_MAX_WORKERS = int(os.environ.get("PIPELINE_MAX_WORKERS", "4"))
+
+class Stage:
+    """
+    A unit of work in the per-document pipeline DAG. `fn` is called with the results of the
+    stages (or initial inputs) named in `depends_on` as keyword arguments. cpu_bound stages must be
+    module-level functions with picklable inputs so they can run on the process pool.
+    """
+    def __init__(self, name: str, fn, depends_on=(), cpu_bound: bool = False):
+        self.name = name
+        self.fn = fn
+        self.depends_on = tuple(depends_on)
+        self.cpu_bound = cpu_bound
+
+def _timed_call(fn, kwargs: dict) -> tuple:
+    start = time.perf_counter()
+    value = fn(**kwargs)
+    return value, time.perf_counter() - start
+
+class StageExecutor:
+    """
+    Runs a DAG of stages, starting each one as soon as all of its dependencies have finished.
+    Returns the results of every stage and the wall time each stage spent running.
+    """
+    def __init__(self, mode: str = PIPELINE_EXECUTOR, max_workers: int = PIPELINE_MAX_WORKERS):
+        self.mode = mode
+        self.max_workers = max_workers
+        self._thread_pool = None
+        self._process_pool = None
+
+    def _pool_for(self, stage: Stage):
+        if self.mode == "process" and stage.cpu_bound:
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._process_pool
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pipeline-stage")
+        return self._thread_pool
+
+    def _validate(self, stages: list, inputs: dict):
+        known = set(inputs)
+        names = [stage.name for stage in stages]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Duplicate stage names in {names}")
+        known.update(names)
+        for stage in stages:
+            missing = [dep for dep in stage.depends_on if dep not in known]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stages or inputs: {missing}")
+
+    def run(self, stages: list, inputs: dict) -> tuple:
+        self._validate(stages, inputs)
+        results, timings = dict(inputs), {}
+        pending = list(stages)
+
+        if self.mode == "serial":
+            while pending:
+                stage = next((stage for stage in pending if all(dep in results for dep in stage.depends_on)), None)
+                if stage is None:
+                    raise ValueError(f"Dependency cycle between stages {[stage.name for stage in pending]}")
+                pending.remove(stage)
+                results[stage.name], timings[stage.name] = _timed_call(stage.fn, {dep: results[dep] for dep in stage.depends_on})
+            return results, timings
+
+        running = {}
+        try:
+            while pending or running:
+                for stage in [stage for stage in pending if all(dep in results for dep in stage.depends_on)]:
+                    pending.remove(stage)
+                    future = self._pool_for(stage).submit(_timed_call, stage.fn, {dep: results[dep] for dep in stage.depends_on})
+                    running[future] = stage
+                if not running:
+                    raise ValueError(f"Dependency cycle between stages {[stage.name for stage in pending]}")
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    results[stage.name], timings[stage.name] = future.result()
+        except BaseException:
+            for future in running:
+                future.cancel()
+            raise
+        return results, timings
+
+    def shutdown(self):
+        for pool in (self._thread_pool, self._process_pool):
+            if pool is not None:
+                pool.shutdown(wait=True)
+        self._thread_pool = self._process_pool = None
+
+stage_executor = StageExecutor()
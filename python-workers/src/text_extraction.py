@@ -0,0 +1,87 @@
+import io
+import fitz
+import docx
+import requests
+from bs4 import BeautifulSoup
+
+def is_in_memory(source) -> bool:
+    """
+    Extractors take the raw content either as bytes or as the path of a spooled file (see blob_store).
+    """
+    return isinstance(source, (bytes, bytearray, memoryview))
+
+def iter_pdf_pages(source):
+    document = fitz.open(stream=source, filetype="pdf") if is_in_memory(source) else fitz.open(source, filetype="pdf")
+    with document as doc:
+        for page in doc:
+            yield page.get_text()
+
+def iter_docx_paragraphs(source):
+    doc = docx.Document(io.BytesIO(source) if is_in_memory(source) else source)
+    for i, para in enumerate(doc.paragraphs):
+        yield para.text if i == 0 else "\n" + para.text
+
+def extract_text_from_url(url: str) -> str:
+    try:
+        response = requests.get(url, timeout=10)
+        response.raise_for_status()
+        soup = BeautifulSoup(response.content, 'html.parser')
+        return soup.get_text(separator='\n', strip=True)
+    except requests.RequestException as e:
+        print(f"Failed to download or parse URL {url}: {e}")
+        return ""
+
+def iter_plain_text(source):
+    if is_in_memory(source):
+        yield bytes(source).decode('utf-8', errors='ignore')
+        return
+    # Line by line, so a segment boundary never splits a word
+    with open(source, encoding='utf-8', errors='ignore', newline='') as text_file:
+        yield from text_file
+
+def iter_text_segments(file_name: str, mime_type: str, source):
+    """
+    Yields the text of a raw file piece by piece (PDF pages, DOCX paragraphs, lines of spooled
+    text files). Concatenating the segments gives the full document text.
+    """
+    if mime_type == 'text/x-url': yield extract_text_from_url("".join(iter_plain_text(source)))
+    elif "pdf" in mime_type: yield from iter_pdf_pages(source)
+    elif "openxmlformats-officedocument" in mime_type or "docx" in file_name: yield from iter_docx_paragraphs(source)
+    else: yield from iter_plain_text(source)
+
+def iter_chunks(segments, chunk_size=300, overlap=50):
+    """
+    Incremental version of intelligent_chunking: consumes text segments and yields chunks of
+    `chunk_size` words overlapping by `overlap` words, holding at most one chunk of words at a time.
+    Segment boundaries count as whitespace.
+    """
+    step = chunk_size - overlap
+    window = []
+    for segment in segments:
+        for word in segment.split():
+            window.append(word)
+            if len(window) == chunk_size:
+                yield " ".join(window)
+                del window[:step]
+    # Trailing chunks: every remaining start offset, exactly as the list-based chunker emits them
+    while window:
+        yield " ".join(window[:chunk_size])
+        del window[:step]
+
+def intelligent_chunking(text: str, chunk_size=300, overlap=50) -> list:
+    return list(iter_chunks([text], chunk_size, overlap))
+
+def extract_text_and_chunks(file_name: str, mime_type: str, source, chunk_size=300, overlap=50) -> tuple:
+    """
+    Extracts the full text and its chunks in one streaming pass over the document's pages,
+    without materializing an intermediate word list.
+    """
+    text_parts = []
+
+    def collect(segments):
+        for segment in segments:
+            text_parts.append(segment)
+            yield segment
+
+    chunk_texts = list(iter_chunks(collect(iter_text_segments(file_name, mime_type, source)), chunk_size, overlap))
+    return "".join(text_parts), chunk_texts
@@ -0,0 +1,83 @@
+import os
+
+# Rows read per committed batch. Blob-carrying jobs use the smaller size to bound memory.
+ANALYTICS_BATCH_SIZE = int(os.environ.get("ANALYTICS_BATCH_SIZE", "1000"))
+ANALYTICS_BLOB_BATCH_SIZE = int(os.environ.get("ANALYTICS_BLOB_BATCH_SIZE", "50"))
+
+# Rows are read only up to a cutoff, so the watermark never passes a row that is not visible yet:
+# created_at is NOW(), the start of the inserting transaction, which may commit after later rows.
+# The cutoff is the start of the oldest transaction still open on the database, and at most now()
+# minus this lag (which also covers sessions whose pg_stat_activity row is hidden from this user).
+ANALYTICS_WATERMARK_LAG_SECONDS = float(os.environ.get("ANALYTICS_WATERMARK_LAG_SECONDS", "5"))
+
+MIN_WATERMARK = ("-infinity", "00000000-0000-0000-0000-000000000000")
+
+CUTOFF_QUERY = """
+    SELECT LEAST(
+        NOW() - make_interval(secs => %(lag)s),
+        (SELECT MIN(xact_start) FROM pg_stat_activity
+         WHERE datname = current_database() AND backend_type = 'client backend' AND pid <> pg_backend_pid())
+    )
+"""
+
+def get_cutoff(cur, lag_seconds: float = None) -> object:
+    cur.execute(CUTOFF_QUERY, {"lag": ANALYTICS_WATERMARK_LAG_SECONDS if lag_seconds is None else lag_seconds})
+    return cur.fetchone()[0]
+
+def get_watermark(cur, job_name: str) -> tuple:
+    cur.execute("SELECT last_created_at, last_id FROM analytics_watermarks WHERE job_name = %s", (job_name,))
+    row = cur.fetchone()
+    return tuple(row) if row else MIN_WATERMARK
+
+def set_watermark(cur, job_name: str, last_created_at, last_id):
+    cur.execute("""
+        INSERT INTO analytics_watermarks (job_name, last_created_at, last_id, updated_at)
+        VALUES (%s, %s, %s, NOW())
+        ON CONFLICT (job_name) DO UPDATE SET
+        last_created_at = EXCLUDED.last_created_at,
+        last_id = EXCLUDED.last_id,
+        updated_at = NOW();
+    """, (job_name, last_created_at, last_id))
+
+def run_incremental(conn, job_name: str, query: str, handle_rows, batch_size: int = ANALYTICS_BATCH_SIZE, lag_seconds: float = None) -> int:
+    """
+    Processes the rows added since the job's persisted watermark, in keyset-paginated batches.
+    `query` must select `created_at, id` as its first two columns, keep only rows after
+    (%(after_created_at)s, %(after_id)s) with created_at < %(before_created_at)s (see get_cutoff),
+    order by (created_at, id) and end with LIMIT %(limit)s.
+    Each batch is streamed through a server-side cursor into `handle_rows(cur, rows)`, which must
+    consume the iterator; the watermark then moves to the last row and the batch is committed, so
+    an interrupted run resumes where it stopped. Returns the number of rows processed.
+    """
+    with conn.cursor() as cur:
+        after_created_at, after_id = get_watermark(cur, job_name)
+
+    processed = 0
+    while True:
+        batch = {"count": 0, "last_key": None}
+
+        with conn.cursor() as cur:
+            before_created_at = get_cutoff(cur, lag_seconds)
+
+        def stream_rows():
+            with conn.cursor(name=f"{job_name}_batch") as stream:
+                stream.itersize = min(batch_size, 100)
+                stream.execute(query, {"after_created_at": after_created_at, "after_id": after_id, "before_created_at": before_created_at, "limit": batch_size})
+                for row in stream:
+                    batch["count"] += 1
+                    batch["last_key"] = (row[0], row[1])
+                    yield row
+
+        with conn.cursor() as cur:
+            handle_rows(cur, stream_rows())
+            if batch["last_key"] is None:
+                conn.rollback()
+                break
+            set_watermark(cur, job_name, *batch["last_key"])
+        conn.commit()
+
+        processed += batch["count"]
+        after_created_at, after_id = batch["last_key"]
+        if batch["count"] < batch_size:
+            break
+    return processed
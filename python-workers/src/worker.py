@@ -1,18 +1,11 @@
-import pika
 import os
 import sys
-import psycopg2
 from psycopg2 import sql
 from psycopg2.extras import Json
-from sentence_transformers import SentenceTransformer
-import fitz
-import docx
-import io
-import re
 import itertools
 import json
-import requests
-from bs4 import BeautifulSoup
+import numpy as np
+import uuid
 
 from pipelines.summarization import summarization_pipeline
 from pipelines.action_item_extraction import action_item_extraction_pipeline
@@ -20,219 +13,422 @@ from pipelines.topic_extraction import topic_extraction_pipeline
 from pipelines.knowledge_graph_extraction import knowledge_graph_pipeline
 from pipelines.classification import classification_pipeline
 from pipelines.tabular_processing import tabular_processing_pipeline
-from pipelines.finance_ner import finance_ner_pipeline
 from pipelines.finance_kpi_extractor import finance_kpi_extractor_pipeline
 from pipelines.finance_risk_classifier import finance_risk_classifier_pipeline
 from pipelines.template_application import template_application_pipeline
 from pipelines.template_detection import template_detection_pipeline
-from pipelines.legal_ner import legal_ner_pipeline
+from pipelines.template_index import template_index
 from pipelines.legal_clause_extractor import legal_clause_extractor_pipeline
 from pipelines.active_learning import active_learning_pipeline
+from pipelines.ner_service import ner_service, split_sentences
+from pipelines.model_registry import model_registry
+import persistence
+from embedding_cache import EmbeddingCache
+from result_cache import result_cache
+from text_extraction import extract_text_and_chunks
+from blob_store import open_raw_file
+from stage_executor import Stage, stage_executor
+from db_pool import db_pool
+from consumer_pool import ConsumerPool, queue_setting, run_worker_processes
+from instrumentation import JobMetrics, METRICS_PORT, metrics, span_all
 
-embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+embedding_model = model_registry.get_known("embedding")
+embedding_cache = EmbeddingCache(embedding_model, "all-MiniLM-L6-v2")
 
-def extract_text_from_pdf(content: bytes) -> str:
-    with fitz.open(stream=content, filetype="pdf") as doc:
-        return "".join(page.get_text() for page in doc)
+# Comma-separated list of model aliases (see KNOWN_MODELS) to load before consuming, or "all".
+MODEL_WARMUP = os.environ.get("MODEL_WARMUP", "")
 
-def extract_text_from_docx(content_bytes: bytes) -> str:
-    doc = docx.Document(io.BytesIO(content_bytes))
-    return "\n".join([para.text for para in doc.paragraphs])
+# Micro-batching: collect up to INGESTION_BATCH_SIZE messages (or wait at most INGESTION_BATCH_WAIT_MS
+# after the first one) and run the model stages for all of them in batched calls. A size of 1 keeps
+# the original one-message-at-a-time consumer.
+# Concurrency is configured per queue: INGESTION_QUEUE_CONCURRENCY handler threads per process,
+# INGESTION_QUEUE_PREFETCH unacked messages per process and INGESTION_QUEUE_PROCESSES forked workers.
+INGESTION_BATCH_SIZE = int(os.environ.get("INGESTION_BATCH_SIZE", "1"))
+INGESTION_BATCH_WAIT_MS = int(os.environ.get("INGESTION_BATCH_WAIT_MS", "200"))
 
-def extract_text_from_url(url: str) -> str:
-    try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        return soup.get_text(separator='\n', strip=True)
-    except requests.RequestException as e:
-        print(f"Failed to download or parse URL {url}: {e}")
-        return ""
-
-def intelligent_chunking(text: str, chunk_size=300, overlap=50) -> list:
-    words = text.split()
-    if not words: return []
-    chunks, start = [], 0
-    while start < len(words):
-        end = start + chunk_size
-        chunks.append(" ".join(words[start:end]))
-        start += chunk_size - overlap
-    return chunks
+# Chunks are embedded and written in windows of this size, both for micro-batches and for single
+# documents, so the model's intermediate tensors and the per-row parameter tuples (384 Python
+# floats per embedding) never exist for a whole batch at once.
+CHUNK_WINDOW_SIZE = int(os.environ.get("CHUNK_WINDOW_SIZE", "256"))
+
+# Legal clauses are written in batches of this size as they come out of the segmenter.
+LEGAL_CLAUSE_BATCH_SIZE = int(os.environ.get("LEGAL_CLAUSE_BATCH_SIZE", "500"))
+
+DEFAULT_CANDIDATE_LABELS = ["finanças", "jurídico", "recursos humanos", "marketing", "relatório técnico", "confidencial"]
 
 def get_db_connection():
-    return psycopg2.connect(dbname=os.environ.get("POSTGRES_DB"), user=os.environ.get("POSTGRES_USER"), password=os.environ.get("POSTGRES_PASSWORD"), host=os.environ.get("DB_HOST"))
+    return db_pool.getconn()
 
-def run_all_pipelines(cur, document_id, processing_version_id, full_text, chunk_texts, chunks_for_processing):
-    conn = cur.connection
-    embeddings = embedding_model.encode(chunk_texts)
-    for i, (chunk_id, _) in enumerate(chunks_for_processing):
-        cur.execute(sql.SQL("UPDATE chunks SET embedding = %s WHERE id = %s"), (embeddings[i].tolist(), chunk_id))
-
-    topics = topic_extraction_pipeline.extract(chunk_texts, embeddings)
-    for topic in topics:
-        cur.execute(sql.SQL("INSERT INTO topics (id, processing_version_id, topic_text, weight, topic_type) VALUES (gen_random_uuid(), %s, %s, %s, %s)"), (processing_version_id, topic['topic_text'], topic['weight'], topic['topic_type']))
-
-    summary = summarization_pipeline.summarize(full_text)
-    cur.execute(sql.SQL("UPDATE processing_versions SET summary_text = %s, summary_type = %s, summary_confidence = %s WHERE id = %s"), (summary, "abstractive", 90, processing_version_id))
-
-    action_items = action_item_extraction_pipeline.extract(full_text)
-    for item in action_items:
-        cur.execute(sql.SQL("INSERT INTO action_items (id, processing_version_id, task_text, original_text, assignee_name, due_date, confidence, priority, dependencies) VALUES (gen_random_uuid(), %s, %s, %s, %s, %s, %s, %s, %s)"), (processing_version_id, item['task_text'], item['original_text'], item['assignee_name'], item['due_date'], item['confidence'], item['priority'], item['dependencies']))
-
-    entities, mentions, relationships = knowledge_graph_pipeline.extract_graph_components(chunks_for_processing)
-    entity_id_map = {}
-    for entity in entities:
-        cur.execute(sql.SQL("INSERT INTO entities (id, name, entity_type) VALUES (gen_random_uuid(), %s, %s) ON CONFLICT (name, entity_type) DO UPDATE SET name=EXCLUDED.name RETURNING id"), (entity['name'], entity['type']))
-        entity_id = cur.fetchone()[0]
-        entity_id_map[(entity['name'], entity['type'])] = entity_id
-    for mention in mentions:
-        entity_key = (mention['entity_name'], mention['entity_type'])
-        if entity_key in entity_id_map:
-            cur.execute(sql.SQL("INSERT INTO entity_mentions (id, processing_version_id, chunk_id, entity_id, mentioned_text, confidence) VALUES (gen_random_uuid(), %s, %s, %s, %s, %s)"), (processing_version_id, mention['chunk_id'], entity_id_map[entity_key], int(mention['confidence'] * 100), mention['mentioned_text']))
-    for rel in relationships:
-        source_key = next((key for key in entity_id_map if key[0] == rel['source']), None)
-        target_key = next((key for key in entity_id_map if key[0] == rel['target']), None)
-        if source_key and target_key:
-            cur.execute(sql.SQL("INSERT INTO relationships (id, processing_version_id, source_entity_id, target_entity_id, relationship_type, context_snippet) VALUES (gen_random_uuid(), %s, %s, %s, %s, %s)"), (processing_version_id, entity_id_map[source_key], entity_id_map[target_key], rel['type'], rel['context']))
-    
+def fetch_classification_examples(cur, processing_version_id) -> list:
     cur.execute(sql.SQL("SELECT example_text, example_label FROM classification_examples WHERE processing_version_id = %s"), (processing_version_id,))
-    examples_from_db_tuples = cur.fetchall()
-    classification_examples = [{"text": row[0], "label": row[1]} for row in examples_from_db_tuples]
-
-    default_candidate_labels = ["finanças", "jurídico", "recursos humanos", "marketing", "relatório técnico", "confidencial"]
-    classifications = classification_pipeline.classify(full_text, default_candidate_labels, examples=classification_examples)
-    processed_labels = []
-    for classification in classifications:
-        if classification['confidence'] > 0.6:
-            cur.execute(sql.SQL("INSERT INTO document_classifications (id, processing_version_id, label, confidence, classifier_type) VALUES (gen_random_uuid(), %s, %s, %s, %s) ON CONFLICT (processing_version_id, label) DO NOTHING"), (processing_version_id, classification['label'], int(classification['confidence'] * 100), classification['classifier_type']))
-            processed_labels.append(classification['label'])
-    
-    if 'finanças' in processed_labels:
-        financial_kpis = finance_kpi_extractor_pipeline.extract_kpis(full_text)
-        for kpi in financial_kpis:
-            cur.execute(sql.SQL("INSERT INTO financial_kpis (id, processing_version_id, kpi_name, kpi_value, kpi_currency, period, source_snippet) VALUES (gen_random_uuid(), %s, %s, %s, %s, %s, %s)"), (processing_version_id, kpi['kpi_name'], kpi['kpi_value'], kpi['kpi_currency'], kpi['period'], kpi['source_snippet']))
-        risk_analysis = finance_risk_classifier_pipeline.classify_risk(full_text)
-        cur.execute(sql.SQL("INSERT INTO financial_risk_analysis (id, processing_version_id, risk_level, confidence, summary, identified_clauses) VALUES (gen_random_uuid(), %s, %s, %s, %s, %s)"), (processing_version_id, risk_analysis['risk_level'], risk_analysis['confidence'], risk_analysis['summary'], Json(risk_analysis['identified_clauses'])))
-        print(f"Finance Flavor: Extracted {len(financial_kpis)} KPIs and performed risk analysis for version_id {processing_version_id}.")
-    elif 'jurídico' in processed_labels:
-        legal_clauses = legal_clause_extractor_pipeline.extract_clauses(full_text)
-        for clause in legal_clauses:
-            cur.execute(sql.SQL("INSERT INTO legal_clauses (id, processing_version_id, clause_type, clause_text, confidence) VALUES (gen_random_uuid(), %s, %s, %s, %s)"), (processing_version_id, clause['clause_type'], clause['clause_text'], clause['confidence']))
-        print(f"Legal Flavor: Extracted {len(legal_clauses)} clauses for version_id {processing_version_id}.")
-    
-    # Active Learning Step
-    items_for_review = active_learning_pipeline.uncertainty_sampling(conn, processing_version_id)
-    for item in items_for_review:
-        cur.execute(
-            sql.SQL("INSERT INTO review_queue (id, processing_version_id, prediction_id, prediction_type, reason, priority) VALUES (gen_random_uuid(), %s, %s, %s, %s, %s)"),
-            (processing_version_id, item['prediction_id'], item['prediction_type'], item['reason'], item['priority'])
-        )
+    return [{"text": row[0], "label": row[1]} for row in cur.fetchall()]
+
+def run_batched_inference(jobs: list, job_metrics: list) -> list:
+    """
+    Runs the model stages that only depend on a document's text for several documents at once:
+    chunk embeddings, map-reduce summaries, classifications and the shared NER pass over every
+    chunk sentence (later reused from the NER cache by action item and knowledge graph extraction).
+    Returns one `precomputed` dict per job, in input order, to be handed to run_all_pipelines.
+    The time of each batched stage is recorded on every job of the batch.
+    """
+    all_chunk_texts = [chunk_text for job in jobs for chunk_text in job['chunk_texts']]
+    with span_all(job_metrics, "embeddings"):
+        all_embeddings = encode_chunks(all_chunk_texts)
+    cache_stats = embedding_cache.stats()
+    print(f"Embedding cache: {cache_stats['hit_rate']:.0%} hit rate ({cache_stats['memory_hits']} memory hits, {cache_stats['disk_hits']} disk hits, {cache_stats['misses']} misses).")
+    with span_all(job_metrics, "ner"):
+        ner_service.annotate([sentence for chunk_text in all_chunk_texts for sentence in split_sentences(chunk_text) if sentence])
+
+    offsets = np.cumsum([0] + [len(job['chunk_texts']) for job in jobs])
+    with span_all(job_metrics, "summary"):
+        summaries = summarization_pipeline.summarize_long_batch([(job['chunk_texts'], all_embeddings[offsets[i]:offsets[i + 1]]) for i, job in enumerate(jobs)])
+    with span_all(job_metrics, "classifications"):
+        classifications = classification_pipeline.classify_documents([
+            {"chunk_texts": job['chunk_texts'], "embeddings": all_embeddings[offsets[i]:offsets[i + 1]], "examples": job['classification_examples']}
+            for i, job in enumerate(jobs)
+        ], DEFAULT_CANDIDATE_LABELS)
+
+    return [
+        {
+            "embeddings": all_embeddings[offsets[i]:offsets[i + 1]],
+            "summary": summaries[i],
+            "classifications": classifications[i],
+        }
+        for i in range(len(jobs))
+    ]
+
+def encode_chunks(chunk_texts: list) -> np.ndarray:
+    """
+    Embeds chunks CHUNK_WINDOW_SIZE at a time and returns the float32 embedding matrix for all of
+    them, so the model and the embedding cache never hold more than one window of a large batch.
+    """
+    windows = [
+        np.asarray(embedding_cache.encode(chunk_texts[start:start + CHUNK_WINDOW_SIZE]), dtype=np.float32)
+        for start in range(0, len(chunk_texts), CHUNK_WINDOW_SIZE)
+    ]
+    return np.concatenate(windows) if windows else np.empty((0, embedding_model.get_sentence_embedding_dimension()), dtype=np.float32)
+
+def store_chunks_in_windows(cur, processing_version_id, chunks_for_processing: list, embeddings):
+    """
+    Persists chunks and their embeddings window by window, so the per-row parameter tuples
+    only exist for one window at a time.
+    """
+    for start in range(0, len(chunks_for_processing), CHUNK_WINDOW_SIZE):
+        persistence.insert_chunks(cur, processing_version_id, chunks_for_processing[start:start + CHUNK_WINDOW_SIZE], embeddings[start:start + CHUNK_WINDOW_SIZE], start_position=start)
+
+def store_legal_clauses_in_batches(cur, processing_version_id, legal_clauses) -> int:
+    """
+    Persists clauses from a list or from the segmenter's generator, LEGAL_CLAUSE_BATCH_SIZE at a
+    time, and returns how many were written.
+    """
+    legal_clauses, written = iter(legal_clauses), 0
+    while True:
+        batch = list(itertools.islice(legal_clauses, LEGAL_CLAUSE_BATCH_SIZE))
+        if not batch:
+            return written
+        persistence.insert_legal_clauses(cur, processing_version_id, batch)
+        written += len(batch)
+
+def confident_labels(classifications: list) -> list:
+    return [c['label'] for c in classifications if c['confidence'] > 0.6]
+
+def stage_financial_kpis(classifications: list, full_text: str):
+    if 'finanças' not in confident_labels(classifications):
+        return None
+    return finance_kpi_extractor_pipeline.extract_kpis(full_text)
+
+def stage_financial_risk(classifications: list, full_text: str):
+    if 'finanças' not in confident_labels(classifications):
+        return None
+    return finance_risk_classifier_pipeline.classify_risk(full_text)
+
+def stage_legal_clauses(classifications: list, full_text: str):
+    labels = confident_labels(classifications)
+    if 'finanças' in labels or 'jurídico' not in labels:
+        return None
+    return legal_clause_extractor_pipeline.extract_clauses(full_text)
+
+def build_pipeline_stages(precomputed: dict) -> list:
+    """
+    The per-document pipeline as a DAG. Stages whose result was computed ahead (batched inference)
+    are left out; their results are passed in as inputs instead.
+    """
+    stages = [
+        Stage("chunks", lambda chunk_texts: [(str(uuid.uuid4()), chunk_text) for chunk_text in chunk_texts], ["chunk_texts"]),
+        Stage("topics", lambda chunk_texts, embeddings: topic_extraction_pipeline.extract(chunk_texts, embeddings), ["chunk_texts", "embeddings"]),
+        Stage("action_items", lambda full_text: action_item_extraction_pipeline.extract(full_text), ["full_text"]),
+        Stage("knowledge_graph", lambda chunks: knowledge_graph_pipeline.extract_graph_components(chunks), ["chunks"]),
+        Stage("financial_kpis", stage_financial_kpis, ["classifications", "full_text"], cpu_bound=True),
+        Stage("financial_risk", stage_financial_risk, ["classifications", "full_text"]),
+        Stage("legal_clauses", stage_legal_clauses, ["classifications", "full_text"], cpu_bound=True),
+    ]
+    if precomputed.get('embeddings') is None:
+        stages.append(Stage("embeddings", encode_chunks, ["chunk_texts"]))
+    if precomputed.get('summary') is None:
+        stages.append(Stage("summary", lambda chunk_texts, embeddings: summarization_pipeline.summarize_long(chunk_texts, embeddings), ["chunk_texts", "embeddings"]))
+    if precomputed.get('classifications') is None:
+        stages.append(Stage("classifications", lambda chunk_texts, embeddings, classification_examples: classification_pipeline.classify_documents(
+            [{"chunk_texts": chunk_texts, "embeddings": embeddings, "examples": classification_examples}], DEFAULT_CANDIDATE_LABELS)[0],
+            ["chunk_texts", "embeddings", "classification_examples"]))
+    return stages
+
+def run_all_pipelines(cur, document_id, processing_version_id, full_text, chunk_texts, job_metrics: JobMetrics, precomputed=None):
+    """
+    Computes every pipeline result through the stage DAG (independent stages run concurrently),
+    then writes all results from this thread, the only one using the cursor.
+    """
+    conn = cur.connection
+    precomputed = {key: value for key, value in (precomputed or {}).items() if value is not None}
+    inputs = {"full_text": full_text, "chunk_texts": chunk_texts, **precomputed}
+    if 'classifications' not in precomputed:
+        inputs["classification_examples"] = fetch_classification_examples(cur, processing_version_id)
+
+    results, timings = stage_executor.run(build_pipeline_stages(precomputed), inputs)
+    print(f"Stage timings for version_id {processing_version_id}: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items()))
+    for name, seconds in timings.items():
+        job_metrics.record(name, seconds)
+
+    with job_metrics.span("persist"):
+        store_chunks_in_windows(cur, processing_version_id, results['chunks'], results['embeddings'])
+        persistence.insert_topics(cur, processing_version_id, results['topics'])
+        cur.execute(sql.SQL("UPDATE processing_versions SET summary_text = %s, summary_type = %s, summary_confidence = %s WHERE id = %s"), (results['summary'], "abstractive", 90, processing_version_id))
+        persistence.insert_action_items(cur, processing_version_id, results['action_items'])
+
+        entities, mentions, relationships = results['knowledge_graph']
+        entity_id_map = persistence.upsert_entities(cur, entities)
+        persistence.insert_entity_mentions(cur, processing_version_id, mentions, entity_id_map)
+        persistence.insert_relationships(cur, processing_version_id, knowledge_graph_pipeline.assemble_relationships(relationships, entity_id_map))
+
+        confident_classifications = [c for c in results['classifications'] if c['confidence'] > 0.6]
+        persistence.insert_classifications(cur, processing_version_id, confident_classifications)
+
+        if results['financial_kpis'] is not None:
+            financial_kpis, risk_analysis = results['financial_kpis'], results['financial_risk']
+            persistence.insert_financial_kpis(cur, processing_version_id, financial_kpis)
+            cur.execute(sql.SQL("INSERT INTO financial_risk_analysis (id, processing_version_id, risk_level, confidence, summary, identified_clauses, clause_scores) VALUES (gen_random_uuid(), %s, %s, %s, %s, %s, %s)"), (processing_version_id, risk_analysis['risk_level'], risk_analysis['confidence'], risk_analysis['summary'], Json(risk_analysis['identified_clauses']), Json(risk_analysis['clause_scores'])))
+            job_metrics.count("kpis", len(financial_kpis))
+            job_metrics.count("risk_clauses", len(risk_analysis['identified_clauses']))
+            print(f"Finance Flavor: Extracted {len(financial_kpis)} KPIs and performed risk analysis for version_id {processing_version_id}.")
+        elif results['legal_clauses'] is not None:
+            legal_clause_count = store_legal_clauses_in_batches(cur, processing_version_id, results['legal_clauses'])
+            job_metrics.count("legal_clauses", legal_clause_count)
+            print(f"Legal Flavor: Extracted {legal_clause_count} clauses for version_id {processing_version_id}.")
+
+    job_metrics.count("chunks", len(results['chunks']))
+    job_metrics.count("topics", len(results['topics']))
+    job_metrics.count("action_items", len(results['action_items']))
+    job_metrics.count("entities", len(entities))
+    job_metrics.count("entity_mentions", len(mentions))
+    job_metrics.count("relationships", len(relationships))
+    job_metrics.count("classifications", len(confident_classifications))
+
+    # Active Learning Step: reads the classifications persisted above
+    with job_metrics.span("active_learning"):
+        items_for_review = active_learning_pipeline.uncertainty_sampling(conn, processing_version_id)
+        persistence.insert_review_items(cur, processing_version_id, items_for_review)
     if items_for_review:
         print(f"Active Learning: Added {len(items_for_review)} items to the review queue for version_id {processing_version_id}.")
 
-
-def process_unstructured_job(cur, document_id, processing_version_id, text):
+def prepare_unstructured_job(cur, document_id, processing_version_id, text, chunk_texts):
+    """
+    Runs the cheap, per-document steps (structure detection, template lookup, chunking)
+    and returns the chunk texts to feed into run_all_pipelines, or None if there is no content.
+    Chunks are persisted later together with their embeddings.
+    """
     structure_info = template_detection_pipeline.extract_features(text)
     structure_hash = structure_info['structure_hash']
     cur.execute(sql.SQL("INSERT INTO document_structures (id, processing_version_id, features, structure_hash) VALUES (gen_random_uuid(), %s, %s, %s)"), (processing_version_id, Json(structure_info['features']), structure_hash))
 
-    cur.execute(sql.SQL("SELECT structure_definition FROM document_templates WHERE structure_hash = %s"), (structure_hash,))
-    template_row = cur.fetchone()
-    
-    if template_row:
-        print(f"Matching template found for version_id {processing_version_id}. Applying template-based parsing.")
-        template_definition = template_row[0]
-        structured_content = template_application_pipeline.apply_template(text, template_definition)
-        
-        chunk_texts_unsplit = intelligent_chunking(text)
-        if not chunk_texts_unsplit:
-            cur.execute(sql.SQL("UPDATE processing_versions SET status = %s WHERE id = %s"), ('Failed_NoContent', processing_version_id))
-            return
-        
-        for i, chunk_text in enumerate(chunk_texts_unsplit):
-            cur.execute(sql.SQL("INSERT INTO chunks (id, processing_version_id, text_content, position, token_count) VALUES (gen_random_uuid(), %s, %s, %s, %s)"), (processing_version_id, chunk_text, i, len(chunk_text.split())))
-        
-        cur.execute(sql.SQL("SELECT id, text_content FROM chunks WHERE processing_version_id = %s ORDER BY position ASC"), (processing_version_id,))
-        chunks_for_processing = cur.fetchall()
-        chunk_texts = [c[1] for c in chunks_for_processing]
-        run_all_pipelines(cur, document_id, processing_version_id, text, chunk_texts, chunks_for_processing)
+    template_definition, similarity = template_index.lookup(cur, structure_hash, structure_info['features']['headers'])
 
+    if template_definition:
+        print(f"Matching template found for version_id {processing_version_id} (similarity {similarity:.2f}). Applying template-based parsing.")
+        structured_content = template_application_pipeline.apply_template(text, template_definition)
     else:
         print(f"No matching template found for version_id {processing_version_id}. Using default full-text processing.")
-        chunk_texts_unsplit = intelligent_chunking(text)
-        if not chunk_texts_unsplit:
-            cur.execute(sql.SQL("UPDATE processing_versions SET status = %s WHERE id = %s"), ('Failed_NoContent', processing_version_id))
-            return
 
-        for i, chunk_text in enumerate(chunk_texts_unsplit):
-            cur.execute(sql.SQL("INSERT INTO chunks (id, processing_version_id, text_content, position, token_count) VALUES (gen_random_uuid(), %s, %s, %s, %s)"), (processing_version_id, chunk_text, i, len(chunk_text.split())))
+    if not chunk_texts:
+        cur.execute(sql.SQL("UPDATE processing_versions SET status = %s WHERE id = %s"), ('Failed_NoContent', processing_version_id))
+        return None
+    return chunk_texts
 
-        cur.execute(sql.SQL("SELECT id, text_content FROM chunks WHERE processing_version_id = %s ORDER BY position ASC"), (processing_version_id,))
-        chunks_for_processing = cur.fetchall()
-        chunk_texts = [c[1] for c in chunks_for_processing]
-        run_all_pipelines(cur, document_id, processing_version_id, text, chunk_texts, chunks_for_processing)
-    
-    cur.execute(sql.SQL("UPDATE processing_versions SET status = %s WHERE id = %s"), ('Processed_Text', processing_version_id))
+def load_ingestion_job(cur, document_id, processing_version_id, job_metrics: JobMetrics):
+    """
+    Loads the raw file of a processing version and runs everything that precedes model inference.
+    Tabular files are processed completely here. Returns the pending text job for
+    run_all_pipelines, or None when nothing is left to run (job_metrics.status then tells why).
+    """
+    with job_metrics.span("load_raw_file"):
+        raw_file = open_raw_file(cur, processing_version_id)
+    if not raw_file:
+        print(f"No raw file found for version_id: {processing_version_id}")
+        job_metrics.status = "missing"
+        return None
+
+    with raw_file:
+        file_name, mime_type, raw_content_hash = raw_file.file_name, raw_file.mime_type, raw_file.content_hash
+        job_metrics.set(mime_type=mime_type)
+        job_metrics.count("raw_bytes", raw_file.size)
+        cached_version_id = result_cache.lookup(cur, raw_content_hash, processing_version_id)
+        if cached_version_id:
+            with job_metrics.span("result_cache_clone"):
+                result_cache.clone(cur, cached_version_id, processing_version_id)
+                items_for_review = active_learning_pipeline.uncertainty_sampling(cur.connection, processing_version_id)
+                persistence.insert_review_items(cur, processing_version_id, items_for_review)
+            print(f"Reused results of version_id {cached_version_id} for version_id {processing_version_id}.")
+            job_metrics.status = "cached"
+            return None
 
-def process_ingestion_job(document_id, processing_version_id):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute(sql.SQL("SELECT file_name, mime_type, content FROM raw_files WHERE processing_version_id = %s"), (processing_version_id,))
-        raw_file = cur.fetchone()
-        if not raw_file:
-            print(f"No raw file found for version_id: {processing_version_id}")
-            return
-        
-        file_name, mime_type, content_bytes = raw_file
-        
         is_tabular = file_name.endswith(('.csv', '.xlsx')) or 'spreadsheet' in mime_type or 'csv' in mime_type
-        
+
         if is_tabular:
-            result = tabular_processing_pipeline.process(content_bytes, file_name)
-            if result:
-                cur.execute(sql.SQL("INSERT INTO tabular_data (id, processing_version_id, data_json, detected_schema, row_count, column_count) VALUES (gen_random_uuid(), %s, %s, %s, %s, %s)"), (processing_version_id, Json(result['data_json']), Json(result['detected_schema']), result['row_count'], result['column_count']))
+            # Pages are written while the file streams; the parent row (deferred FK) follows once
+            # the totals are known, and a parse failure discards the pages written so far.
+            tabular_data_id = str(uuid.uuid4())
+            cur.execute("SAVEPOINT tabular_pages")
+            with job_metrics.span("tabular"):
+                result = tabular_processing_pipeline.process(
+                    raw_file.source, file_name,
+                    on_page=lambda page: persistence.insert_tabular_data_page(cur, processing_version_id, tabular_data_id, page)
+                )
+            if not result:
+                cur.execute("ROLLBACK TO SAVEPOINT tabular_pages")
+                job_metrics.status = "failed"
+            else:
+                persistence.insert_tabular_data(cur, processing_version_id, tabular_data_id, result)
                 cur.execute(sql.SQL("UPDATE processing_versions SET status = %s WHERE id = %s"), ('Processed_Tabular', processing_version_id))
-        else:
-            text = ""
-            if mime_type == 'text/x-url': text = extract_text_from_url(content_bytes.decode('utf-8'))
-            elif "pdf" in mime_type: text = extract_text_from_pdf(content_bytes)
-            elif "openxmlformats-officedocument" in mime_type or "docx" in file_name: text = extract_text_from_docx(content_bytes)
-            else: text = content_bytes.decode('utf-8', errors='ignore')
-            process_unstructured_job(cur, document_id, processing_version_id, text)
-
-        conn.commit()
-        print(f"Successfully processed version_id: {processing_version_id} for document_id: {document_id}")
-    except Exception as e:
-        print(f"Error processing document_id {document_id} (version {processing_version_id}): {e}")
-        conn.rollback()
-    finally:
+                result_cache.store(cur, raw_content_hash, processing_version_id)
+                job_metrics.count("tabular_rows", result['row_count'])
+                job_metrics.count("tabular_pages", result['page_count'])
+                job_metrics.status = "tabular"
+            return None
+
+        with job_metrics.span("extract_text"):
+            text, chunk_texts = extract_text_and_chunks(file_name, mime_type, raw_file.source)
+
+    with job_metrics.span("structure"):
+        chunk_texts = prepare_unstructured_job(cur, document_id, processing_version_id, text, chunk_texts)
+    if chunk_texts is None:
+        job_metrics.status = "no_content"
+        return None
+
+    return {
+        "full_text": text,
+        "content_hash": raw_content_hash,
+        "chunk_texts": chunk_texts,
+        "classification_examples": fetch_classification_examples(cur, processing_version_id),
+    }
+
+def process_ingestion_job(document_id, processing_version_id):
+    process_ingestion_batch([{"document_id": document_id, "processing_version_id": processing_version_id}])
+
+def process_ingestion_batch(jobs: list, on_complete=None):
+    """
+    Processes several ingestion jobs, running the model stages in batched calls across all of them.
+    Each job keeps its own connection and transaction; `on_complete(job)` is invoked right after
+    that job's transaction has been committed or rolled back.
+    """
+    pending = []
+    for job in jobs:
+        document_id, processing_version_id = job['document_id'], job['processing_version_id']
+        job_metrics = JobMetrics("ingestion_queue", job.get('published_at_ms'), document_id=document_id, processing_version_id=processing_version_id)
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            text_job = load_ingestion_job(cur, document_id, processing_version_id, job_metrics)
+            if text_job is not None:
+                pending.append((job, conn, cur, text_job, job_metrics))
+                continue
+            with job_metrics.span("commit"):
+                conn.commit()
+            print(f"Successfully processed version_id: {processing_version_id} for document_id: {document_id}")
+        except Exception as e:
+            print(f"Error processing document_id {document_id} (version {processing_version_id}): {e}")
+            conn.rollback()
+            job_metrics.status = "failed"
         cur.close()
-        conn.close()
+        db_pool.putconn(conn)
+        job_metrics.finish()
+        if on_complete: on_complete(job)
+
+    if not pending:
+        return
+
+    try:
+        precomputed_list = run_batched_inference([text_job for _, _, _, text_job, _ in pending], [job_metrics for *_, job_metrics in pending])
+    except Exception as e:
+        print(f"Batched inference failed for {len(pending)} jobs, falling back to per-document inference: {e}")
+        precomputed_list = [None] * len(pending)
+
+    for (job, conn, cur, text_job, job_metrics), precomputed in zip(pending, precomputed_list):
+        document_id, processing_version_id = job['document_id'], job['processing_version_id']
+        try:
+            run_all_pipelines(cur, document_id, processing_version_id, text_job['full_text'], text_job['chunk_texts'], job_metrics, precomputed=precomputed)
+            cur.execute(sql.SQL("UPDATE processing_versions SET status = %s WHERE id = %s"), ('Processed_Text', processing_version_id))
+            result_cache.store(cur, text_job['content_hash'], processing_version_id)
+            with job_metrics.span("commit"):
+                conn.commit()
+            print(f"Successfully processed version_id: {processing_version_id} for document_id: {document_id}")
+        except Exception as e:
+            print(f"Error processing document_id {document_id} (version {processing_version_id}): {e}")
+            conn.rollback()
+            job_metrics.status = "failed"
+        finally:
+            cur.close()
+            db_pool.putconn(conn)
+        job_metrics.finish()
+        if on_complete: on_complete(job)
+
+def parse_job_message(body: bytes):
+    try:
+        message_data = json.loads(body.decode('utf-8'))
+        # published_at_ms (set by the publisher) gives the time the job waited in the queue
+        return {"document_id": message_data['document_id'], "processing_version_id": message_data['processing_version_id'], "published_at_ms": message_data.get('published_at_ms')}
+    except Exception as e:
+        print(f"Failed to decode message: {e}")
+        return None
+
+def handle_ingestion_batch(jobs: list, on_complete):
+    for job in jobs:
+        print(f"Received job for version_id: {job['processing_version_id']}")
+    if len(jobs) > 1:
+        print(f"Processing batch of {len(jobs)} ingestion jobs.")
+    process_ingestion_batch(jobs, on_complete=on_complete)
+    print(f"Database pool: {db_pool.stats()}")
+
+def warm_up_models():
+    if not MODEL_WARMUP:
+        return
+    aliases = None if MODEL_WARMUP == "all" else [alias.strip() for alias in MODEL_WARMUP.split(",") if alias.strip()]
+    print("Warming up models before consuming.")
+    model_registry.warm_up(aliases)
 
 def main():
+    warm_up_models()
     rabbitmq_host = os.environ.get('RABBITMQ_HOST', 'rabbitmq')
-    connection_params = pika.ConnectionParameters(host=rabbitmq_host, connection_attempts=10, retry_delay=5)
-    connection = pika.BlockingConnection(connection_params)
-    channel = connection.channel()
     queue_name = 'ingestion_queue'
-    channel.queue_declare(queue=queue_name, durable=True)
+    # Every job of a batch holds its own connection until it commits
+    db_pool.ensure_capacity(queue_setting(queue_name, "CONCURRENCY", 1) * INGESTION_BATCH_SIZE)
 
-    def callback(ch, method, properties, body):
+    def consume(slot=0):
+        # Each forked process serves its own metrics on METRICS_PORT + its slot
+        metrics.serve(METRICS_PORT + slot if METRICS_PORT else 0)
+        # Opened after fork: a pool inherited from the parent starts empty in the child
+        db_pool.warm_up()
         try:
-            message_data = json.loads(body.decode('utf-8'))
-            document_id = message_data['document_id']
-            processing_version_id = message_data['processing_version_id']
-            print(f"Received job for version_id: {processing_version_id}")
-            process_ingestion_job(document_id, processing_version_id)
-        except Exception as e:
-            print(f"Failed to decode message or process job: {e}")
-        ch.basic_ack(delivery_tag=method.delivery_tag)
+            ConsumerPool(
+                rabbitmq_host, queue_name, handle_ingestion_batch, parse_job_message,
+                batch_size=INGESTION_BATCH_SIZE, batch_wait_ms=INGESTION_BATCH_WAIT_MS,
+            ).run()
+        finally:
+            db_pool.closeall()
 
-    channel.basic_qos(prefetch_count=1)
-    channel.basic_consume(queue=queue_name, on_message_callback=callback)
-    print('Worker started. Waiting for ingestion jobs.')
-    channel.start_consuming()
+    # Processes are forked after warm-up so the loaded models are shared copy-on-write
+    processes = queue_setting(queue_name, "PROCESSES", 1)
+    if processes > 1:
+        run_worker_processes(consume, processes)
+    else:
+        consume()
 
 if __name__ == '__main__':
     try:
@@ -6,12 +6,15 @@ use lapin::{
 use serde::Serialize;
 use serde_json;
 use std::sync::Arc;
+use std::time::{SystemTime, UNIX_EPOCH};
 use uuid::Uuid;
 
 #[derive(Serialize)]
 struct JobMessage {
     document_id: Uuid,
     processing_version_id: Uuid,
+    // Lets the workers measure how long the job waited in the queue
+    published_at_ms: u64,
 }
 
 #[derive(Clone)]
@@ -37,7 +40,11 @@ impl RabbitMQPublisher {
             )
             .await?;
 
-        let message = JobMessage { document_id, processing_version_id };
+        let published_at_ms = SystemTime::now()
+            .duration_since(UNIX_EPOCH)
+            .map(|elapsed| elapsed.as_millis() as u64)
+            .unwrap_or_default();
+        let message = JobMessage { document_id, processing_version_id, published_at_ms };
         let payload = serde_json::to_string(&message).unwrap_or_default().into_bytes();
         let props = AMQPProperties::default().with_content_type("application/json".into());
 
@@ -0,0 +1,52 @@
+import os
+import sys
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'python-workers', 'src'))
+
+def _connect(schema: str = None):
+    import psycopg2
+
+    connection_params = {
+        'dbname': os.environ.get("POSTGRES_DB", "schema_api_db"),
+        'user': os.environ.get("POSTGRES_USER", "admin"),
+        'password': os.environ.get("POSTGRES_PASSWORD", "password123"),
+        'host': os.environ.get("POSTGRES_HOST", "localhost"),
+        'port': os.environ.get("POSTGRES_PORT", "5432"),
+        'client_encoding': 'UTF8',
+    }
+    if schema:
+        connection_params['options'] = f"-c search_path={schema},public"
+    return psycopg2.connect(**connection_params)
+
+@pytest.fixture
+def pg_schema():
+    """
+    Fornece uma função que abre conexões com o PostgreSQL dentro de um schema descartável,
+    criado para o teste e removido ao final. O teste é pulado se o banco não estiver acessível.
+    """
+    try:
+        admin = _connect()
+    except Exception as e:
+        pytest.skip(f"PostgreSQL indisponível: {e}")
+    admin.autocommit = True
+    schema = f"unit_{uuid.uuid4().hex[:12]}"
+    with admin.cursor() as cur:
+        cur.execute(f"CREATE SCHEMA {schema}")
+
+    connections = []
+
+    def connect():
+        conn = _connect(schema)
+        connections.append(conn)
+        return conn
+
+    yield connect
+
+    for conn in connections:
+        conn.close()
+    with admin.cursor() as cur:
+        cur.execute(f"DROP SCHEMA {schema} CASCADE")
+    admin.close()
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipelines.anomaly_detection import AnomalyDetector, ReservoirSample
+
+pytestmark = pytest.mark.unit
+
+def _frame() -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    valores = rng.normal(100.0, 5.0, 200)
+    valores[120] = 1000.0
+    return pd.DataFrame({
+        "valor": valores,
+        "constante": np.full(200, 3.0),
+        "quantidade": pd.array(rng.integers(1, 10, 200), dtype="Int64"),
+        "descricao": ["item"] * 200,
+    })
+
+@pytest.mark.parametrize("method", ["zscore", "mad", "iqr"])
+def test_every_method_flags_the_planted_outlier(method):
+    anomalies = AnomalyDetector(method=method).detect_frame(_frame())
+
+    assert {"row": 120, "column": "valor", "value": 1000.0, "reason": AnomalyDetector(method=method).reason} in anomalies
+    assert all(anomaly["column"] != "constante" for anomaly in anomalies)
+
+def test_nans_are_ignored_and_all_nan_columns_skipped():
+    values = np.array([[1.0, np.nan], [2.0, np.nan], [np.nan, np.nan], [1.5, np.nan], [50.0, np.nan]])
+    detector = AnomalyDetector(method="mad")
+    lower, upper = detector.bounds(values)
+
+    assert np.isnan(lower[1]) and np.isnan(upper[1])
+    assert detector.detect(values, ["a", "b"], lower, upper) == [{"row": 4, "column": "a", "value": 50.0, "reason": detector.reason}]
+
+def test_detect_reports_in_row_order_with_offset_and_limit():
+    values = np.array([[0.0, 9.0], [9.0, 0.0], [9.0, 9.0]])
+    detector = AnomalyDetector(method="zscore", threshold=1.0, max_anomalies=3)
+    lower, upper = np.array([-1.0, -1.0]), np.array([1.0, 1.0])
+
+    anomalies = detector.detect(values, ["a", "b"], lower, upper, row_offset=100)
+    assert [(anomaly["row"], anomaly["column"]) for anomaly in anomalies] == [(100, "b"), (101, "a"), (102, "a")]
+    assert detector.detect(values, ["a", "b"], lower, upper, limit=0) == []
+
+def test_running_moments_give_the_same_zscore_band():
+    values = _frame()[["valor"]].to_numpy()
+    detector = AnomalyDetector(method="zscore")
+    lower, upper = detector.bounds(values)
+    running = detector.bounds_from_moments(values.mean(axis=0), values.std(axis=0, ddof=1))
+    assert np.allclose(lower, running[0]) and np.allclose(upper, running[1])
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(ValueError, match="Unknown anomaly detection method"):
+        AnomalyDetector(method="lof")
+
+def test_reservoir_keeps_small_tables_whole_and_bounds_large_ones():
+    small = ReservoirSample(capacity=10)
+    small.add(np.arange(6, dtype=float).reshape(3, 2))
+    small.add(np.arange(6, 12, dtype=float).reshape(3, 2))
+    assert np.array_equal(small.rows, np.arange(12, dtype=float).reshape(6, 2))
+
+    large = ReservoirSample(capacity=100, seed=1)
+    for start in range(0, 10000, 1000):
+        large.add(np.arange(start, start + 1000, dtype=float).reshape(-1, 1))
+    assert large.seen == 10000
+    assert large.rows.shape == (100, 1)
+    assert len(np.unique(large.rows)) == 100
+    # Amostra uniforme: linhas do fim da tabela também entram
+    assert large.rows.max() > 5000
@@ -0,0 +1,88 @@
+import hashlib
+import os
+import uuid
+
+import pytest
+
+import blob_store
+from blob_store import open_raw_file
+from result_cache import content_hash
+
+pytestmark = pytest.mark.integration
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'database', 'migrations')
+MIME_TYPE = "text/plain"
+
+@pytest.fixture
+def conn(pg_schema, monkeypatch):
+    # Limites pequenos para que poucos KB já sejam lidos em fatias
+    monkeypatch.setattr(blob_store, "RAW_BLOB_MEMORY_LIMIT", 4096)
+    monkeypatch.setattr(blob_store, "RAW_BLOB_READ_SIZE", 1000)
+    conn = pg_schema()
+    with conn.cursor() as cur:
+        # raw_files apenas com as colunas lidas pelo blob_store
+        cur.execute("CREATE TABLE raw_files (processing_version_id UUID PRIMARY KEY, file_name TEXT NOT NULL, mime_type TEXT NOT NULL, content BYTEA NOT NULL)")
+    conn.commit()
+    return conn
+
+def _run_migration(conn, name: str):
+    with conn.cursor() as cur, open(os.path.join(MIGRATIONS_DIR, name), encoding='utf-8') as f:
+        cur.execute(f.read())
+    conn.commit()
+
+def _insert(conn, content: bytes):
+    version_id = str(uuid.uuid4())
+    with conn.cursor() as cur:
+        cur.execute("INSERT INTO raw_files VALUES (%s, 'arquivo.txt', %s, %s)", (version_id, MIME_TYPE, content))
+    conn.commit()
+    return version_id
+
+def _compressible(size: int) -> bytes:
+    # Repetitivo o bastante para o TOAST comprimir, variado o bastante para fatias distintas
+    return b"".join(hashlib.sha1(str(i // 50).encode()).digest() for i in range(size // 20))
+
+def _is_compressed(conn, version_id) -> bool:
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_column_compression(content) IS NOT NULL FROM raw_files WHERE processing_version_id = %s", (version_id,))
+        return cur.fetchone()[0]
+
+def test_large_uncompressed_blob_is_spooled_and_removed_on_close(conn):
+    _run_migration(conn, "025_store_raw_file_content_uncompressed.sql")
+    content = _compressible(20000)
+    version_id = _insert(conn, content)
+    assert not _is_compressed(conn, version_id)
+
+    with conn.cursor() as cur:
+        blob = open_raw_file(cur, version_id)
+    with blob:
+        assert isinstance(blob.source, str)
+        with open(blob.source, "rb") as f:
+            assert f.read() == content
+        assert blob.content_hash == content_hash(MIME_TYPE, content)
+    assert not os.path.exists(blob.path)
+
+def test_compressed_legacy_blob_is_read_in_one_query(conn):
+    content = _compressible(20000)
+    version_id = _insert(conn, content)
+    _run_migration(conn, "025_store_raw_file_content_uncompressed.sql")
+    assert _is_compressed(conn, version_id)
+
+    with conn.cursor() as cur:
+        blob = open_raw_file(cur, version_id)
+    with blob:
+        assert blob.source == content
+        assert blob.content_hash == content_hash(MIME_TYPE, content)
+
+def test_rewrite_migration_decompresses_legacy_rows(conn):
+    content = _compressible(20000)
+    version_id = _insert(conn, content)
+    _run_migration(conn, "025_store_raw_file_content_uncompressed.sql")
+    _run_migration(conn, "029_rewrite_compressed_raw_file_content.sql")
+    _run_migration(conn, "029_rewrite_compressed_raw_file_content.sql")
+
+    assert not _is_compressed(conn, version_id)
+    with conn.cursor() as cur:
+        blob = open_raw_file(cur, version_id)
+    with blob:
+        assert isinstance(blob.source, str)
+        assert blob.content_hash == content_hash(MIME_TYPE, content)
@@ -0,0 +1,90 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from pipelines import classification
+from pipelines.classification import ClassificationPipeline
+
+pytestmark = pytest.mark.unit
+
+LABELS = ["financeiro", "jurídico", "técnico"]
+AXES = {"balanço": 0, "contrato": 1, "servidor": 2}
+
+class FakeEncoder:
+    """Embedding falso: cada texto aponta para o eixo da sua palavra-chave."""
+
+    def __init__(self, delay: float = 0.0):
+        self.calls = 0
+        self.delay = delay
+
+    def encode(self, texts):
+        self.calls += 1
+        time.sleep(self.delay)
+        return np.array([_vector(text) for text in texts], dtype=np.float32)
+
+def _vector(text: str) -> np.ndarray:
+    vector = np.full(3, 0.05, dtype=np.float32)
+    for word, axis in AXES.items():
+        if word in text:
+            vector[axis] = 1.0
+    return vector
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    pipeline = ClassificationPipeline()
+    pipeline.mode = "chunked"
+    pipeline.nli_calls = []
+
+    def entailment_scores(premises, candidate_labels):
+        pipeline.nli_calls.append(list(premises))
+        return np.tile(np.linspace(0.9, 0.1, len(candidate_labels)), (len(premises), 1))
+
+    monkeypatch.setattr(pipeline, "_entailment_scores", entailment_scores)
+    monkeypatch.setattr(classification.model_registry, "get_known", lambda alias: FakeEncoder())
+    return pipeline
+
+def _document(text: str, examples: list) -> dict:
+    return {"chunk_texts": [text], "embeddings": [_vector(text)], "examples": examples}
+
+def _classify(pipeline, text: str, examples: list) -> list:
+    return pipeline.classify_documents([_document(text, examples)], LABELS)[0]
+
+def test_two_candidate_centroids_decide_without_nli(pipeline):
+    examples = [{"text": "balanço anual", "label": "financeiro"}, {"text": "contrato de locação", "label": "jurídico"}]
+    result = _classify(pipeline, "balanço trimestral", examples)
+
+    assert pipeline.nli_calls == []
+    assert [c["label"] for c in result] == ["financeiro", "jurídico"]
+    assert {c["classifier_type"] for c in result} == {"embedding-centroid"}
+
+def test_single_example_label_falls_back_to_nli(pipeline):
+    # Com um único rótulo não há segundo colocado para medir a margem
+    result = _classify(pipeline, "balanço trimestral", [{"text": "balanço anual", "label": "financeiro"}])
+
+    assert pipeline.nli_calls == [["balanço trimestral"]]
+    assert [c["label"] for c in result] == LABELS
+    assert {c["classifier_type"] for c in result} == {"zero-shot-chunked"}
+
+def test_example_labels_outside_the_candidates_are_ignored(pipeline):
+    examples = [{"text": "balanço anual", "label": "financeiro"}, {"text": "contrato de locação", "label": "outro"}]
+    result = _classify(pipeline, "balanço trimestral", examples)
+
+    assert len(pipeline.nli_calls) == 1
+    assert [c["label"] for c in result] == LABELS
+
+def test_concurrent_callers_compute_centroids_once(pipeline, monkeypatch):
+    encoder = FakeEncoder(delay=0.05)
+    monkeypatch.setattr(classification.model_registry, "get_known", lambda alias: encoder)
+    examples = [{"text": "balanço anual", "label": "financeiro"}, {"text": "contrato de locação", "label": "jurídico"}]
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(pipeline._label_centroids(examples))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert encoder.calls == 1
+    assert all(result is results[0] for result in results)
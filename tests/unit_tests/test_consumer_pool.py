@@ -0,0 +1,115 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from consumer_pool import ConsumerPool, queue_setting
+
+pytestmark = pytest.mark.unit
+
+class FakeConnection:
+    """Conexão pika mínima: callbacks agendados ficam guardados, os thread-safe rodam na hora."""
+
+    def __init__(self):
+        self.scheduled = []
+
+    def call_later(self, delay, callback):
+        self.scheduled.append((delay, callback))
+
+    def add_callback_threadsafe(self, callback):
+        callback()
+
+class FakeChannel:
+    def __init__(self):
+        self.acked = []
+        self.cancelled = []
+
+    def basic_ack(self, delivery_tag):
+        self.acked.append(delivery_tag)
+
+    def basic_cancel(self, consumer_tag):
+        self.cancelled.append(consumer_tag)
+
+class InlineExecutor:
+    def submit(self, fn, *args):
+        fn(*args)
+
+def _pool(handle_batch, batch_size=2, batch_wait_ms=200) -> ConsumerPool:
+    parse = lambda body: json.loads(body) if body != b"invalid" else None
+    pool = ConsumerPool("rabbitmq", "ingestion_queue", handle_batch, parse, concurrency=1, batch_size=batch_size, batch_wait_ms=batch_wait_ms)
+    pool.connection, pool.channel, pool._executor = FakeConnection(), FakeChannel(), InlineExecutor()
+    pool.consumer_tag = "ctag"
+    return pool
+
+def _deliver(pool, tag: int, body: bytes = None):
+    pool._on_message(pool.channel, SimpleNamespace(delivery_tag=tag), None, body or json.dumps({"n": tag}).encode())
+
+def _complete_all(batches):
+    def handle(jobs, on_complete):
+        batches.append([job["n"] for job in jobs])
+        for job in jobs:
+            on_complete(job)
+    return handle
+
+def test_queue_setting_reads_per_queue_environment(monkeypatch):
+    monkeypatch.setenv("INGESTION_QUEUE_CONCURRENCY", "3")
+    assert queue_setting("ingestion_queue", "CONCURRENCY", 1) == 3
+    assert queue_setting("ingestion_queue", "PREFETCH", 7) == 7
+
+def test_prefetch_defaults_to_one_batch_per_handler(monkeypatch):
+    monkeypatch.delenv("ANALYTICS_QUEUE_PREFETCH", raising=False)
+    pool = ConsumerPool("rabbitmq", "analytics_queue", None, None, concurrency=3, batch_size=4)
+    assert pool.prefetch == 12
+
+def test_full_batch_is_dispatched_at_once_and_acked():
+    batches = []
+    pool = _pool(_complete_all(batches))
+    _deliver(pool, 1)
+    _deliver(pool, 2)
+
+    assert batches == [[1, 2]]
+    assert pool.channel.acked == [1, 2]
+    assert pool._in_flight == 0
+    # O timer agendado pela primeira mensagem encontra o buffer vazio
+    pool.connection.scheduled[0][1]()
+    assert batches == [[1, 2]]
+
+def test_partial_batch_is_dispatched_when_the_wait_expires():
+    batches = []
+    pool = _pool(_complete_all(batches), batch_size=3, batch_wait_ms=250)
+    _deliver(pool, 1)
+    assert batches == []
+    assert [delay for delay, _ in pool.connection.scheduled] == [0.25]
+
+    pool.connection.scheduled[0][1]()
+    assert batches == [[1]]
+    assert pool.channel.acked == [1]
+
+def test_unparseable_message_is_acked_without_reaching_the_handler():
+    batches = []
+    pool = _pool(_complete_all(batches))
+    _deliver(pool, 1, b"invalid")
+    assert batches == []
+    assert pool.channel.acked == [1]
+
+def test_jobs_are_acked_when_the_handler_fails_or_forgets_them():
+    def handle(jobs, on_complete):
+        on_complete(jobs[0])
+        raise RuntimeError("falhou")
+
+    pool = _pool(handle)
+    _deliver(pool, 1)
+    _deliver(pool, 2)
+    assert sorted(pool.channel.acked) == [1, 2]
+    assert pool._in_flight == 0
+
+def test_stop_cancels_consumer_and_flushes_buffered_jobs():
+    batches = []
+    pool = _pool(_complete_all(batches), batch_size=5)
+    _deliver(pool, 1)
+    pool.stop()
+    pool.stop()
+
+    assert pool.channel.cancelled == ["ctag"]
+    assert batches == [[1]]
+    assert pool._stopping and not pool._buffer and not pool._in_flight
@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+from db_pool import ConnectionPool
+
+pytestmark = pytest.mark.integration
+
+@pytest.fixture
+def pool(pg_schema, monkeypatch):
+    # O pool lê o host de DB_HOST, como nos workers
+    monkeypatch.setenv("DB_HOST", os.environ.get("POSTGRES_HOST", "localhost"))
+    monkeypatch.setenv("PGPORT", os.environ.get("POSTGRES_PORT", "5432"))
+    pool = ConnectionPool(min_size=2, max_size=3)
+    yield pool
+    pool.closeall()
+
+def test_warm_up_opens_min_size_connections_once(pool):
+    pool.warm_up()
+    pool.warm_up()
+
+    assert pool.stats()["idle"] == 2
+    assert pool.stats()["connects"] == 2
+
+    conn = pool.getconn()
+    pool.putconn(conn)
+    assert pool.stats()["connects"] == 2
+
+def test_closeall_closes_idle_connections(pool):
+    pool.warm_up()
+    idle = [conn for conn, _ in pool._idle]
+    in_use = pool.getconn()
+
+    pool.closeall()
+
+    assert all(conn.closed for conn in idle if conn is not in_use)
+    assert not in_use.closed
+    assert pool.stats()["idle"] == 0
+    pool.putconn(in_use)
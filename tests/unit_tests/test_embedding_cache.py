@@ -0,0 +1,120 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from embedding_cache import DiskEmbeddingStore, EmbeddingCache
+
+pytestmark = pytest.mark.unit
+
+DIMENSION = 4
+
+class FakeModel:
+    """Modelo determinístico: o vetor depende só do texto, e cada chamada é contada."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_sentence_embedding_dimension(self):
+        return DIMENSION
+
+    def encode(self, texts, **kwargs):
+        self.calls += 1
+        return np.array([[len(text), sum(map(ord, text)) % 97, i, 1.0] for i, text in enumerate(texts)], dtype=np.float32)
+
+def _digest(index: int, last_byte: int = 1) -> bytes:
+    return index.to_bytes(4, "big") + b"\x07" * 15 + bytes([last_byte])
+
+def _vector(index: int) -> np.ndarray:
+    return np.full(DIMENSION, index, dtype=np.float32)
+
+def test_digest_ending_in_nul_survives_reopen(tmp_path):
+    digest = _digest(1, last_byte=0)
+    store = DiskEmbeddingStore(str(tmp_path), DIMENSION, 8)
+    store.put_many([(digest, _vector(1))])
+    store.flush()
+
+    reopened = DiskEmbeddingStore(str(tmp_path), DIMENSION, 8)
+    assert np.array_equal(reopened.get(digest), _vector(1))
+    assert reopened.get(digest[:-1] + b"\x01") is None
+
+def test_stores_sharing_a_directory_claim_distinct_slots(tmp_path):
+    first = DiskEmbeddingStore(str(tmp_path), DIMENSION, 16)
+    second = DiskEmbeddingStore(str(tmp_path), DIMENSION, 16)
+    first.put_many([(_digest(i), _vector(i)) for i in range(3)])
+    second.put_many([(_digest(i), _vector(i)) for i in range(3, 6)])
+
+    reopened = DiskEmbeddingStore(str(tmp_path), DIMENSION, 16)
+    assert int(reopened.cursor[0]) == 6
+    for i in range(6):
+        assert np.array_equal(reopened.get(_digest(i)), _vector(i))
+
+def _write_range(directory: str, start: int, count: int):
+    store = DiskEmbeddingStore(directory, DIMENSION, 1024)
+    for i in range(start, start + count):
+        store.put_many([(_digest(i), _vector(i))])
+    store.flush()
+
+def test_concurrent_processes_do_not_overwrite_each_other(tmp_path):
+    opened_before = DiskEmbeddingStore(str(tmp_path), DIMENSION, 1024)
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_write_range, args=(str(tmp_path), worker * 100, 100)) for worker in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    store = DiskEmbeddingStore(str(tmp_path), DIMENSION, 1024)
+    assert int(store.cursor[0]) == 400
+    assert all(np.array_equal(store.get(_digest(i)), _vector(i)) for i in range(400))
+    # Uma instância aberta antes das escritas também as encontra
+    assert all(np.array_equal(opened_before.get(_digest(i)), _vector(i)) for i in range(400))
+
+def test_overwritten_slot_reads_as_miss(tmp_path):
+    store = DiskEmbeddingStore(str(tmp_path), DIMENSION, 2)
+    store.put_many([(_digest(i), _vector(i)) for i in range(3)])
+
+    assert store.get(_digest(0)) is None
+    assert np.array_equal(store.get(_digest(2)), _vector(2))
+
+def test_misses_are_flushed_on_interval_not_per_batch(tmp_path):
+    store = DiskEmbeddingStore(str(tmp_path), DIMENSION, 8, flush_seconds=3600)
+    flushes = []
+    store.flush = lambda: flushes.append(1)
+    store.put_many([(_digest(i), _vector(i)) for i in range(3)])
+    assert flushes == []
+
+    store.last_flush -= 3600
+    store.put_many([(_digest(3), _vector(3))])
+    assert flushes == [1]
+
+def test_entries_written_by_another_process_after_open_are_found(tmp_path):
+    reader = DiskEmbeddingStore(str(tmp_path), DIMENSION, 16)
+    writer = DiskEmbeddingStore(str(tmp_path), DIMENSION, 16)
+    writer.put_many([(_digest(i), _vector(i)) for i in range(3)])
+
+    assert np.array_equal(reader.get(_digest(1)), _vector(1))
+    assert reader.scanned == 3
+    assert reader.get(_digest(99)) is None
+
+def test_rescan_after_the_ring_wrapped_keeps_only_live_slots(tmp_path):
+    reader = DiskEmbeddingStore(str(tmp_path), DIMENSION, 4)
+    writer = DiskEmbeddingStore(str(tmp_path), DIMENSION, 4)
+    writer.put_many([(_digest(i), _vector(i)) for i in range(10)])
+
+    assert reader.get(_digest(3)) is None
+    assert all(np.array_equal(reader.get(_digest(i)), _vector(i)) for i in range(6, 10))
+    assert len(reader.index) == 4
+
+def test_cache_serves_second_process_from_disk(tmp_path):
+    model = FakeModel()
+    cache = EmbeddingCache(model, "modelo/teste", disk_dir=str(tmp_path), disk_capacity=32)
+    expected = cache.encode(["contrato  de locação", "multa"])
+    cache._disk.flush()
+
+    other_model = FakeModel()
+    other = EmbeddingCache(other_model, "modelo/teste", disk_dir=str(tmp_path), disk_capacity=32)
+    assert np.array_equal(other.encode(["contrato de locação", "multa"]), expected)
+    assert other_model.calls == 0
+    assert other.stats()["disk_hits"] == 2
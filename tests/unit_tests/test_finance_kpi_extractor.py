@@ -0,0 +1,34 @@
+from decimal import Decimal
+
+import pytest
+
+from pipelines.finance_kpi_extractor import FinanceKPIExtractorPipeline
+
+pytestmark = pytest.mark.unit
+
+@pytest.fixture(scope="module")
+def extractor():
+    return FinanceKPIExtractorPipeline()
+
+@pytest.mark.parametrize("text, period", [
+    # Período entre o nome do KPI e o valor
+    ("A Receita Líquida do 3T24 foi de R$ 10 milhões.", "2024-Q3"),
+    ("Net revenue for Q3 2024 was $10 million.", "2024-Q3"),
+    ("Receita Líquida de 2023 foi de R$ 10 milhões.", "2023"),
+    # Antes do nome e depois do valor
+    ("No 2T23, a Receita Líquida foi de R$ 5 milhões.", "2023-Q2"),
+    ("Receita Líquida de R$ 10 milhões no 3T24.", "2024-Q3"),
+])
+def test_period_is_found_around_and_inside_the_mention(extractor, text, period):
+    kpis = extractor.extract_kpis(text)
+
+    assert len(kpis) == 1
+    assert kpis[0]["period"] == period
+    assert kpis[0]["kpi_value"] in (Decimal("10000000"), Decimal("5000000"))
+
+def test_year_inside_the_value_is_not_a_period(extractor):
+    kpis = extractor.extract_kpis("Receita Líquida foi de R$ 2024 mil.")
+
+    assert len(kpis) == 1
+    assert kpis[0]["kpi_value"] == Decimal("2024000")
+    assert kpis[0]["period"] is None
@@ -0,0 +1,65 @@
+import pytest
+
+from pipelines.finance_risk_classifier import CANDIDATE_LABELS, NOT_ASSESSED, FinanceRiskClassifierPipeline
+
+pytestmark = pytest.mark.unit
+
+class FakeZeroShot:
+    """Classificador zero-shot falso: cláusulas com "multa" são de alto risco, as demais de risco médio."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts, labels, multi_label=False, batch_size=8):
+        self.calls.append(list(texts))
+        results = []
+        for text in texts:
+            top = "alto risco" if "multa" in text.lower() else "médio risco"
+            scores = {label: 0.8 if label == top else 0.1 for label in labels}
+            ordered = sorted(labels, key=scores.get, reverse=True)
+            results.append({"labels": ordered, "scores": [scores[label] for label in ordered]})
+        return results
+
+@pytest.fixture
+def classifier(monkeypatch):
+    pipeline = FinanceRiskClassifierPipeline()
+    fake = FakeZeroShot()
+    monkeypatch.setattr(pipeline, "_get_pipeline", lambda: fake)
+    pipeline.fake = fake
+    return pipeline
+
+TEXT = (
+    "O contrato vigora por doze meses. O atraso no pagamento sujeita o devedor a multa de 10%. "
+    "Em caso de inadimplemento, a parte poderá requerer a rescisão do contrato. As partes elegem o foro da capital."
+)
+
+def test_identified_clauses_stay_a_list_of_texts(classifier):
+    result = classifier.classify_risk(TEXT)
+
+    assert result["identified_clauses"] == [
+        "O atraso no pagamento sujeita o devedor a multa de 10%.",
+        "Em caso de inadimplemento, a parte poderá requerer a rescisão do contrato.",
+    ]
+    assert all(isinstance(clause, str) for clause in result["identified_clauses"])
+
+def test_clause_scores_carry_the_structured_nli_result(classifier):
+    result = classifier.classify_risk(TEXT)
+
+    first, second = result["clause_scores"]
+    assert first["clause"] == result["identified_clauses"][0]
+    assert first["categories"] == ["penalidade"]
+    assert sorted(second["categories"]) == ["rescisão", "violação"]
+    assert set(first["scores"]) == set(CANDIDATE_LABELS)
+    assert (first["risk_level"], first["risk_score"]) == ("alto risco", pytest.approx(0.85))
+    assert result["risk_level"] == "alto risco"
+    assert 0 < result["confidence"] <= 100
+    # Uma única chamada em lote ao modelo, só com as cláusulas candidatas
+    assert classifier.fake.calls == [result["identified_clauses"]]
+
+def test_document_without_candidates_is_not_assessed(classifier):
+    result = classifier.classify_risk("Relatório trimestral de vendas da filial norte.")
+
+    assert result["risk_level"] == NOT_ASSESSED
+    assert result["confidence"] == 0
+    assert result["identified_clauses"] == [] and result["clause_scores"] == []
+    assert classifier.fake.calls == []
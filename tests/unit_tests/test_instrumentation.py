@@ -0,0 +1,28 @@
+import pytest
+
+from instrumentation import MetricsRegistry
+
+pytestmark = pytest.mark.unit
+
+def test_label_values_are_escaped_in_the_exposition_format():
+    registry = MetricsRegistry(buckets=(1.0,))
+    registry.inc("jobs_total", queue='fila "a"', error='C:\\temp\nlinha 2')
+    registry.observe("stage_seconds", 0.5, stage='ocr "rápido"')
+
+    lines = registry.render().splitlines()
+    assert 'jobs_total{error="C:\\\\temp\\nlinha 2",queue="fila \\"a\\""} 1.0' in lines
+    assert 'stage_seconds_bucket{stage="ocr \\"rápido\\"",le="1.0"} 1' in lines
+    assert 'stage_seconds_count{stage="ocr \\"rápido\\""} 1' in lines
+    # Cada amostra continua numa única linha
+    assert all(line.startswith(("#", "jobs_total", "stage_seconds")) for line in lines)
+
+def test_render_groups_samples_under_one_type_line():
+    registry = MetricsRegistry(buckets=(1.0, 2.0))
+    registry.observe("stage_seconds", 1.5, stage="a")
+    registry.observe("stage_seconds", 0.5, stage="b")
+
+    lines = registry.render().splitlines()
+    assert lines.count("# TYPE stage_seconds histogram") == 1
+    assert 'stage_seconds_bucket{stage="a",le="1.0"} 0' in lines
+    assert 'stage_seconds_bucket{stage="a",le="2.0"} 1' in lines
+    assert 'stage_seconds_bucket{stage="b",le="+Inf"} 1' in lines
@@ -0,0 +1,76 @@
+import threading
+
+import pytest
+
+from pipelines.model_registry import ModelRegistry
+
+pytestmark = pytest.mark.unit
+
+class FakeModel:
+    def __init__(self, name: str, size_mb: float):
+        self.name = name
+        self.size_mb = size_mb
+
+    def get_memory_footprint(self):
+        return self.size_mb * 1024 * 1024
+
+class FakeRegistry(ModelRegistry):
+    """Registro com carregamento falso; modelos cujo nome começa com "lento" esperam o evento `release`."""
+
+    def __init__(self, memory_budget_mb=0):
+        super().__init__(memory_budget_mb=memory_budget_mb)
+        self.release = threading.Event()
+        self.loading = threading.Event()
+        self.loads = []
+
+    def _load(self, task, model_name, kwargs):
+        self.loads.append(model_name)
+        if model_name.startswith("lento"):
+            self.loading.set()
+            assert self.release.wait(timeout=5)
+        return FakeModel(model_name, kwargs.get("size_mb", 1.0))
+
+def test_loaded_models_are_served_while_another_one_loads():
+    registry = FakeRegistry()
+    cached = registry.get("ner", "rapido")
+    loader = threading.Thread(target=registry.get, args=("summarization", "lento"))
+    loader.start()
+    assert registry.loading.wait(timeout=5)
+
+    # Com o carregamento em andamento, o modelo já carregado continua disponível
+    result = {}
+    reader = threading.Thread(target=lambda: result.update(model=registry.get("ner", "rapido")))
+    reader.start()
+    reader.join(timeout=2)
+    finished_while_loading = not reader.is_alive()
+
+    registry.release.set()
+    loader.join(timeout=5)
+    reader.join(timeout=5)
+    assert finished_while_loading
+    assert result["model"] is cached
+
+def test_concurrent_callers_of_one_model_load_it_once():
+    registry = FakeRegistry()
+    models = []
+    threads = [threading.Thread(target=lambda: models.append(registry.get("ner", "lento"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    assert registry.loading.wait(timeout=5)
+    registry.release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert registry.loads == ["lento"]
+    assert len(models) == 4 and all(model is models[0] for model in models)
+    assert registry.stats()[0]["uses"] == 4
+
+def test_least_recently_used_evictable_model_is_dropped_over_budget():
+    registry = FakeRegistry(memory_budget_mb=10)
+    registry.get("ner", "financeiro", evictable=True, size_mb=4)
+    registry.get("ner", "juridico", evictable=True, size_mb=4)
+    registry.get("ner", "financeiro", evictable=True, size_mb=4)
+    registry.get("zero-shot-classification", "base", size_mb=4)
+
+    assert [entry["model_name"] for entry in registry.stats()] == ["financeiro", "base"]
+    assert registry.total_footprint_mb() == pytest.approx(8)
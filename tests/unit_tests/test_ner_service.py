@@ -0,0 +1,53 @@
+import pytest
+
+from pipelines import ner_service as ner_module
+from pipelines.action_item_extraction import ActionItemExtractionPipeline
+from pipelines.knowledge_graph_extraction import KnowledgeGraphPipeline
+from pipelines.ner_service import NERService
+
+pytestmark = pytest.mark.unit
+
+class FakeNER:
+    """Modelo NER falso: toda palavra capitalizada conhecida é uma pessoa; guarda as frases vistas."""
+
+    PEOPLE = ("Ana", "Bruno")
+
+    def __init__(self):
+        self.seen = []
+
+    def __call__(self, sentences, batch_size=32):
+        batch = [sentences] if isinstance(sentences, str) else sentences
+        self.seen.extend(batch)
+        results = [[{"entity_group": "PER", "word": name, "score": 0.99} for name in self.PEOPLE if name in sentence] for sentence in batch]
+        return results[0] if isinstance(sentences, str) else results
+
+@pytest.fixture
+def service(monkeypatch):
+    service, model = NERService(), FakeNER()
+    monkeypatch.setattr(service, "_get_pipeline", lambda: model)
+    monkeypatch.setattr(ner_module, "ner_service", service)
+    # Os pipelines importaram a instância compartilhada pelo nome
+    monkeypatch.setattr("pipelines.action_item_extraction.ner_service", service)
+    monkeypatch.setattr("pipelines.knowledge_graph_extraction.ner_service", service)
+    service.model = model
+    return service
+
+RAW_TEXT = "Reunião de status.  Ana  precisa revisar o contrato\ncom Bruno até sexta.\nSem outros pontos."
+CHUNK_TEXT = " ".join(RAW_TEXT.split())
+
+def test_raw_text_and_chunk_text_share_cache_entries(service):
+    action_items = ActionItemExtractionPipeline().extract(RAW_TEXT)
+    entities, _, relationships = KnowledgeGraphPipeline().extract_graph_components([("chunk-1", CHUNK_TEXT)])
+
+    assert action_items[0]["assignee_name"] == "Ana"
+    assert {entity["name"] for entity in entities} == {"Ana", "Bruno"}
+    assert relationships
+    # A frase de ação passou pelo modelo uma única vez, apesar das quebras de linha no texto bruto
+    assert service.model.seen.count("Ana precisa revisar o contrato com Bruno até sexta.") == 1
+    assert all("\n" not in sentence and "  " not in sentence for sentence in service.model.seen)
+
+def test_annotate_returns_results_in_input_order(service):
+    annotations = service.annotate(["Bruno  chegou.", "Nada aqui.", "Bruno chegou.", ""])
+
+    assert [[entity["word"] for entity in entities] for entities in annotations] == [["Bruno"], [], ["Bruno"], []]
+    assert service.model.seen == ["Bruno chegou.", "Nada aqui."]
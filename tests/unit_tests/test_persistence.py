@@ -0,0 +1,57 @@
+import pytest
+
+import persistence
+from persistence import bulk_insert, insert_classifications, insert_topics, upsert_entities
+
+pytestmark = pytest.mark.integration
+
+@pytest.fixture
+def conn(pg_schema):
+    conn = pg_schema()
+    with conn.cursor() as cur:
+        # Tabelas de resultado só com as colunas escritas aqui, sem as FKs para documentos
+        cur.execute("""
+            CREATE TABLE topics (id UUID PRIMARY KEY, processing_version_id UUID NOT NULL, topic_text TEXT NOT NULL, weight REAL, topic_type TEXT);
+            CREATE TABLE entities (id UUID PRIMARY KEY, name TEXT NOT NULL, entity_type TEXT NOT NULL, UNIQUE(name, entity_type));
+            CREATE TABLE document_classifications (
+                id UUID PRIMARY KEY, processing_version_id UUID NOT NULL, label TEXT NOT NULL, confidence INT, classifier_type TEXT,
+                UNIQUE(processing_version_id, label)
+            );
+        """)
+    conn.commit()
+    return conn
+
+VERSION_ID = "00000000-0000-0000-0000-000000000001"
+
+def test_rows_are_written_in_pages(conn, monkeypatch):
+    monkeypatch.setattr(persistence, "PERSISTENCE_PAGE_SIZE", 2)
+    topics = [{"topic_text": f"tema {i}", "weight": i / 10, "topic_type": "keyword"} for i in range(5)]
+    with conn.cursor() as cur:
+        insert_topics(cur, VERSION_ID, topics)
+        cur.execute("SELECT topic_text FROM topics ORDER BY topic_text")
+        assert [row[0] for row in cur.fetchall()] == [f"tema {i}" for i in range(5)]
+        cur.execute("SELECT COUNT(DISTINCT id) FROM topics")
+        assert cur.fetchone()[0] == 5
+
+def test_empty_rows_issue_no_statement():
+    assert bulk_insert(None, "topics", ["topic_text"], []) == []
+
+def test_upsert_entities_maps_every_key_to_a_stable_id(conn, monkeypatch):
+    monkeypatch.setattr(persistence, "PERSISTENCE_PAGE_SIZE", 2)
+    entities = [{"name": name, "type": kind} for name, kind in [("ACME", "ORG"), ("Ana", "PER"), ("ACME", "ORG"), ("ACME", "LOC")]]
+    with conn.cursor() as cur:
+        first = upsert_entities(cur, entities)
+        second = upsert_entities(cur, entities[1:])
+        cur.execute("SELECT COUNT(*) FROM entities")
+        assert cur.fetchone()[0] == 3
+
+    assert set(first) == {("ACME", "ORG"), ("Ana", "PER"), ("ACME", "LOC")}
+    assert second == {key: first[key] for key in second}
+
+def test_duplicate_classifications_are_skipped(conn):
+    classifications = [{"label": "contrato", "confidence": 0.91, "classifier_type": "zero-shot"}]
+    with conn.cursor() as cur:
+        insert_classifications(cur, VERSION_ID, classifications)
+        insert_classifications(cur, VERSION_ID, classifications)
+        cur.execute("SELECT label, confidence FROM document_classifications")
+        assert cur.fetchall() == [("contrato", 91)]
@@ -0,0 +1,76 @@
+import os
+import uuid
+
+import pytest
+
+import result_cache
+from result_cache import ResultCache, content_hash, content_hasher
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'database', 'migrations')
+
+@pytest.fixture
+def conn(pg_schema):
+    conn = pg_schema()
+    with conn.cursor() as cur:
+        # processing_versions apenas com as colunas usadas pelo cache
+        cur.execute("CREATE TABLE processing_versions (id UUID PRIMARY KEY, status TEXT NOT NULL)")
+        with open(os.path.join(MIGRATIONS_DIR, "023_create_processing_result_cache_table.sql"), encoding='utf-8') as f:
+            cur.execute(f.read())
+    conn.commit()
+    return conn
+
+def _version(conn, status: str = "Processed") -> str:
+    version_id = str(uuid.uuid4())
+    with conn.cursor() as cur:
+        cur.execute("INSERT INTO processing_versions VALUES (%s, %s)", (version_id, status))
+    return version_id
+
+@pytest.mark.unit
+def test_hash_fed_in_pieces_matches_whole_content():
+    digest = content_hasher("application/pdf")
+    for piece in (b"%PDF-1.7", b"\n", b"conteudo"):
+        digest.update(piece)
+    assert digest.hexdigest() == content_hash("application/pdf", b"%PDF-1.7\nconteudo")
+    assert content_hash("text/plain", b"x") != content_hash("text/csv", b"x")
+
+@pytest.mark.unit
+def test_pipeline_version_tracks_the_configured_version(monkeypatch):
+    monkeypatch.setattr(result_cache, "PIPELINE_VERSION", "99")
+    assert result_cache.current_pipeline_version().startswith("99:")
+    assert ResultCache().pipeline_version == result_cache.current_pipeline_version()
+
+@pytest.mark.integration
+def test_lookup_finds_stored_processed_versions_only(conn):
+    cache = ResultCache(enabled=True)
+    with conn.cursor() as cur:
+        source, pending, new = _version(conn), _version(conn, "Processing"), _version(conn)
+        cache.store(cur, "a" * 64, source)
+        cache.store(cur, "a" * 64, new)  # mesmo conteúdo: a primeira versão continua como fonte
+        cache.store(cur, "b" * 64, pending)
+
+        assert cache.lookup(cur, "a" * 64, new) == source
+        assert cache.lookup(cur, "a" * 64, source) is None
+        assert cache.lookup(cur, "b" * 64, new) is None
+        assert cache.lookup(cur, "c" * 64, new) is None
+    assert (cache.hits, cache.misses) == (1, 3)
+
+@pytest.mark.integration
+def test_entries_of_other_pipeline_versions_miss_and_are_invalidated(conn):
+    old, current = ResultCache(enabled=True), ResultCache(enabled=True)
+    old.pipeline_version = "3:modelos"
+    with conn.cursor() as cur:
+        source, new = _version(conn), _version(conn)
+        old.store(cur, "a" * 64, source)
+        current.store(cur, "b" * 64, source)
+
+        assert current.lookup(cur, "a" * 64, new) is None
+        assert current.invalidate(cur, "stale") == 1
+        assert current.lookup(cur, "b" * 64, new) == source
+        assert current.invalidate(cur, "all") == 1
+
+@pytest.mark.unit
+def test_disabled_cache_never_touches_the_database():
+    cache = ResultCache(enabled=False)
+    assert cache.lookup(None, "a" * 64, None) is None
+    cache.store(None, "a" * 64, None)
+    assert (cache.hits, cache.misses) == (0, 0)
@@ -0,0 +1,101 @@
+import os
+import threading
+import time
+
+import pytest
+
+from stage_executor import Stage, StageExecutor
+
+pytestmark = pytest.mark.unit
+
+def _pid(text):
+    # Em nível de módulo para poder rodar no pool de processos
+    return os.getpid()
+
+def _stages(log: list) -> list:
+    def record(name, fn):
+        def call(**kwargs):
+            log.append(name)
+            return fn(**kwargs)
+        return call
+
+    return [
+        Stage("words", record("words", lambda text: text.split()), depends_on=["text"]),
+        Stage("count", record("count", lambda words: len(words)), depends_on=["words"]),
+        Stage("upper", record("upper", lambda text: text.upper()), depends_on=["text"]),
+        Stage("report", record("report", lambda count, upper: f"{count}:{upper}"), depends_on=["count", "upper"]),
+    ]
+
+@pytest.mark.parametrize("mode", ["serial", "thread", "process"])
+def test_every_mode_returns_the_same_results(mode):
+    log = []
+    executor = StageExecutor(mode=mode, max_workers=2)
+    try:
+        results, timings = executor.run(_stages(log), {"text": "multa por atraso"})
+    finally:
+        executor.shutdown()
+
+    assert results["report"] == "3:MULTA POR ATRASO"
+    assert results["text"] == "multa por atraso"
+    assert set(timings) == {"words", "count", "upper", "report"}
+    assert log.index("words") < log.index("count") < log.index("report")
+    assert log.index("upper") < log.index("report")
+
+def test_independent_stages_overlap_on_threads():
+    barrier = threading.Barrier(2, timeout=5)
+    stages = [Stage(name, lambda text: barrier.wait(), depends_on=["text"]) for name in ("a", "b")]
+    executor = StageExecutor(mode="thread", max_workers=2)
+    try:
+        # Com execução em série a barreira nunca seria atingida pelas duas etapas
+        executor.run(stages, {"text": ""})
+    finally:
+        executor.shutdown()
+
+def test_cpu_bound_stages_run_in_another_process():
+    executor = StageExecutor(mode="process", max_workers=1)
+    try:
+        results, _ = executor.run([Stage("pid", _pid, depends_on=["text"], cpu_bound=True)], {"text": ""})
+    finally:
+        executor.shutdown()
+    assert results["pid"] != os.getpid()
+
+@pytest.mark.parametrize("stages, message", [
+    ([Stage("a", lambda text: 1, depends_on=["text"]), Stage("a", lambda text: 2, depends_on=["text"])], "Duplicate"),
+    ([Stage("a", lambda missing: 1, depends_on=["missing"])], "unknown"),
+])
+def test_invalid_dags_are_rejected_before_running(stages, message):
+    with pytest.raises(ValueError, match=message):
+        StageExecutor(mode="thread").run(stages, {"text": ""})
+
+@pytest.mark.parametrize("mode", ["serial", "thread"])
+def test_dependency_cycle_is_reported(mode):
+    stages = [Stage("a", lambda b: b, depends_on=["b"]), Stage("b", lambda a: a, depends_on=["a"])]
+    executor = StageExecutor(mode=mode)
+    try:
+        with pytest.raises(ValueError, match="cycle"):
+            executor.run(stages, {})
+    finally:
+        executor.shutdown()
+
+def test_stage_error_propagates_and_cancels_pending_work():
+    started = []
+
+    def fail(text):
+        raise RuntimeError("falhou")
+
+    def slow(text):
+        time.sleep(0.05)
+        return text
+
+    stages = [
+        Stage("fail", fail, depends_on=["text"]),
+        Stage("slow", slow, depends_on=["text"]),
+        Stage("after", lambda fail: started.append("after"), depends_on=["fail"]),
+    ]
+    executor = StageExecutor(mode="thread", max_workers=2)
+    try:
+        with pytest.raises(RuntimeError, match="falhou"):
+            executor.run(stages, {"text": ""})
+    finally:
+        executor.shutdown()
+    assert started == []
@@ -0,0 +1,59 @@
+import io
+import json
+
+import pytest
+
+from pipelines.tabular_processing import TabularProcessingPipeline
+
+pytestmark = pytest.mark.unit
+
+def _pipeline(rows_per_chunk: int = 2) -> TabularProcessingPipeline:
+    # Pedaços pequenos para que os tipos inferidos na amostra encontrem valores novos depois
+    pipeline = TabularProcessingPipeline()
+    pipeline.page_rows = pipeline.chunk_rows = pipeline.sample_rows = rows_per_chunk
+    return pipeline
+
+def _process(pipeline, content: bytes, file_name: str = "tabela.csv") -> tuple:
+    pages = []
+    result = pipeline.process(content, file_name, on_page=pages.append)
+    rows = [row for page in pages for row in json.loads(page["rows_json"])]
+    return result, rows
+
+def test_late_decimal_widens_integer_column():
+    content = b"id,valor\n1,10\n2,20\n3,30\n4,45.5\n5,50\n"
+    result, rows = _process(_pipeline(), content)
+
+    assert result is not None
+    assert result["row_count"] == 5
+    assert result["detected_schema"]["valor"] == "Float64"
+    assert result["detected_schema"]["id"] == "Int64"
+    assert [row["valor"] for row in rows] == [10, 20, 30, 45.5, 50]
+    assert result["summary_stats"]["valor"]["mean"] == pytest.approx(31.1)
+
+def test_late_text_widens_integer_column_to_object():
+    content = b"id,quantidade\n1,10\n2,20\n3,n/d\n4,40\n5,50\n"
+    result, rows = _process(_pipeline(), content)
+
+    assert result is not None
+    assert result["row_count"] == 5
+    assert result["detected_schema"]["quantidade"] == "object"
+    assert rows[2]["quantidade"] == "n/d"
+    # O texto fica fora das estatísticas numéricas
+    assert result["summary_stats"]["quantidade"]["count"] == 4
+    assert result["summary_stats"]["quantidade"]["mean"] == pytest.approx(30.0)
+
+def test_late_decimal_in_excel_file():
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    for row in [("id", "valor"), (1, 10), (2, 20), (3, 30.25), (4, 40)]:
+        sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+
+    result, rows = _process(_pipeline(), buffer.getvalue(), "tabela.xlsx")
+
+    assert result is not None
+    assert result["row_count"] == 4
+    assert result["detected_schema"]["valor"] == "Float64"
+    assert [row["valor"] for row in rows] == [10, 20, 30.25, 40]
@@ -0,0 +1,82 @@
+import os
+
+import pytest
+from psycopg2.extras import Json
+
+from pipelines.template_creation import TemplateCreationPipeline
+from pipelines.template_detection import TemplateDetectionPipeline
+
+pytestmark = pytest.mark.integration
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'database', 'migrations')
+
+def _create_tables(conn):
+    with conn.cursor() as cur:
+        # document_structures sem a FK para processing_versions, que não é usada aqui
+        cur.execute("""
+            CREATE TABLE document_structures (
+                id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+                features JSONB NOT NULL,
+                structure_hash TEXT NOT NULL
+            );
+        """)
+        for migration in ("019_create_document_templates_table.sql", "028_create_document_template_structures_table.sql"):
+            with open(os.path.join(MIGRATIONS_DIR, migration), encoding='utf-8') as f:
+                cur.execute(f.read())
+    conn.commit()
+
+def _store_structure(conn, text: str) -> str:
+    result = TemplateDetectionPipeline().extract_features(text)
+    with conn.cursor() as cur:
+        cur.execute("INSERT INTO document_structures (features, structure_hash) VALUES (%s, %s)", (Json(result["features"]), result["structure_hash"]))
+    conn.commit()
+    return result["structure_hash"]
+
+def _document(headers: list) -> str:
+    return "\n".join(f"{i}. {header}\nTexto da seção." for i, header in enumerate(headers, start=1))
+
+def test_cluster_members_are_recorded_and_not_clustered_again(pg_schema):
+    conn = pg_schema()
+    _create_tables(conn)
+    headers = [f"seção {i}" for i in range(40)]
+    # Três cópias do mesmo layout e uma variante quase idêntica (outro structure_hash)
+    common_hash = [_store_structure(conn, _document(headers)) for _ in range(3)][0]
+    variant_hash = _store_structure(conn, _document(headers[:-1] + ["anexo"]))
+    assert variant_hash != common_hash
+
+    pipeline = TemplateCreationPipeline()
+    assert pipeline.create_templates_from_structures(conn) == [f"Auto-Template-{common_hash[:8]}"]
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT structure_hash FROM document_template_structures ORDER BY structure_hash")
+        assert [row[0] for row in cur.fetchall()] == sorted([common_hash, variant_hash])
+
+    # Mais uma cópia da variante: o hash já pertence ao template, nada é criado de novo
+    _store_structure(conn, _document(headers[:-1] + ["anexo"]))
+    assert pipeline.create_templates_from_structures(conn) == []
+    with conn.cursor() as cur:
+        cur.execute("SELECT COUNT(*) FROM document_templates")
+        assert cur.fetchone()[0] == 1
+
+def test_only_inserted_templates_are_counted(pg_schema):
+    conn = pg_schema()
+    _create_tables(conn)
+    headers = [f"cláusula {i}" for i in range(20)]
+    structure_hash = [_store_structure(conn, _document(headers)) for _ in range(3)][0]
+
+    pipeline = TemplateCreationPipeline()
+    clusters = pipeline.cluster_structures
+    # Simula outra execução que criou o mesmo template depois da leitura das estruturas
+    def cluster_then_conflict(structures):
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO document_templates (id, template_name, structure_hash, structure_definition)
+                VALUES (gen_random_uuid(), 'concorrente', %s, '{}')
+            """, (structure_hash,))
+        return clusters(structures)
+    pipeline.cluster_structures = cluster_then_conflict
+
+    assert pipeline.create_templates_from_structures(conn) == []
+    with conn.cursor() as cur:
+        cur.execute("SELECT dts.structure_hash FROM document_template_structures dts JOIN document_templates dt ON dt.id = dts.template_id WHERE dt.template_name = 'concorrente'")
+        assert [row[0] for row in cur.fetchall()] == [structure_hash]
@@ -0,0 +1,81 @@
+import hashlib
+import json
+import random
+import re
+
+import pytest
+
+from pipelines.template_detection import TemplateDetectionPipeline
+
+pytestmark = pytest.mark.unit
+
+def baseline_extract_features(text: str) -> dict:
+    """
+    Implementação original (regexes multiline sobre o texto inteiro), que gerou os structure_hash
+    já gravados em document_templates.
+    """
+    features = {}
+    header_pattern = re.compile(r'^(#\s*.*|\d+(?:\.\d+)*\.\s*.*)', re.MULTILINE)
+    headers = header_pattern.findall(text)
+    cleaned_headers = [re.sub(r'^(#\s*|\d+(?:\.\d+)*\.\s*)', '', h).strip().lower() for h in headers]
+    features['header_count'] = len(cleaned_headers)
+    features['headers'] = cleaned_headers
+    bullet_pattern = re.compile(r'^\s*[\*\-]\s+', re.MULTILINE)
+    features['bullet_point_count'] = len(bullet_pattern.findall(text))
+    structure_hash = hashlib.sha256(json.dumps(features, sort_keys=True).encode('utf-8')).hexdigest()
+    return {"features": features, "structure_hash": structure_hash}
+
+FIXED_CORPUS = [
+    "",
+    "Texto sem estrutura.",
+    "# Relatório\n\n## Resumo\nTexto.\n- item um\n- item dois\n",
+    "1. Introdução\n1.1. Escopo\n1.2 Objetivo\n2. Métodos\n* ponto\n",
+    "1.\nTítulo na linha seguinte\nCorpo.\n",
+    "# \n\n   Título depois de linhas em branco\n- bullet\n",
+    "1.\n2. Cabeçalho engolido\n3. Próximo\n",
+    "#\n",
+    "1.",
+    "-\n  - indentado depois de marcador vazio\n- normal\n",
+    "- \n\n  - também engolido\n",
+    "-\n",
+    "-",
+    "- ",
+    "1.\n- bullet usado como título\n",
+    "#Título colado\n##Sub\n\t- tab bullet\n",
+    "Texto\r\n1. Windows\r\n- item\r\n",
+]
+
+FRAGMENTS = [
+    "", " ", "\t", "   ", "1.", "1. ", "2.1.", "1.2 Título", "3. Seção", "# ", "#", "## Sub", "#Cola",
+    "-", "- ", "  -", "  - item", "* ponto", "*", "-x", "texto corrido", "  texto indentado", "10. Dez",
+]
+
+def _random_documents(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    return ["\n".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 12))) + rng.choice(["", "\n"]) for _ in range(count)]
+
+@pytest.mark.parametrize("text", FIXED_CORPUS)
+def test_structure_hash_matches_baseline_on_fixed_corpus(text):
+    expected = baseline_extract_features(text)
+    result = TemplateDetectionPipeline().extract_features(text)
+
+    assert result["structure_hash"] == expected["structure_hash"]
+    for key in ("header_count", "headers", "bullet_point_count"):
+        assert result["features"][key] == expected["features"][key]
+
+def test_structure_hash_matches_baseline_on_generated_corpus():
+    pipeline = TemplateDetectionPipeline()
+    mismatches = [
+        text for text in _random_documents(3000)
+        if pipeline.extract_features(text)["structure_hash"] != baseline_extract_features(text)["structure_hash"]
+    ]
+    assert mismatches == []
+
+def test_similar_layouts_share_an_lsh_band():
+    pipeline = TemplateDetectionPipeline()
+    headers = [f"seção {i}" for i in range(40)]
+    first = pipeline.structure_signature(headers)
+    second = pipeline.structure_signature(headers[:-1] + ["seção extra"])
+
+    assert pipeline.signature_similarity(first, second) > 0.8
+    assert set(pipeline.lsh_bands(first)) & set(pipeline.lsh_bands(second))
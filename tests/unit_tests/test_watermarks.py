@@ -0,0 +1,70 @@
+import time
+
+import pytest
+
+from watermarks import get_watermark, run_incremental
+
+pytestmark = pytest.mark.integration
+
+EVENTS_QUERY = """
+    SELECT created_at, id FROM events
+    WHERE (created_at, id) > (%(after_created_at)s, %(after_id)s) AND created_at < %(before_created_at)s
+    ORDER BY created_at, id
+    LIMIT %(limit)s;
+"""
+
+def _create_tables(conn):
+    with conn.cursor() as cur:
+        # Mesma definição da migração 024
+        cur.execute("""
+            CREATE TABLE analytics_watermarks (
+                job_name VARCHAR(100) PRIMARY KEY,
+                last_created_at TIMESTAMPTZ NOT NULL,
+                last_id UUID NOT NULL,
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            );
+            CREATE TABLE events (id UUID PRIMARY KEY DEFAULT gen_random_uuid(), created_at TIMESTAMPTZ NOT NULL DEFAULT NOW());
+        """)
+    conn.commit()
+
+def _insert_event(conn) -> str:
+    with conn.cursor() as cur:
+        cur.execute("INSERT INTO events DEFAULT VALUES RETURNING id")
+        return str(cur.fetchone()[0])
+
+def _collect(processed: list):
+    def handle_rows(cur, rows):
+        processed.extend(str(row[1]) for row in rows)
+    return handle_rows
+
+def test_processes_all_rows_in_batches_and_resumes_from_watermark(pg_schema):
+    conn = pg_schema()
+    _create_tables(conn)
+    ids = [_insert_event(conn) for _ in range(5)]
+    conn.commit()
+
+    processed = []
+    assert run_incremental(conn, "events", EVENTS_QUERY, _collect(processed), batch_size=2, lag_seconds=0) == 5
+    assert sorted(processed) == sorted(ids)
+    with conn.cursor() as cur:
+        assert str(get_watermark(cur, "events")[1]) == processed[-1]
+
+    assert run_incremental(conn, "events", EVENTS_QUERY, _collect(processed), batch_size=2, lag_seconds=0) == 0
+
+def test_rows_committed_out_of_order_are_not_skipped(pg_schema):
+    setup, slow, fast, job = pg_schema(), pg_schema(), pg_schema(), pg_schema()
+    _create_tables(setup)
+
+    # Uma ingestão longa insere primeiro (created_at = início da sua transação) e só confirma depois
+    slow_id = _insert_event(slow)
+    time.sleep(0.05)
+    fast_id = _insert_event(fast)
+    fast.commit()
+
+    processed = []
+    run_incremental(job, "events", EVENTS_QUERY, _collect(processed), lag_seconds=0)
+    assert slow_id not in processed
+
+    slow.commit()
+    run_incremental(job, "events", EVENTS_QUERY, _collect(processed), lag_seconds=0)
+    assert sorted(processed) == sorted([slow_id, fast_id])